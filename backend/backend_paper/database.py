@@ -0,0 +1,117 @@
+"""
+Database profiles selected from the environment.
+
+DB_ENGINE=sqlite (default)
+    SQLite tuned for several gunicorn workers writing at once: WAL journal,
+    synchronous=NORMAL, a busy timeout instead of immediate "database is
+    locked" errors, BEGIN IMMEDIATE write transactions, memory-mapped reads
+    and persistent connections. SQLITE_TUNED=0 restores Django's defaults
+    (used by ``manage.py bench_database`` for comparison).
+
+DB_ENGINE=postgres
+    PostgreSQL through psycopg 3 with a per-process connection pool
+    (``OPTIONS["pool"]``), configured from DATABASE_URL or the usual
+    PGHOST/PGPORT/PGDATABASE/PGUSER/PGPASSWORD variables.
+
+DB_REPLICA=sqlite | postgres (optional)
+    Adds a ``replica`` alias for reporting reads (see papers/routers.py):
+    a SQLite snapshot refreshed by ``manage.py refresh_replica`` or a
+    PostgreSQL standby at DB_REPLICA_URL.
+"""
+import os
+from urllib.parse import unquote, urlparse
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=134217728;"
+    "PRAGMA cache_size=-20000;"
+    "PRAGMA temp_store=MEMORY;"
+)
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def sqlite_config(base_dir):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('SQLITE_PATH', str(base_dir / 'db.sqlite3')),
+    }
+    # A file, not Django's shared in-memory database: that one fails concurrent
+    # writers with "table is locked" instead of waiting, so tests could not
+    # exercise the busy timeout and IMMEDIATE transactions below
+    config['TEST'] = {'NAME': os.environ.get('SQLITE_TEST_PATH', str(base_dir / 'test_db.sqlite3'))}
+
+    if os.environ.get('SQLITE_TUNED', '1') == '0':
+        return config
+
+    config.update({
+        'CONN_MAX_AGE': _env_int('DB_CONN_MAX_AGE', 600),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 20),  # seconds, sets busy_timeout
+            'transaction_mode': 'IMMEDIATE',  # take the write lock up front, no upgrade deadlocks
+            'init_command': SQLITE_PRAGMAS,
+        },
+    })
+    return config
+
+
+def postgres_config(url_env='DATABASE_URL'):
+    url = urlparse(os.environ.get(url_env, ''))
+    if url.scheme and not url.scheme.startswith('postgres'):
+        raise ValueError(f"{url_env} must be a postgres:// URL, got {url.scheme}://")
+
+    return {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': unquote(url.path.lstrip('/')) or os.environ.get('PGDATABASE', 'dtcc_tracker'),
+        'USER': unquote(url.username or '') or os.environ.get('PGUSER', ''),
+        'PASSWORD': unquote(url.password or '') or os.environ.get('PGPASSWORD', ''),
+        'HOST': url.hostname or os.environ.get('PGHOST', '127.0.0.1'),
+        'PORT': str(url.port or os.environ.get('PGPORT', '5432')),
+        # Pooled connections replace persistent ones (CONN_MAX_AGE must stay 0)
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': _env_int('DB_POOL_MIN_SIZE', 2),
+                'max_size': _env_int('DB_POOL_MAX_SIZE', 10),
+                'timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            },
+        },
+    }
+
+
+def database_config(base_dir):
+    engine = os.environ.get('DB_ENGINE', 'sqlite')
+    if engine == 'postgres':
+        return postgres_config()
+    if engine != 'sqlite':
+        raise ValueError(f"Unknown DB_ENGINE {engine!r}; expected 'sqlite' or 'postgres'")
+    return sqlite_config(base_dir)
+
+
+def replica_config(base_dir):
+    """Settings for the ``replica`` alias, or None when no replica is configured."""
+    kind = os.environ.get('DB_REPLICA', '')
+    if not kind:
+        return None
+    if kind == 'postgres':
+        config = postgres_config('DB_REPLICA_URL')
+    elif kind == 'sqlite':
+        config = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_REPLICA_PATH', str(base_dir / 'db.replica.sqlite3')),
+            # Reconnect per request so a refreshed snapshot is picked up
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'timeout': _env_int('SQLITE_BUSY_TIMEOUT', 20),
+                'init_command': 'PRAGMA query_only=ON;',
+            },
+        }
+    else:
+        raise ValueError(f"Unknown DB_REPLICA {kind!r}; expected 'sqlite' or 'postgres'")
+    # Tests run against a single database
+    config['TEST'] = {'MIRROR': 'default'}
+    return config
@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
+
+from .database import database_config, replica_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,7 +44,7 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=12),  # Set to 12 hours (adjust as needed)
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),  # Set to 7 days
     "ROTATE_REFRESH_TOKENS": True,  # Issue a new refresh token when refreshing access token
-    "BLACKLIST_AFTER_ROTATION": True,  # Blacklist old refresh tokens
+    "BLACKLIST_AFTER_ROTATION": True,  # Revoke old refresh tokens (papers/revocation.py, not the token_blacklist app)
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,  # Ensure this is securely managed
     "VERIFYING_KEY": None,
@@ -48,6 +52,9 @@ SIMPLE_JWT = {
     "USER_ID_FIELD": "id",
     "USER_ID_CLAIM": "user_id",
 }
+REVOCATION_FILTER_BITS = 1 << 20  # Per-process Bloom filter of revoked jtis (128 KiB, ~1% false positives at 100k)
+REVOCATION_FILTER_HASHES = 7
+REVOCATION_FILTER_REBUILD_SECONDS = 3600  # Rebuild from unexpired rows at most this often, dropping expired jtis
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -71,6 +78,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'papers.instrumentation.RequestMetricsMiddleware',
+    'papers.profiling.ProfilingMiddleware',
+    'papers.routers.ReplicaStickinessMiddleware',
 ]
 
 ROOT_URLCONF = 'backend_paper.urls'
@@ -97,13 +107,87 @@ WSGI_APPLICATION = 'backend_paper.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DB_ENGINE selects a tuned SQLite (default) or pooled PostgreSQL profile,
+# see backend_paper/database.py
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
+# Optional read replica for reporting views (DB_REPLICA, see papers/routers.py)
+if replica_config(BASE_DIR):
+    DATABASES['replica'] = replica_config(BASE_DIR)
+
+DATABASE_ROUTERS = ['papers.routers.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 30  # Read-your-writes window when the replica's sync time is unknown
+
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'papers': {'handlers': ['console'], 'level': os.environ.get('PAPERS_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# Opt-in tracing of the paper create/list endpoints (papers/diagnostics.py)
+PAPERS_DIAGNOSTICS = os.environ.get('PAPERS_DIAGNOSTICS', '') in ('1', 'true', 'True')
+PAPERS_DIAGNOSTICS_MAX_ROWS = 50  # Cap on rows dumped per traced request
+
+# Request instrumentation (papers/instrumentation.py)
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', '0'))  # Fraction of requests logged as JSON lines
+REQUEST_LOG_SLOW_MS = 1000  # Requests slower than this are always logged
+METRICS_ALLOWED_IPS = ['127.0.0.1/32', '::1/128']  # Clients allowed to scrape /api/metrics/
+TRUSTED_PROXIES = ['127.0.0.1/32', '::1/128']  # Peers whose X-Real-IP header is believed (nginx on this host)
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 10))  # Seconds between worker snapshots in the shared cache
+
+
+# Superuser on-demand request profiling, X-Profile: 1 (papers/profiling.py)
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') == '1'
+PROFILE_MAX_REPORTS = 200  # Oldest reports beyond this are deleted
+PROFILE_RETENTION_DAYS = 7
+PROFILE_MAX_QUERIES = 500  # SQL statements stored per report
+PROFILE_EXPLAIN_LIMIT = 10  # Distinct SELECTs (by total time) that get an EXPLAIN plan
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# CACHE_BACKEND selects where serialized list responses are kept:
+#   "file" (default, shared by all gunicorn workers on the host),
+#   "locmem" (per process, development only) or "redis" (REDIS_URL).
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'dtcc-tracker',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+PAPERS_CACHE_TIMEOUT = 300  # Seconds a cached list response may live without invalidation
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -145,3 +229,76 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Admin dashboard change notifications (papers/events.py)
+EVENT_STREAM_POLL_INTERVAL = 1.0  # Seconds between change-log polls in the ASGI process
+EVENT_STREAM_HEARTBEAT = 15.0  # Keep-alive comment interval for idle connections
+EVENT_STREAM_RETENTION_HOURS = 24  # How long change events are kept for reconnect replay
+EVENT_STREAM_TICKET_SECONDS = 30  # Lifetime of the single-use ticket that opens a stream
+
+# Background job queue (papers/jobs.py, run by `manage.py run_jobs`)
+JOBS_RUN_EAGER = os.environ.get('JOBS_RUN_EAGER', '0') == '1'  # Run jobs in-process after commit (no worker needed)
+JOBS_LOCK_TIMEOUT = 600  # Seconds without a heartbeat before a running job is requeued
+JOBS_BACKOFF_BASE = 5  # Seconds before the first retry; doubles per attempt
+JOBS_BACKOFF_MAX = 3600  # Upper bound on the retry delay
+JOBS_RETENTION_DAYS = 7  # Done and failed jobs are pruned after this many days
+JOBS_CONCURRENCY = {}  # Per-job overrides of the handler's concurrency limit, e.g. {'enrich_paper_metadata': 1}
+
+# Bulk paper/project deletes and updates (papers/bulk.py)
+BULK_MAX_IDS = 500  # Ids accepted per request
+
+# Idempotency-Key replay for paper/project creates (papers/idempotency.py)
+IDEMPOTENCY_ENABLED = True
+IDEMPOTENCY_TTL_SECONDS = 24 * 3600  # Retries with the same key replay the first response this long
+IDEMPOTENCY_MAX_RECORDS = 10000  # Oldest stored responses beyond this are deleted
+IDEMPOTENCY_LOCK_SECONDS = 180  # Claims of crashed workers are taken over after this (> gunicorn --timeout)
+
+# User deletion (papers/accounts.py)
+USER_DELETE_BATCH_SIZE = 500  # Rows per DELETE/transaction when removing a user's data
+
+# Crossref client (papers/crossref.py) and metadata enrichment (papers/enrichment.py)
+CROSSREF_MAILTO = os.environ.get('CROSSREF_MAILTO', '')  # Contact address; identified clients get the "polite" pool
+CROSSREF_API_URL = os.environ.get('CROSSREF_API_URL', 'https://api.crossref.org/works/')  # Benchmarks point this at a stub
+CROSSREF_RATE_LIMIT = int(os.environ.get('CROSSREF_RATE_LIMIT', 5))  # Requests per second across all processes
+CROSSREF_MAX_CONCURRENCY = 3  # Requests in flight per process
+CROSSREF_TIMEOUT = 10  # Seconds per request
+CROSSREF_CACHE_TIMEOUT = 7 * 24 * 3600  # How long resolved DOI metadata is reused
+
+# Throttling of expensive endpoints (papers/throttling.py)
+THROTTLE_ENABLED = os.environ.get('THROTTLE_ENABLED', '1') == '1'  # Benchmarks turn this off
+THROTTLE_RATES = {  # scope: (refill rate, burst size), per user or per IP when anonymous
+    'chat': ('10/min', 5),
+    'doi_lookup': ('60/min', 20),
+}
+THROTTLE_CONCURRENCY = {'chat': 1}  # In-flight requests per user
+THROTTLE_LEASE_SECONDS = 180  # In-flight slots of crashed workers expire after this (> gunicorn --timeout)
+THROTTLE_CONCURRENCY_RETRY_AFTER = 2  # Retry-After seconds when the concurrency cap is hit
+
+# Chatbot LLM client (papers/llm.py)
+BEDROCK_MODEL_ID = "meta.llama3-70b-instruct-v1:0"
+BEDROCK_REGION = "us-west-2"
+BEDROCK_CLIENT_FACTORY = os.environ.get('BEDROCK_CLIENT_FACTORY', '')  # Dotted path, called with the region; benchmarks use a fake
+# Tried in order; a slow first backend is hedged with the next. Each model must be enabled in its region.
+LLM_BACKENDS = [
+    {"name": "llama3-70b-us-west-2", "model_id": BEDROCK_MODEL_ID, "region": BEDROCK_REGION},
+    {"name": "llama3-70b-us-east-1", "model_id": BEDROCK_MODEL_ID, "region": "us-east-1"},
+]
+# Smaller models, used only when every primary backend failed or is throttled
+LLM_FALLBACK_BACKENDS = [
+    {"name": "llama3-8b-us-west-2", "model_id": "meta.llama3-8b-instruct-v1:0", "region": BEDROCK_REGION},
+]
+LLM_MAX_HEDGES = 1  # Extra parallel requests per chat message
+LLM_HEDGE_DEFAULT_DELAY = 4.0  # Seconds before hedging until a backend has LLM_HEDGE_MIN_SAMPLES latencies
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_HEDGE_MIN_DELAY = 1.0  # Bounds for the p95-derived hedge delay
+LLM_HEDGE_MAX_DELAY = 10.0
+LLM_LATENCY_WINDOW = 200  # Recent latencies kept per backend
+LLM_THROTTLE_COOLDOWN = 30  # Seconds a throttled backend is skipped
+LLM_TIMEOUT = 90  # Give up on a chat message after this (< gunicorn --timeout)
+LLM_MAX_WORKERS = 8  # Model calls in flight per worker process
+LLM_STREAMING = True  # Read replies as they are generated and stop once the JSON object closes
+LLM_REPAIR_ATTEMPTS = 1  # Continuations asked of the same backend for a malformed or cut-off reply
+
+# Worker startup (manage.py bench_import_time)
+STARTUP_IMPORT_BUDGET_MS = 1000  # Median import time of the WSGI app and URLconf
+STARTUP_LAZY_MODULES = ("boto3", "botocore")  # Imported on first use only, never at startup
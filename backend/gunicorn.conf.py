@@ -0,0 +1,41 @@
+"""
+gunicorn hooks, picked up automatically from the working directory.
+
+With ``--preload`` the master imports the application once and forks the
+workers from it, so the imported code is shared copy-on-write instead of
+loaded by every worker. Django resolves the URLconf (and with it the views
+and everything they import) on the first request, so the master imports it
+explicitly; workers then close any database connection inherited from the
+master rather than sharing its socket.
+
+Request metrics are per worker (papers/instrumentation.py): a worker that
+exits publishes its final counts, and the master folds them into the shared
+totals, whether the worker stopped cleanly or crashed.
+"""
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from importlib import import_module
+
+        from django.conf import settings
+
+        import_module(settings.ROOT_URLCONF)
+
+
+def post_fork(server, worker):
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    from papers.instrumentation import registry
+
+    registry.maybe_flush(force=True)
+
+
+def child_exit(server, worker):
+    from papers.instrumentation import retire_worker
+
+    retire_worker(worker.pid)
@@ -0,0 +1,122 @@
+"""
+User administration: the annotated user list and chunked user deletion.
+
+``annotated_users`` adds paper/project/chat counts and last-activity
+timestamps as correlated subqueries, so the admin list is one query however
+many users there are. ``delete_user`` removes a user's rows in short,
+chunked DELETEs (no per-row model loading, signals or change events), then
+reconciles the master copies the user leaves behind.
+"""
+import logging
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .dois import normalize_doi
+from .events import publish
+from .models import ChatMessage, Paper, Project
+
+logger = logging.getLogger(__name__)
+
+USER_FIELDS = ("id", "username", "email", "is_superuser", "is_staff", "is_active", "date_joined", "last_login")
+
+
+def _per_user(queryset, aggregate):
+    return Subquery(
+        queryset.filter(user=OuterRef("pk")).order_by().values("user").annotate(value=aggregate).values("value")[:1]
+    )
+
+
+def _count(queryset):
+    return Coalesce(_per_user(queryset, Count("pk")), Value(0), output_field=IntegerField())
+
+
+def annotated_users(users):
+    """``users`` as dicts with paper/project/chat counts and last activity."""
+    rows = users.annotate(
+        paper_count=_count(Paper.objects.filter(is_master_copy=False)),
+        project_count=_count(Project.objects.all()),
+        chat_message_count=_count(ChatMessage.objects.all()),
+        last_chat_at=_per_user(ChatMessage.objects.all(), Max("created_at")),
+    ).order_by("pk").values(*USER_FIELDS, "paper_count", "project_count", "chat_message_count", "last_chat_at")
+
+    result = []
+    for row in rows:
+        moments = [moment for moment in (row["last_login"], row["last_chat_at"]) if moment is not None]
+        row["last_activity"] = max(moments) if moments else None
+        result.append(row)
+    return result
+
+
+def _delete_in_chunks(queryset, before_delete=None):
+    """DELETE ``queryset`` by primary key in short transactions; returns the row count."""
+    batch_size = getattr(settings, "USER_DELETE_BATCH_SIZE", 500)
+    deleted = 0
+    while True:
+        with transaction.atomic():
+            ids = list(queryset.values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            if before_delete is not None:
+                before_delete(ids)
+            chunk = queryset.model.objects.filter(pk__in=ids)
+            # Skip the collector: no row loading, cascades or signals
+            deleted += chunk._raw_delete(chunk.db)
+
+
+def reconcile_master_copies(dois=None, dry_run=False):
+    """
+    Delete master copies that no researcher's paper backs any more, unless
+    they were already submitted for a reporting year (those stay on record).
+    Limited to ``dois`` when given. Returns ``(deleted, kept_submitted)``.
+    """
+    owner_id = caching.superuser_id()
+    if owner_id is None:
+        return 0, 0
+    orphans = Paper.objects.filter(user_id=owner_id, is_master_copy=True).exclude(
+        doi_key__in=Paper.objects.filter(is_master_copy=False).values("doi_key"),
+    )
+    if dois is not None:
+        orphans = orphans.filter(doi_key__in=[normalize_doi(doi) for doi in dois])
+    kept = orphans.filter(submission_year__isnull=False).count()
+    removable = orphans.filter(submission_year__isnull=True)
+    if dry_run:
+        return removable.count(), kept
+    deleted = _delete_in_chunks(removable)
+    if deleted:
+        caching.invalidate_papers(owner_id)
+    return deleted, kept
+
+
+def delete_user(user_id):
+    """
+    Delete a user and everything they own in bounded chunks. Returns counts
+    of deleted rows per kind, including orphaned master copies.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return None
+
+    dois = set(Paper.objects.filter(user_id=user_id, is_master_copy=False).values_list("doi_key", flat=True))
+
+    def unlink_projects(ids):
+        # Other users' papers may reference these projects
+        Paper.objects.filter(project_id__in=ids).update(project=None)
+
+    counts = {
+        "chat_messages": _delete_in_chunks(ChatMessage.objects.filter(user_id=user_id)),
+        "papers": _delete_in_chunks(Paper.objects.filter(user_id=user_id)),
+        "projects": _delete_in_chunks(Project.objects.filter(user_id=user_id), before_delete=unlink_projects),
+    }
+    # Nothing large is left to cascade; this also fires the user signals
+    user.delete()
+
+    counts["orphaned_master_copies"], counts["kept_submitted_master_copies"] = reconcile_master_copies(dois)
+    caching.invalidate_all()  # Linked papers of other users and the superuser's lists changed
+    publish("user", "deleted", user_id, user_id, {"username": user.username, **counts})
+    logger.info(f"Deleted user {user_id}: {counts}")
+    return counts
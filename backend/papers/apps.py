@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PapersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'papers'
+
+    def ready(self):
+        # Connect model signals (change notifications)
+        from . import signals  # noqa: F401
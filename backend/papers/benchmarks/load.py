@@ -0,0 +1,287 @@
+"""
+Mixed-workload load generation modelled on the week before annual reporting.
+
+Virtual users run concurrently against a local gunicorn:
+
+- researchers log in, list their papers and projects, submit papers in
+  bursts, ask the chatbot, look up DOIs and refresh their access token
+- superusers log in, page through master copies, read submission stats and
+  bulk-update submission years
+
+The number of active virtual users follows a ramp profile (``"10@30,40@30"``:
+10 users for 30 s, then 40 for 30 s). Each stage is summarised from the
+client side (latency percentiles, throughput, errors) and from the server's
+own metrics (time spent inside Django, database lock errors). Comparing the
+two separates time spent queueing for a free worker from slow handlers.
+"""
+import random
+import re
+import threading
+import time
+
+import requests
+
+from . import summarize
+from .seed import ADMIN_USERNAME, SEED_PASSWORD, user_name
+
+RESEARCHER_ACTIONS = (
+    ("papers_list", 30),
+    ("paper_submit_burst", 20),
+    ("paper_update", 10),
+    ("projects_list", 10),
+    ("chat", 15),
+    ("doi_info", 10),
+    ("token_refresh", 5),
+)
+SUPERUSER_ACTIONS = (
+    ("superuser_papers_list", 35),
+    ("superuser_stats", 30),
+    ("superuser_bulk_update", 25),
+    ("users_list", 10),
+)
+
+
+def parse_profile(text):
+    """``"5@30,20@60"`` -> ``[(5, 30.0), (20, 60.0)]`` (virtual users @ seconds)."""
+    stages = []
+    for part in text.split(","):
+        users, _, seconds = part.partition("@")
+        if not seconds:
+            raise ValueError(f"Stage {part!r} must look like USERS@SECONDS")
+        stages.append((int(users), float(seconds)))
+    return stages
+
+
+class Controller:
+    """Shared run state: current stage and how many virtual users are active."""
+
+    def __init__(self):
+        self.stage = 0
+        self.active = 0
+        self.done = threading.Event()
+        self.samples = []  # (stage, action, seconds, status); list.append is thread-safe
+
+    def record(self, action, elapsed, status):
+        self.samples.append((self.stage, action, elapsed, status))
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, superuser, username, base_url, state, controller, think_ms, timeout):
+        super().__init__(daemon=True)
+        self.index = index
+        self.superuser = superuser
+        self.username = username
+        self.base_url = base_url
+        self.state = state
+        self.controller = controller
+        self.think = think_ms / 1000
+        self.timeout = timeout
+        self.rng = random.Random(index)
+        self.session = requests.Session()
+        self.access = self.refresh = None
+        self.paper_ids = []
+        self.created = 0
+        actions = SUPERUSER_ACTIONS if superuser else RESEARCHER_ACTIONS
+        self.actions = [name for name, _ in actions]
+        self.weights = [weight for _, weight in actions]
+
+    def run(self):
+        while not self.controller.done.is_set():
+            if self.index >= self.controller.active:
+                time.sleep(0.1)
+                continue
+            if self.access is None:
+                self._login()
+            else:
+                action = self.rng.choices(self.actions, self.weights)[0]
+                getattr(self, action)()
+            # Think time with jitter so users do not move in lockstep
+            self.controller.done.wait(self.think * self.rng.uniform(0.5, 1.5))
+
+    def _call(self, action, method, path, auth=True, **kwargs):
+        headers = {"Authorization": f"Bearer {self.access}"} if auth and self.access else {}
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, headers=headers,
+                                            timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.Timeout:
+            response, status = None, "timeout"
+        except requests.RequestException:
+            response, status = None, "connection_error"
+        self.controller.record(action, time.perf_counter() - start, status)
+        if status == 401:
+            self.access = None  # log in again on the next iteration
+        return response if status == 200 or status == 201 else None
+
+    def _login(self):
+        response = self._call("login", "POST", "/api/auth/login/", auth=False,
+                              json={"username": self.username, "password": SEED_PASSWORD})
+        if response is not None:
+            body = response.json()
+            self.access, self.refresh = body["access_token"], body["refresh_token"]
+
+    # Researcher actions
+
+    def papers_list(self):
+        response = self._call("papers_list", "GET", "/api/papers/")
+        if response is not None and not self.paper_ids:
+            self.paper_ids = [row["id"] for row in response.json()[:50]]
+
+    def paper_submit_burst(self):
+        for _ in range(self.rng.randint(3, 6)):
+            self.created += 1
+            self._call("paper_create", "POST", "/api/papers/", json={
+                "doi": f"10.5555/load.{self.state['run']}.{self.index}.{self.created}",
+                "title": "Deadline submission", "author_name": self.username,
+                "journal": "Journal of Benchmarks", "date": "2024",
+            })
+            time.sleep(0.05)
+
+    def paper_update(self):
+        if self.paper_ids:
+            pk = self.rng.choice(self.paper_ids)
+            self._call("paper_update", "PUT", f"/api/papers/update/{pk}/",
+                       json={"title": f"Revised {self.rng.random():.6f}"})
+
+    def projects_list(self):
+        self._call("projects_list", "GET", "/api/projects/")
+
+    def chat(self):
+        self._call("chat", "POST", "/api/chat/", json={"message": "I want to register a new paper"})
+
+    def doi_info(self):
+        # Mostly DOIs already looked up by someone, sometimes a new one
+        doi = f"10.5555/lookup.{self.rng.randint(0, 200 if self.rng.random() < 0.8 else 10 ** 9)}"
+        self._call("doi_info", "POST", "/api/doi-info/", json={"doi": doi})
+
+    def token_refresh(self):
+        response = self._call("token_refresh", "POST", "/api/auth/token/refresh/", auth=False,
+                              json={"refresh": self.refresh})
+        if response is not None:
+            body = response.json()
+            self.access = body["access"]
+            self.refresh = body.get("refresh", self.refresh)
+
+    # Superuser actions
+
+    def superuser_papers_list(self):
+        self._call("superuser_papers_list", "GET", "/api/superuser/papers/")
+
+    def superuser_stats(self):
+        self._call("superuser_stats", "GET", "/api/superuser/papers/stats/")
+
+    def superuser_bulk_update(self):
+        ids = self.rng.sample(self.state["master_ids"], min(10, len(self.state["master_ids"])))
+        self._call("superuser_bulk_update", "POST", "/api/superuser/papers/bulk-update/",
+                   json={"paper_ids": ids, "submission_year": self.rng.choice([2024, 2025, None])})
+
+    def users_list(self):
+        self._call("users_list", "GET", "/api/users/")
+
+
+def start_virtual_users(base_url, state, controller, researchers, superusers, think_ms, timeout):
+    users = []
+    for i in range(researchers + superusers):
+        superuser = i < superusers  # Superusers are active from the first stage
+        username = ADMIN_USERNAME if superuser else user_name(i - superusers)
+        users.append(VirtualUser(i, superuser, username, base_url, state, controller, think_ms, timeout))
+    for user in users:
+        user.start()
+    return users
+
+
+_SAMPLE = re.compile(r'^(\w+)(?:\{([^}]*)\})? (\S+)$')
+
+
+def server_totals(base_url):
+    """Aggregate request count, time inside Django and DB errors from /api/metrics/."""
+    text = requests.get(base_url + "/api/metrics/", timeout=30).text
+    totals = {"requests": 0.0, "seconds": 0.0, "db_locked": 0.0, "db_errors": 0.0}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.group(1), match.group(2) or "", float(match.group(3))
+        if 'view="metrics"' in labels:
+            continue
+        if name == "papers_request_duration_seconds_count":
+            totals["requests"] += value
+        elif name == "papers_request_duration_seconds_sum":
+            totals["seconds"] += value
+        elif name == "papers_db_errors_total":
+            totals["db_errors"] += value
+            if 'kind="locked"' in labels:
+                totals["db_locked"] += value
+    return totals
+
+
+def _is_error(status):
+    return not isinstance(status, int) or status >= 500
+
+
+def summarize_stage(samples, duration, users, before, after):
+    latencies = [elapsed for _, _, elapsed, _ in samples]
+    statuses = {}
+    for _, _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(1 for *_, status in samples if _is_error(status))
+
+    handled = after["requests"] - before["requests"]
+    server_ms = (after["seconds"] - before["seconds"]) / handled * 1000 if handled else 0.0
+    latency = summarize(latencies)
+    throughput = len(samples) / duration if duration else 0.0
+    return {
+        "virtual_users": users,
+        "duration_s": duration,
+        "requests": len(samples),
+        "throughput_rps": round(throughput, 1),
+        "latency": latency,
+        "status_codes": statuses,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "server_mean_ms": round(server_ms, 2),
+        # Time between the client sending and a worker starting on the request
+        "queue_wait_ms": round(max(0.0, latency["mean_ms"] - server_ms), 2),
+        # Little's law: requests in flight on average
+        "in_flight": round(throughput * latency["mean_ms"] / 1000, 2),
+        "db_lock_errors": int(after["db_locked"] - before["db_locked"]),
+        "db_errors": int(after["db_errors"] - before["db_errors"]),
+    }
+
+
+def find_saturation(stages, workers):
+    """Flag each stage's saturation symptoms; return the first saturated stage."""
+    first = None
+    previous = None
+    for index, stage in enumerate(stages):
+        flags = []
+        if stage["in_flight"] >= workers and stage["queue_wait_ms"] > max(stage["server_mean_ms"], 50):
+            flags.append("worker_exhaustion")
+        if stage["db_lock_errors"]:
+            flags.append("db_locks")
+        if stage["error_rate"] > 0.01:
+            flags.append("errors")
+        if previous and stage["virtual_users"] > previous["virtual_users"]:
+            more_load = stage["virtual_users"] / previous["virtual_users"]
+            gained = stage["throughput_rps"] / previous["throughput_rps"] if previous["throughput_rps"] else 1
+            p95_growth = (stage["latency"]["p95_ms"] / previous["latency"]["p95_ms"]
+                          if previous["latency"]["p95_ms"] else 1)
+            if gained < 1 + 0.25 * (more_load - 1) and p95_growth > 2:
+                flags.append("latency_knee")
+        stage["saturation"] = flags
+        if flags and first is None:
+            first = {"stage": index, "virtual_users": stage["virtual_users"], "symptoms": flags}
+        previous = stage
+    return first
+
+
+def summarize_actions(samples):
+    by_action = {}
+    for _, action, elapsed, status in samples:
+        entry = by_action.setdefault(action, {"latencies": [], "status_codes": {}})
+        entry["latencies"].append(elapsed)
+        entry["status_codes"][str(status)] = entry["status_codes"].get(str(status), 0) + 1
+    return {
+        action: {"latency": summarize(entry["latencies"]), "status_codes": entry["status_codes"]}
+        for action, entry in sorted(by_action.items())
+    }
@@ -0,0 +1,311 @@
+"""
+Request scenarios covering the endpoints in ``papers/urls.py``, and the
+transports that execute them: Django's test client in-process, or HTTP
+against a running server (e.g. a local gunicorn).
+
+Query counts come from the app's own request metrics (``/api/metrics/``,
+see papers/instrumentation.py), sampled before and after each scenario, so
+both transports report them the same way.
+"""
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.urls import resolve
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from papers.models import Paper, Project
+
+from . import summarize
+from .seed import ADMIN_USERNAME, SEED_PASSWORD, user_name
+
+
+class Scenario:
+    """
+    One endpoint call. ``path`` and ``data`` are values or callables taking
+    the per-request context returned by ``prepare(state, i)``, which runs
+    before timing starts (e.g. to create the row a DELETE will remove).
+    """
+
+    def __init__(self, name, method, role, path, data=None, prepare=None, fmt="json"):
+        self.name = name
+        self.method = method
+        self.role = role
+        self._path = path
+        self._data = data
+        self.prepare = prepare or (lambda state, i: {})
+        self.fmt = fmt
+
+    def build(self, ctx):
+        path = self._path(ctx) if callable(self._path) else self._path
+        data = self._data(ctx) if callable(self._data) else self._data
+        return path, data
+
+    def view_name(self, ctx):
+        # resolve() matches the path only; some scenarios carry a query string
+        return resolve(urlsplit(self.build(ctx)[0]).path).view_name
+
+
+def _new_paper(state, i):
+    paper = Paper.objects.create(
+        user=state["user"], doi=f"10.5555/bench.delete.{state['run']}.{i}", title="To delete",
+        author_name="A", journal="J", date="2024",
+    )
+    return {"pk": paper.pk}
+
+
+def _new_project(state, i):
+    project = Project.objects.create(
+        user=state["user"], project_name=f"To delete {state['run']}.{i}", status="Draft",
+    )
+    return {"pk": project.pk}
+
+
+def _new_user(state, i):
+    from django.contrib.auth.models import User
+
+    return {"pk": User.objects.create(username=f"bench-delete-{state['run']}-{i}").pk}
+
+
+def _pick(items):
+    return lambda state, i: {"pk": items(state)[i % len(items(state))], "i": i, "run": state["run"]}
+
+
+def _user_papers(state):
+    return state["user_paper_ids"]
+
+
+def _user_projects(state):
+    return state["user_project_ids"]
+
+
+def _master_copies(state):
+    return state["master_ids"]
+
+
+def _counter(state, i):
+    return {"i": i, "run": state["run"]}
+
+
+SCENARIOS = [
+    Scenario("login", "POST", "anon", "/api/auth/login/",
+             {"username": user_name(0), "password": SEED_PASSWORD}),
+    Scenario("token_verify", "POST", "anon", "/api/auth/token/verify/",
+             lambda ctx: {"token": ctx["access"]},
+             prepare=lambda state, i: {"access": state["tokens"]["user"]}),
+    Scenario("token_refresh", "POST", "anon", "/api/auth/token/refresh/",
+             lambda ctx: {"refresh": ctx["refresh"]},
+             prepare=lambda state, i: {"refresh": str(RefreshToken.for_user(state["user"]))}),
+    Scenario("forgot_password", "POST", "anon", "/api/forgot_password/",
+             {"email": "user0@bench.local"}, fmt="multipart"),
+
+    Scenario("papers_list", "GET", "user", "/api/papers/"),
+    Scenario("paper_create", "POST", "user", "/api/papers/",
+             lambda ctx: {"doi": f"10.5555/bench.create.{ctx['run']}.{ctx['i']}", "title": "Created",
+                          "author_name": "A", "journal": "J", "date": "2024"},
+             prepare=_counter),
+    Scenario("paper_update", "PUT", "user", lambda ctx: f"/api/papers/update/{ctx['pk']}/",
+             lambda ctx: {"title": f"Updated {ctx['run']}.{ctx['i']}"}, prepare=_pick(_user_papers)),
+    Scenario("paper_delete", "DELETE", "user", lambda ctx: f"/api/papers/delete/{ctx['pk']}/",
+             prepare=_new_paper),
+
+    Scenario("projects_list", "GET", "user", "/api/projects/"),
+    Scenario("project_create", "POST", "user", "/api/projects/",
+             lambda ctx: {"project_name": f"Created {ctx['run']}.{ctx['i']}", "status": "Draft"},
+             prepare=_counter),
+    Scenario("project_update", "PUT", "user", lambda ctx: f"/api/projects/update/{ctx['pk']}/",
+             lambda ctx: {"status": "Submitted" if ctx["i"] % 2 else "Draft"}, prepare=_pick(_user_projects)),
+    Scenario("project_delete", "DELETE", "user", lambda ctx: f"/api/projects/delete/{ctx['pk']}/",
+             prepare=_new_project),
+    Scenario("project_funding", "GET", "admin", "/api/projects/funding/?group_by=funding_body,year"),
+    Scenario("project_papers", "GET", "user", lambda ctx: f"/api/projects/{ctx['pk']}/papers/",
+             prepare=_pick(_user_projects)),
+    Scenario("project_paper_counts", "GET", "admin", "/api/projects/paper-counts/"),
+
+    Scenario("doi_info_cached", "POST", "user", "/api/doi-info/", {"doi": "10.5555/cached"}),
+    Scenario("doi_info_uncached", "POST", "user", "/api/doi-info/",
+             lambda ctx: {"doi": f"10.5555/uncached.{ctx['run']}.{ctx['i']}"}, prepare=_counter),
+
+    Scenario("users_list", "GET", "admin", "/api/users/"),
+    Scenario("user_create", "POST", "admin", "/api/users/",
+             lambda ctx: {"username": f"bench-new-{ctx['run']}-{ctx['i']}", "email": "new@bench.local",
+                          "password": SEED_PASSWORD},
+             prepare=_counter),
+    Scenario("user_detail", "GET", "admin", lambda ctx: f"/api/users/{ctx['pk']}/",
+             prepare=lambda state, i: {"pk": state["user"].pk}),
+    Scenario("user_update", "PATCH", "admin", lambda ctx: f"/api/users/{ctx['pk']}/",
+             lambda ctx: {"email": f"user0+{ctx['i']}@bench.local"},
+             prepare=lambda state, i: {"pk": state["users"][1 % len(state["users"])].pk, "i": i}),
+    Scenario("user_delete", "DELETE", "admin", lambda ctx: f"/api/users/{ctx['pk']}/", prepare=_new_user),
+
+    Scenario("chat", "POST", "user", "/api/chat/", {"message": "Hello, can you help me register a paper?"}),
+    Scenario("clear_chat_history", "POST", "user", "/api/clear_chat_history/"),
+
+    Scenario("superuser_papers_list", "GET", "admin", "/api/superuser/papers/"),
+    Scenario("superuser_paper_update", "PUT", "admin", lambda ctx: f"/api/superuser/papers/{ctx['pk']}/",
+             lambda ctx: {"submission_year": 2024}, prepare=_pick(_master_copies)),
+    Scenario("superuser_bulk_update", "POST", "admin", "/api/superuser/papers/bulk-update/",
+             lambda ctx: {"paper_ids": ctx["ids"], "submission_year": 2025},
+             prepare=lambda state, i: {"ids": state["master_ids"][i * 10 % len(state["master_ids"]):][:10]}),
+    Scenario("superuser_stats", "GET", "admin", "/api/superuser/papers/stats/"),
+
+    Scenario("metrics", "GET", "anon", "/api/metrics/"),
+    # /api/events/ is a Server-Sent Events stream served by the ASGI process
+    # and is not a request/response endpoint; it is not benchmarked here.
+]
+
+
+def prepare_state(seeded):
+    """Fixed ids the scenarios rotate through, plus a run id for unique names."""
+    user = seeded["users"][0]
+    return {
+        "run": str(int(time.time() * 1000)),
+        "admin": seeded["admin"],
+        "users": seeded["users"],
+        "user": user,
+        "user_paper_ids": list(Paper.objects.filter(user=user).values_list("pk", flat=True)[:200]),
+        "user_project_ids": list(Project.objects.filter(user=user).values_list("pk", flat=True)[:200]),
+        "master_ids": list(
+            Paper.objects.filter(user=seeded["admin"], is_master_copy=True).values_list("pk", flat=True)[:200]
+        ),
+    }
+
+
+def login_all(transport, state):
+    tokens = {}
+    for role, username in (("user", user_name(0)), ("admin", ADMIN_USERNAME)):
+        status, body = transport.request(None, "POST", "/api/auth/login/",
+                                         {"username": username, "password": SEED_PASSWORD}, "json")
+        if status != 200:
+            raise RuntimeError(f"Login as {username} failed with HTTP {status}")
+        tokens[role] = body["access_token"]
+    transport.tokens = tokens
+    state["tokens"] = tokens
+    return tokens
+
+
+class ClientTransport:
+    """Django test client, in this process. Uses real JWT auth headers."""
+
+    def __init__(self):
+        from rest_framework.test import APIClient
+
+        self._client_class = APIClient
+        self._local = threading.local()
+        self.tokens = {}
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            # Record server errors as 500s, like a real client would see them
+            client = self._local.client = self._client_class(raise_request_exception=False)
+        return client
+
+    def request(self, role, method, path, data, fmt):
+        headers = {}
+        if role in self.tokens:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {self.tokens[role]}"
+        kwargs = {"format": "json"} if fmt == "json" else {}
+        response = getattr(self._client(), method.lower())(path, data, **kwargs, **headers)
+        body = None
+        if response.get("Content-Type", "").startswith("application/json"):
+            body = response.json()
+        return response.status_code, body
+
+    def metrics_text(self):
+        return self._client().get("/api/metrics/").content.decode()
+
+
+class HTTPTransport:
+    """HTTP against ``base_url`` with one keep-alive session per thread."""
+
+    def __init__(self, base_url):
+        import requests
+
+        self._requests = requests
+        self.base_url = base_url.rstrip("/")
+        self._local = threading.local()
+        self.tokens = {}
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._requests.Session()
+        return session
+
+    def request(self, role, method, path, data, fmt):
+        headers = {}
+        if role in self.tokens:
+            headers["Authorization"] = f"Bearer {self.tokens[role]}"
+        kwargs = {"json": data} if fmt == "json" and data is not None else {"data": data}
+        response = self._session().request(method, self.base_url + path, headers=headers, timeout=60, **kwargs)
+        body = None
+        if response.headers.get("Content-Type", "").startswith("application/json"):
+            body = response.json()
+        return response.status_code, body
+
+    def metrics_text(self):
+        return self._session().get(self.base_url + "/api/metrics/", timeout=60).text
+
+
+_SAMPLE = re.compile(r'^(papers_requests_total|papers_db_queries_total)\{([^}]*)\} (\S+)$')
+
+
+def _view_totals(text):
+    """``{view: (requests, db_queries)}`` from the Prometheus exposition."""
+    totals = {}
+    for line in text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, labels, value = match.groups()
+        view = re.search(r'view="([^"]*)"', labels).group(1)
+        requests, queries = totals.get(view, (0, 0))
+        if name == "papers_requests_total":
+            requests += float(value)
+        else:
+            queries += float(value)
+        totals[view] = (requests, queries)
+    return totals
+
+
+def run_scenario(transport, scenario, state, requests, concurrency=1, warmup=1):
+    contexts = [scenario.prepare(state, i) for i in range(warmup + requests)]
+    for ctx in contexts[:warmup]:
+        path, data = scenario.build(ctx)
+        transport.request(scenario.role, scenario.method, path, data, scenario.fmt)
+
+    view = scenario.view_name(contexts[0])
+    before = _view_totals(transport.metrics_text()).get(view, (0, 0))
+
+    def call(ctx):
+        path, data = scenario.build(ctx)
+        start = time.perf_counter()
+        status, _ = transport.request(scenario.role, scenario.method, path, data, scenario.fmt)
+        return time.perf_counter() - start, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(call, contexts[warmup:]))
+    wall = time.perf_counter() - start
+
+    after = _view_totals(transport.metrics_text()).get(view, (0, 0))
+    handled = after[0] - before[0]
+    if scenario.name == "metrics":
+        handled -= 1  # the "before" scrape itself
+
+    samples = [elapsed for elapsed, _ in results]
+    statuses = {}
+    for _, code in results:
+        statuses[str(code)] = statuses.get(str(code), 0) + 1
+    return {
+        "endpoint": f"{scenario.method} {scenario.build(contexts[0])[0]}",
+        "view": view,
+        "status_codes": statuses,
+        "latency": summarize(samples),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else None,
+        "queries_per_request": round((after[1] - before[1]) / handled, 2) if handled > 0 else None,
+    }
+
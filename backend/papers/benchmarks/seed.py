@@ -0,0 +1,66 @@
+"""
+Synthetic data for benchmarks: users with papers (and the superuser's master
+copies), projects and chat history, written with bulk inserts.
+
+Every seeded account has the password ``SEED_PASSWORD``; the hash is computed
+once and shared so seeding thousands of users stays fast.
+"""
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from papers.models import ChatMessage, Paper, Project
+
+SEED_PASSWORD = "bench-password"
+ADMIN_USERNAME = "bench-admin"
+
+
+def user_name(index):
+    return f"bench-user-{index}"
+
+
+def seed(users=10, papers_per_user=50, projects_per_user=5, messages_per_user=20,
+         shared_doi_ratio=0.2, batch_size=2000):
+    """
+    Create the data set and return ``{"admin": User, "users": [User, ...]}``.
+    ``shared_doi_ratio`` of each user's papers reuse DOIs other users also
+    submitted, like co-authored papers do, so master copies are deduplicated.
+    """
+    password = make_password(SEED_PASSWORD)
+    admin = User.objects.create(username=ADMIN_USERNAME, email="admin@bench.local", password=password,
+                                is_superuser=True, is_staff=True)
+    User.objects.bulk_create(
+        [User(username=user_name(i), email=f"user{i}@bench.local", password=password) for i in range(users)],
+        batch_size=batch_size,
+    )
+    seeded_users = list(User.objects.filter(username__startswith="bench-user-").order_by("pk"))
+
+    shared = int(papers_per_user * shared_doi_ratio)
+    papers, masters = [], {}
+    for u, user in enumerate(seeded_users):
+        for i in range(papers_per_user):
+            doi = f"10.5555/shared.{i}" if i < shared else f"10.5555/seed.{u}.{i}"
+            fields = dict(doi=doi, title=f"Seeded paper {doi}", author_name=f"Author {u}",
+                          journal="Journal of Benchmarks", date="2024", publication_type="Article in journal",
+                          additional_authors=["Co Author"])
+            papers.append(Paper(user=user, **fields))
+            masters.setdefault(doi, Paper(user=admin, is_master_copy=True, **fields))
+    Paper.objects.bulk_create(papers, batch_size=batch_size)
+    Paper.objects.bulk_create(masters.values(), batch_size=batch_size)
+
+    Project.objects.bulk_create(
+        [
+            Project(user=user, project_name=f"Project {u}.{i}", status="Draft", pi=f"PI {u}",
+                    funding_body="VR", amount=100000, funding_year=2020 + i % 5,
+                    additional_authors=[])
+            for u, user in enumerate(seeded_users) for i in range(projects_per_user)
+        ],
+        batch_size=batch_size,
+    )
+    ChatMessage.objects.bulk_create(
+        [
+            ChatMessage(user=user, role="user" if i % 2 == 0 else "assistant", content=f"Message {i}")
+            for user in seeded_users for i in range(messages_per_user)
+        ],
+        batch_size=batch_size,
+    )
+    return {"admin": admin, "users": seeded_users}
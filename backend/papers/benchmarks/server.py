@@ -0,0 +1,65 @@
+"""Local gunicorn for HTTP benchmarks, serving the benchmark's throwaway database."""
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import requests
+from django.conf import settings
+from django.db import connection
+
+FAKE_BEDROCK = "papers.benchmarks.stubs.fake_bedrock_client"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def stub_environment(crossref_url):
+    """Environment pointing the app at the local Crossref stub and the fake Bedrock client, unthrottled."""
+    return {
+        "CROSSREF_API_URL": crossref_url,
+        "CROSSREF_RATE_LIMIT": str(10 ** 6),
+        "BEDROCK_CLIENT_FACTORY": FAKE_BEDROCK,
+        "THROTTLE_ENABLED": "0",
+    }
+
+
+def start_gunicorn(env=None, workers=1, threads=1, timeout=120, preload=False):
+    """
+    Start gunicorn on a free loopback port against the current (test)
+    database and return ``(process, base_url)`` once it answers. ``preload``
+    imports the app in the master before forking, as production does.
+    """
+    port = _free_port()
+    full_env = dict(os.environ, SQLITE_PATH=connection.settings_dict["NAME"], **(env or {}))
+    full_env.pop("SQLITE_TEST_PATH", None)
+    connection.close()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--workers", str(workers), "--threads", str(threads),
+         "--timeout", str(timeout), "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+         *(["--preload"] if preload else []), "backend_paper.wsgi:application"],
+        cwd=settings.BASE_DIR, env=full_env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            requests.get(base_url + "/api/metrics/", timeout=5)
+            return process, base_url
+        except requests.RequestException:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("gunicorn did not start")
+            time.sleep(0.2)
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
@@ -0,0 +1,233 @@
+"""
+Local stand-ins for the external services, so benchmarks are repeatable and
+never call Crossref or Bedrock.
+
+``CrossrefStub`` is a real HTTP server on a loopback port (the app's client
+code, sessions and rate limiting all run unchanged) answering every
+``/works/<doi>`` with deterministic metadata after ``latency_ms``; DOIs
+ending in ``missing`` return 404. ``FakeBedrockClient`` mimics
+``invoke_model`` for the chatbot and is selected with
+``BEDROCK_CLIENT_FACTORY = "papers.benchmarks.stubs.fake_bedrock_client"``.
+Its latency (with an optional slow tail) and throttling can be set per
+model and region, to exercise the hedging and failover in papers/llm.py;
+it streams in chunks and can send malformed replies for the repairs in
+papers/chatreply.py.
+"""
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+
+def _work(doi):
+    return {
+        "status": "ok",
+        "message": {
+            "DOI": doi,
+            "title": [f"Benchmark paper {doi}"],
+            "author": [{"given": "Ada", "family": "Lovelace"}, {"given": "Alan", "family": "Turing"}],
+            "issued": {"date-parts": [[2024, 3, 15]]},
+            "publisher": "Benchmark Press",
+            "container-title": ["Journal of Benchmarks"],
+            "type": "journal-article",
+        },
+    }
+
+
+class _CrossrefHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def do_GET(self):
+        time.sleep(self.server.latency)
+        self.server.hits += 1
+        prefix = "/works/"
+        if not self.path.startswith(prefix):
+            return self._send(404, {"status": "error"})
+        doi = unquote(self.path[len(prefix):])
+        if doi.endswith("missing"):
+            return self._send(404, {"status": "error", "message": "Resource not found."})
+        self._send(200, _work(doi))
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CrossrefStub:
+    """Context manager running the stub server; ``url`` is the CROSSREF_API_URL to use."""
+
+    def __init__(self, latency_ms=0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _CrossrefHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency_ms / 1000
+        self.server.hits = 0
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/works/"
+
+    @property
+    def hits(self):
+        return self.server.hits
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+CHAT_REPLY = {
+    "intent": "chitchat",
+    "answer": "Happy to help! Tell me the DOI, title, main author, journal and date of your paper.",
+    "action": "none",
+    "collected_data": {},
+    "missing_fields": [],
+}
+# Models keep talking after the object; a streaming client stops before this
+TRAILER = "\n\nLet me know if there is anything else I can help you with, or if you want to register a project."
+
+
+class FakeThrottlingError(Exception):
+    """Shaped like botocore's ClientError for a ThrottlingException."""
+
+    def __init__(self):
+        super().__init__("Rate exceeded")
+        self.response = {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}
+
+
+def _per_target(spec):
+    """``"model@region=value,model=value"`` -> ``{target: value}``."""
+    entries = (item.split("=", 1) for item in spec.split(",") if "=" in item)
+    return {target.strip(): float(value) for target, value in entries}
+
+
+class FakeBedrockClient:
+    """
+    ``invoke_model`` and ``invoke_model_with_response_stream`` returning a
+    Llama-style generation: a line of prose, the JSON reply, then more prose
+    (which a client that stops the stream early never waits for). The first
+    chunk arrives after ``latency_ms``, a ``tail_ratio`` share of calls takes
+    ``tail_ms`` instead, and every further chunk of ``chunk_chars`` takes
+    ``chunk_ms``. Per-target overrides are keyed by ``model@region`` or model
+    id, and ``throttled`` targets raise a ThrottlingException. A
+    ``malformed_ratio`` share of replies has a broken ``collected_data``;
+    prompts that end in a partial reply get the rest of it.
+    """
+
+    def __init__(self, latency_ms=0, tail_ms=0, tail_ratio=0.0, region=None,
+                 model_latency_ms=None, throttled=(), seed=None, chunk_ms=0, chunk_chars=16, malformed_ratio=0.0):
+        self.latency = latency_ms / 1000
+        self.tail = tail_ms / 1000
+        self.tail_ratio = tail_ratio
+        self.region = region
+        self.model_latency = {target: ms / 1000 for target, ms in (model_latency_ms or {}).items()}
+        self.throttled = set(throttled)
+        self.chunk = chunk_ms / 1000
+        self.chunk_chars = chunk_chars
+        self.malformed_ratio = malformed_ratio
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.continuations = 0
+        self.chunks_sent = 0
+
+    def _lookup(self, mapping, model_id):
+        for target in (f"{model_id}@{self.region}", model_id):
+            if target in mapping:
+                return target
+        return None
+
+    def _first_chunk_latency(self, model_id):
+        self.calls += 1
+        if self._lookup(self.throttled, model_id):
+            time.sleep(0.01)
+            raise FakeThrottlingError()
+        target = self._lookup(self.model_latency, model_id)
+        latency = self.model_latency[target] if target else self.latency
+        if self.tail_ratio and self.random.random() < self.tail_ratio:
+            latency = max(latency, self.tail)
+        return latency
+
+    def _generation(self, body):
+        # A prompt ending in part of the reply (a repair) is continued after it
+        partial = json.loads(body)["prompt"].rsplit("<|end_header_id|>", 1)[-1].strip()
+        if partial.startswith("{"):
+            self.continuations += 1
+            given = json.loads(partial.rstrip(", ") + "}")
+            return json.dumps({k: v for k, v in CHAT_REPLY.items() if k not in given})[1:] + TRAILER
+        reply = json.dumps(CHAT_REPLY)
+        if self.malformed_ratio and self.random.random() < self.malformed_ratio:
+            reply = reply.replace('"collected_data": {}', '"collected_data": {"title": "A" "journal": "B"}')
+        return "Sure.\n" + reply + TRAILER
+
+    def _chunks(self, generation):
+        for start in range(0, len(generation), self.chunk_chars):
+            if start:
+                time.sleep(self.chunk)
+            self.chunks_sent += 1
+            yield generation[start:start + self.chunk_chars]
+
+    def invoke_model(self, modelId, body, **kwargs):
+        time.sleep(self._first_chunk_latency(modelId))
+        generation = "".join(self._chunks(self._generation(body)))
+        return {"body": io.BytesIO(json.dumps({"generation": generation}).encode())}
+
+    def invoke_model_with_response_stream(self, modelId, body, **kwargs):
+        latency = self._first_chunk_latency(modelId)
+        generation = self._generation(body)
+
+        def events():
+            time.sleep(latency)
+            for text in self._chunks(generation):
+                yield {"chunk": {"bytes": json.dumps({"generation": text}).encode()}}
+
+        return {"body": _FakeEventStream(events())}
+
+
+class _FakeEventStream:
+    """Iterable of response-stream events; ``close()`` stops the generator like closing the HTTP stream."""
+
+    def __init__(self, events):
+        self._events = events
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        self._events.close()
+
+
+def fake_bedrock_client(region=None):
+    """
+    BEDROCK_CLIENT_FACTORY target, configured from the environment:
+    BENCH_BEDROCK_LATENCY_MS, BENCH_BEDROCK_TAIL_MS, BENCH_BEDROCK_TAIL_RATIO,
+    BENCH_BEDROCK_MODEL_LATENCY_MS (``model@region=ms,...``),
+    BENCH_BEDROCK_THROTTLED (``model@region,...``), BENCH_BEDROCK_CHUNK_MS and
+    BENCH_BEDROCK_MALFORMED_RATIO.
+    """
+    env = os.environ.get
+    return FakeBedrockClient(
+        latency_ms=float(env("BENCH_BEDROCK_LATENCY_MS", 0)),
+        tail_ms=float(env("BENCH_BEDROCK_TAIL_MS", 0)),
+        tail_ratio=float(env("BENCH_BEDROCK_TAIL_RATIO", 0)),
+        region=region,
+        model_latency_ms=_per_target(env("BENCH_BEDROCK_MODEL_LATENCY_MS", "")),
+        throttled=[target.strip() for target in env("BENCH_BEDROCK_THROTTLED", "").split(",") if target.strip()],
+        chunk_ms=float(env("BENCH_BEDROCK_CHUNK_MS", 0)),
+        malformed_ratio=float(env("BENCH_BEDROCK_MALFORMED_RATIO", 0)),
+    )
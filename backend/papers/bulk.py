@@ -0,0 +1,128 @@
+"""
+Bulk deletes and updates of papers and projects.
+
+The caller names rows by id. ``owned`` narrows them, in one query, to the
+rows the user may change under the single-row views' rule: their own, or
+any row for a superuser. Each operation runs in one transaction and every
+requested id gets a result: ``deleted``/``updated``, ``not_found`` (missing
+or someone else's) or ``invalid`` with the serializer's errors.
+
+Patches of plain fields are validated once and applied with one UPDATE.
+Patches that change a DOI, a project name or a milestone link go through
+the serializer row by row, each in a savepoint, so one conflicting row does
+not undo the others.
+"""
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
+from . import caching
+from .events import publish
+from .models import Paper, Project
+from .serializers import PaperSerializer, ProjectSerializer
+
+KINDS = {
+    # model, serializer, cache invalidation, fields that need per-row handling
+    "paper": (Paper, PaperSerializer, caching.invalidate_papers, {"doi", "milestone_project"}),
+    "project": (Project, ProjectSerializer, caching.invalidate_projects, {"project_name"}),
+}
+
+
+class BulkRequestError(ValueError):
+    pass
+
+
+def parse_ids(data):
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not ids:
+        raise BulkRequestError("ids must be a non-empty list")
+    if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+        raise BulkRequestError("ids must be integers")
+    limit = getattr(settings, "BULK_MAX_IDS", 500)
+    if len(ids) > limit:
+        raise BulkRequestError(f"At most {limit} ids per request")
+    return list(dict.fromkeys(ids))
+
+
+def parse_patch(data):
+    patch = data.get("patch")
+    if not isinstance(patch, dict) or not patch:
+        raise BulkRequestError("patch must be a non-empty object")
+    return patch
+
+
+def owned(model, user, ids):
+    rows = model.objects.filter(pk__in=ids)
+    return rows if user.is_superuser else rows.filter(user=user)
+
+
+def bulk_delete(kind, user, ids):
+    model = KINDS[kind][0]
+    with transaction.atomic():
+        rows = owned(model, user, ids)
+        found = set(rows.values_list("pk", flat=True))
+        # One collector delete: related rows and signals (caches, events) as for single deletes
+        rows.delete()
+    return {
+        "results": [{"id": pk, "status": "deleted" if pk in found else "not_found"} for pk in ids],
+        "deleted": len(found),
+        "not_found": len(ids) - len(found),
+    }
+
+
+def bulk_update(kind, user, ids, patch, request=None):
+    model, serializer_class, invalidate, per_row_fields = KINDS[kind]
+    context = {"request": request}
+
+    with transaction.atomic():
+        rows = {row.pk: row for row in owned(model, user, ids).select_related("user")}
+        if per_row_fields & set(patch):
+            extra = _update_rows(serializer_class, rows, patch, context)
+        elif not rows:
+            extra = {}
+        else:
+            # Plain fields validate the same for every row; check against one of them
+            check = serializer_class(next(iter(rows.values())), data=patch, partial=True, context=context)
+            if not check.is_valid():
+                raise BulkRequestError(check.errors)
+            fields = check.validated_data
+            if fields:
+                model.objects.filter(pk__in=list(rows)).update(**fields)
+                # .update() bypasses post_save, so refresh caches and announce per owner
+                owners = {}
+                for row in rows.values():
+                    owners.setdefault(row.user_id, []).append(row.pk)
+                invalidate(*owners)
+                for owner_id, pks in owners.items():
+                    publish(kind, "bulk_updated", None, owner_id, {"ids": pks, "fields": sorted(fields)})
+            refreshed = model.objects.filter(pk__in=list(rows)).select_related("user")
+            extra = {row.pk: {"data": serializer_class(row, context=context).data} for row in refreshed}
+
+    updated = {pk for pk, result in extra.items() if "data" in result}
+    results = [
+        {"id": pk, "status": "updated" if pk in updated else ("invalid" if pk in extra else "not_found"),
+         **extra.get(pk, {})}
+        for pk in ids
+    ]
+    return {
+        "results": results,
+        "updated": len(updated),
+        "invalid": len(extra) - len(updated),
+        "not_found": len(ids) - len(extra),
+    }
+
+
+def _update_rows(serializer_class, rows, patch, context):
+    extra = {}
+    for pk, row in rows.items():
+        serializer = serializer_class(row, data=patch, partial=True, context=context)
+        if not serializer.is_valid():
+            extra[pk] = {"errors": serializer.errors}
+            continue
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            extra[pk] = {"errors": {"non_field_errors": ["Conflicts with an existing entry."]}}
+            continue
+        extra[pk] = {"data": serializer.data}
+    return extra
@@ -0,0 +1,128 @@
+"""
+Cached serialized list responses for the papers app.
+
+Entries are grouped in namespaces (per user and global, for papers and for
+projects). Each namespace has a version token stored in the cache; entry keys
+embed the current tokens, so invalidating a namespace is a single ``set`` and
+stale entries simply age out. Model signals invalidate on commit; code paths
+that write with ``QuerySet.update()`` must call the helpers below themselves.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .routers import current_read_alias
+
+CACHE_ALIAS = getattr(settings, "PAPERS_CACHE_ALIAS", "default")
+CACHE_TIMEOUT = getattr(settings, "PAPERS_CACHE_TIMEOUT", 300)
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+# Included in every entry; bumping it drops the whole cache
+GLOBAL_NS = "global"
+
+
+def papers_ns(user_id=None):
+    return f"papers:user:{user_id}" if user_id is not None else "papers:all"
+
+
+def projects_ns(user_id=None):
+    return f"projects:user:{user_id}" if user_id is not None else "projects:all"
+
+
+def _version_keys(namespaces):
+    return [f"papers-cache:ns:{ns}" for ns in namespaces]
+
+
+def _versions(namespaces):
+    cache = _cache()
+    keys = _version_keys(namespaces)
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [str(found[key]) for key in keys]
+
+
+def get_or_build(namespaces, key_parts, builder):
+    """
+    Return the cached value for ``key_parts`` in ``namespaces``, calling
+    ``builder()`` and storing its result on a miss.
+    """
+    namespaces = [GLOBAL_NS, *namespaces]
+    raw = "|".join(map(str, namespaces)) + "|" + "|".join(_versions(namespaces))
+    # Replica and primary reads may differ while the replica lags
+    raw += "|" + current_read_alias() + "|" + "|".join(map(str, key_parts))
+    key = "papers-cache:entry:" + hashlib.sha1(raw.encode()).hexdigest()
+
+    cache = _cache()
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, CACHE_TIMEOUT)
+    return value
+
+
+def invalidate(*namespaces):
+    """Bump the version of every namespace once the current transaction commits."""
+    keys = _version_keys(namespaces)
+
+    def _bump():
+        token = time.time_ns()
+        _cache().set_many({key: token for key in keys}, None)
+
+    transaction.on_commit(_bump)
+
+
+def invalidate_all():
+    invalidate(GLOBAL_NS)
+
+
+def invalidate_papers(*user_ids):
+    invalidate(papers_ns(), *[papers_ns(user_id) for user_id in set(user_ids)])
+
+
+def invalidate_projects(*user_ids):
+    invalidate(projects_ns(), *[projects_ns(user_id) for user_id in set(user_ids)])
+
+
+SUPERUSER_KEY = "papers-cache:superuser-id"
+
+
+def superuser_id():
+    """
+    Id of the superuser who owns the master copies, or None. Cached until any
+    user is saved or deleted (see signals.py), so paper creation does not
+    look it up on every request.
+    """
+    from django.contrib.auth.models import User
+
+    cached = _cache().get(SUPERUSER_KEY)
+    if cached is None:
+        cached = (
+            User.objects.filter(is_superuser=True).order_by("pk")
+            .values_list("pk", flat=True).first()
+        ) or 0
+        _cache().set(SUPERUSER_KEY, cached, None)
+    return cached or None
+
+
+def invalidate_superuser():
+    transaction.on_commit(lambda: _cache().delete(SUPERUSER_KEY))
+
+
+def invalidate_papers_for_dois(dois):
+    """Invalidate every user holding a copy of one of ``dois`` (bulk update paths)."""
+    from .dois import normalize_doi
+    from .models import Paper
+
+    keys = [normalize_doi(doi) for doi in dois]
+    user_ids = Paper.objects.filter(doi_key__in=keys).values_list("user_id", flat=True).distinct()
+    invalidate_papers(*user_ids)
@@ -0,0 +1,153 @@
+"""
+Incremental parsing of the chatbot's JSON reply.
+
+The model is asked for one object with ``intent``, ``answer``, ``action``,
+``collected_data`` and ``missing_fields``, usually wrapped in some prose.
+``ReplyParser`` is fed the generation as it streams (``llm.generate`` reads
+Bedrock's response stream) and scans it once, character by character:
+
+- Each top-level member is parsed and checked against the schema as soon as
+  it ends, so a bad ``action`` stops the generation there instead of after
+  the full reply.
+- ``feed`` returns True once the object closes, and the caller stops the
+  stream: trailing prose is never generated.
+- Common slips are repaired in place: trailing commas and raw newlines in
+  strings. A member that still does not parse, or a reply cut off mid-object,
+  leaves the members validated so far; ``resume()`` returns them as a prefix
+  for the assistant turn, so the retry only generates the rest.
+"""
+import json
+import re
+
+from .llm import InvalidOutput
+
+INTENTS = {"chitchat", "register_project", "register_paper", "collect_info"}
+ACTIONS = {"none", "register_project", "register_paper", "ask_for_info"}
+REQUIRED = ("intent", "answer", "action")
+DEFAULTS = {"collected_data": dict, "missing_fields": list}
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def _check(key, value):
+    """Why ``key: value`` breaks the reply schema, or None."""
+    if key == "intent" and value not in INTENTS:
+        return f"unknown intent {value!r}"
+    if key == "action" and value not in ACTIONS:
+        return f"unknown action {value!r}"
+    if key == "answer" and not isinstance(value, str):
+        return "answer is not a string"
+    if key == "collected_data" and not isinstance(value, dict):
+        return "collected_data is not an object"
+    if key == "missing_fields" and not (isinstance(value, list) and all(isinstance(f, str) for f in value)):
+        return "missing_fields is not a list of strings"
+    return None
+
+
+def _load_member(text):
+    """``{key: value}`` for one ``"key": value`` member, repairing what it can."""
+    for candidate in (text, _TRAILING_COMMA.sub(r"\1", text)):
+        try:
+            # strict=False: the model often puts raw newlines inside answer strings
+            member = json.loads("{" + candidate + "}", strict=False)
+        except json.JSONDecodeError:
+            continue
+        return member
+    return None
+
+
+class ReplyParser:
+    """Feed it generation chunks; ``result()`` is the validated reply dict."""
+
+    def __init__(self):
+        self.members = {}
+        self.error = None
+        self.done = False
+        self._started = False
+        self._restart("{")
+
+    def _restart(self, prefix):
+        self._text = [prefix]
+        self._length = len(prefix)
+        self._member_start = self._length
+        self._depth = 1
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        """Consume ``chunk``; True once no more text is needed (object closed or reply invalid)."""
+        if self.done or self.error:
+            return True
+        for char in chunk:
+            if not self._started:
+                self._started = char == "{"  # Prose before the object is skipped
+                continue
+            self._text.append(char)
+            self._length += 1
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._end_member()
+                    self.done = self.error is None
+                    return True
+            elif char == "," and self._depth == 1:
+                self._end_member()
+                if self.error:
+                    return True
+        return False
+
+    def _end_member(self):
+        text = "".join(self._text)
+        member = text[self._member_start:self._length - 1]
+        self._member_start = self._length
+        if not member.strip():
+            return  # "{}" or a trailing comma before "}"
+        parsed = _load_member(member)
+        if parsed is None:
+            self.error = f"malformed member {member.strip()[:80]!r}"
+            return
+        for key, value in parsed.items():
+            problem = _check(key, value)
+            if problem:
+                self.error = problem
+                return
+            self.members[key] = value
+
+    def result(self):
+        """The reply as a dict; raises InvalidOutput when it is incomplete or breaks the schema."""
+        if self.error:
+            raise InvalidOutput(self.error)
+        if not self.done:
+            raise InvalidOutput("reply ended before its JSON object closed" if self._started
+                                else "no JSON object in reply")
+        missing = [key for key in REQUIRED if key not in self.members]
+        if missing:
+            raise InvalidOutput(f"reply lacks {', '.join(missing)}")
+        return {**{key: factory() for key, factory in DEFAULTS.items()}, **self.members}
+
+    def resume(self):
+        """
+        Text to append to the prompt so the model continues after the last
+        valid member, or None when there is nothing worth keeping. The parser
+        is reset to read that continuation.
+        """
+        if not self._started or not self.members:
+            return None
+        if self.done and all(key in self.members for key in REQUIRED):
+            return None
+        prefix = json.dumps(self.members)[:-1] + ", "
+        self.error = None
+        self.done = False
+        self._restart(prefix)
+        return prefix
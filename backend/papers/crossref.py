@@ -0,0 +1,205 @@
+"""
+Crossref client shared by the DOI lookup endpoint and the enrichment jobs.
+
+``lookup_doi`` is the entry point: it serves results from the shared cache
+(``CROSSREF_CACHE_TIMEOUT``; "not found" answers are kept for a day) and only
+calls ``fetch_doi_metadata`` on a miss. Outbound requests are throttled so all
+processes together stay within Crossref's published limits: at most
+``CROSSREF_RATE_LIMIT`` requests per second (counted in the shared cache) and
+``CROSSREF_MAX_CONCURRENCY`` in flight per process. A 429/503 answer pauses
+every caller for the ``Retry-After`` period.
+
+Only the enrichment worker waits for a slot. Request handlers pass
+``block=False`` and get ``CrossrefBusy`` instead, so a pause or a full rate
+window never ties up a sync gunicorn worker.
+"""
+import math
+import hashlib
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from .dois import clean_doi, normalize_doi
+from .instrumentation import track_outbound
+
+MAX_CONCURRENCY = getattr(settings, "CROSSREF_MAX_CONCURRENCY", 3)
+CACHE_TIMEOUT = getattr(settings, "CROSSREF_CACHE_TIMEOUT", 7 * 24 * 3600)
+NOT_FOUND_TIMEOUT = 24 * 3600
+REQUEST_TIMEOUT = getattr(settings, "CROSSREF_TIMEOUT", 10)
+BACKOFF_KEY = "crossref:backoff-until"
+
+_in_flight = threading.BoundedSemaphore(MAX_CONCURRENCY)
+_local = threading.local()
+
+
+def _base_url():
+    # Read per call so benchmarks can point the client at a local stub
+    return getattr(settings, "CROSSREF_API_URL", "https://api.crossref.org/works/")
+
+
+def _session():
+    # One keep-alive session per thread (requests.Session is not thread-safe)
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+        mailto = getattr(settings, "CROSSREF_MAILTO", "")
+        agent = "dtcc-tracker/1.0"
+        if mailto:
+            # Identified clients are routed to Crossref's "polite" pool
+            agent += f" (mailto:{mailto})"
+        session.headers["User-Agent"] = agent
+    return session
+
+
+class CrossrefBusy(Exception):
+    """No request slot is free right now (``block=False``); retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after, paused):
+        super().__init__(f"Crossref is {'pausing requests' if paused else 'at its rate limit'}")
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.paused = paused  # Crossref asked us to back off, rather than our own budget being spent
+
+
+def _acquire_slot(block=True):
+    """Wait until a request fits in the shared per-second budget, or raise CrossrefBusy unless ``block``."""
+    while True:
+        now = time.time()
+        paused_until = cache.get(BACKOFF_KEY)
+        if paused_until and paused_until > now:
+            if not block:
+                raise CrossrefBusy(paused_until - now, paused=True)
+            time.sleep(min(paused_until - now, 30))
+            continue
+        window = int(now)
+        key = f"crossref:rate:{window}"
+        cache.add(key, 0, 5)
+        try:
+            count = cache.incr(key)
+        except ValueError:  # expired between add() and incr()
+            continue
+        if count <= getattr(settings, "CROSSREF_RATE_LIMIT", 5):
+            return
+        if not block:
+            raise CrossrefBusy(window + 1 - now, paused=False)
+        time.sleep(window + 1 - now)
+
+
+def _cache_key(doi):
+    return "crossref:doi:" + hashlib.sha1(normalize_doi(doi).encode()).hexdigest()
+
+
+def lookup_doi(doi, refresh=False, block=True):
+    """
+    Metadata for ``doi`` in the ``fetch_doi_metadata`` format, from the cache
+    when possible. Errors carry ``"not_found": True`` when Crossref does not
+    know the DOI; other errors are transient and not cached. With
+    ``block=False`` a cache miss raises CrossrefBusy instead of waiting.
+    """
+    doi = clean_doi(doi)
+    key = _cache_key(doi)
+    if not refresh:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    try:
+        metadata = fetch_doi_metadata(doi, block=block)
+    except requests.RequestException as e:
+        return {"error": f"Failed to fetch metadata for DOI {doi}: {e}"}
+
+    if "error" not in metadata:
+        cache.set(key, metadata, CACHE_TIMEOUT)
+    elif metadata.get("not_found"):
+        cache.set(key, metadata, NOT_FOUND_TIMEOUT)
+    return metadata
+
+
+def fetch_doi_metadata(doi, block=True):
+    """Fetch metadata for a given DOI from Crossref API."""
+    _acquire_slot(block)
+    with _in_flight, track_outbound("crossref"):
+        response = _session().get(_base_url() + doi, timeout=REQUEST_TIMEOUT)
+
+    if response.status_code in (429, 503):
+        retry_after = response.headers.get("Retry-After", "")
+        pause = int(retry_after) if retry_after.isdigit() else 10
+        cache.set(BACKOFF_KEY, time.time() + pause, pause + 1)
+
+    if response.status_code == 200:
+        data = response.json()
+        if 'message' in data:
+            message = data['message']
+
+            title = message.get('title', ['N/A'])[0]
+            authors_data = message.get('author', [])
+
+            if authors_data:
+                main_author = f"{authors_data[0].get('given', 'N/A')} {authors_data[0].get('family', 'N/A')}"
+                additional_authors = [
+                    f"{author.get('given', 'N/A')} {author.get('family', 'N/A')}"
+                    for author in authors_data[1:]
+                ]
+            else:
+                main_author = "N/A"
+                additional_authors = []
+
+            published_date = "N/A"
+            if 'issued' in message and 'date-parts' in message['issued']:
+                date_parts = message['issued']['date-parts'][0]
+                published_date = "-".join(map(str, date_parts))
+
+            publisher = message.get('publisher', 'N/A')
+            journal = message.get('container-title', ['N/A'])[0]
+            
+            # Map Crossref type to your publication type categories
+            def get_publication_type(crossref_type):
+                """Map Crossref type to publication type categories."""
+                type_mapping = {
+                    'journal-article': 'Article in journal',
+                    'monograph': 'Monograph',
+                    'book': 'Monograph',
+                    'book-chapter': 'Monograph',
+                    'proceedings-article': 'Conference proceedings',
+                    'paper-conference': 'Conference proceedings',
+                    'book-part': 'Monograph',
+                    'reference-entry': 'Monograph',
+                    'dataset': 'other',
+                    'component': 'other',
+                    'report': 'other',
+                    'thesis': 'other',
+                    'dissertation': 'other',
+                    'posted-content': 'other',
+                    'preprint': 'other',
+                    'standard': 'other',
+                    'peer-review': 'other',
+                    'editorial': 'other',
+                    'review': 'other',
+                    'other': 'other'
+                }
+                return type_mapping.get(crossref_type, 'other')
+            
+            crossref_type = message.get('type', 'other')
+            publication_type = get_publication_type(crossref_type)
+
+            metadata = {
+                "Title": title,
+                "Authors": {
+                    "Main Author": main_author,
+                    "Additional Authors": additional_authors
+                },
+                "PublishedOn": published_date,
+                "Publisher": publisher,
+                "DOI": doi,
+                "Journal": journal,
+                "PublicationType": publication_type
+            }
+            return metadata
+        else:
+            return {"error": "Invalid response structure from Crossref API."}
+    elif response.status_code == 404:
+        return {"error": f"DOI {doi} was not found in Crossref.", "not_found": True}
+    else:
+        return {"error": f"Failed to fetch metadata for DOI {doi}. HTTP Status: {response.status_code}"}
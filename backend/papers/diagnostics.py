@@ -0,0 +1,51 @@
+"""
+Opt-in request tracing for the paper create/list endpoints.
+
+Enabled with ``PAPERS_DIAGNOSTICS = True`` (or the ``PAPERS_DIAGNOSTICS``
+environment variable). When disabled, views skip every call in this module,
+so normal requests do no extra queries or logging. When enabled, row dumps
+are capped at ``PAPERS_DIAGNOSTICS_MAX_ROWS`` so tracing stays bounded even on
+large tables.
+"""
+import logging
+
+from django.conf import settings
+
+from .models import Paper
+
+logger = logging.getLogger("papers.diagnostics")
+
+
+def enabled():
+    return getattr(settings, "PAPERS_DIAGNOSTICS", False)
+
+
+def _max_rows():
+    return getattr(settings, "PAPERS_DIAGNOSTICS_MAX_ROWS", 50)
+
+
+def trace(message, request):
+    logger.info(f"[{request.method} {request.path}] user={request.user.username}: {message}")
+
+
+def _dump(papers, request):
+    limit = _max_rows()
+    rows = list(
+        papers.order_by("-id").values_list("id", "doi", "user__username", "is_master_copy")[:limit + 1]
+    )
+    for paper_id, doi, username, is_master_copy in rows[:limit]:
+        trace(f"Paper ID: {paper_id}, DOI: {doi}, User: {username}, is_master_copy: {is_master_copy}", request)
+    if len(rows) > limit:
+        trace(f"... more rows omitted (PAPERS_DIAGNOSTICS_MAX_ROWS={limit})", request)
+
+
+def trace_paper_list(request, papers):
+    trace(f"is_superuser={request.user.is_superuser}, listing {papers.count()} papers", request)
+    _dump(Paper.objects.filter(user=request.user), request)
+
+
+def trace_paper_created(request, paper):
+    trace(f"Request data: {request.data}", request)
+    trace(f"Paper saved successfully: {paper.id}", request)
+    # Every copy of this DOI (the user's paper and its master copy)
+    _dump(Paper.objects.filter(doi_key=paper.doi_key), request)
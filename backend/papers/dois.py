@@ -0,0 +1,34 @@
+"""
+Canonical DOI forms.
+
+DOIs arrive as ``10.1000/ABC``, ``https://doi.org/10.1000/abc``,
+``doi:10.1000/abc`` or percent-encoded (the frontend's ``papers/[doi]`` route
+unquotes them). ``clean_doi`` strips resolver prefixes, encoding and
+whitespace but keeps the registrant's casing for display; ``normalize_doi``
+also lowercases, since DOIs are case-insensitive. Papers store both forms:
+``doi`` and the indexed ``doi_key`` used for every lookup, the per-user
+uniqueness constraint and the master copy joins.
+"""
+import re
+from urllib.parse import unquote
+
+_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+
+
+def clean_doi(value):
+    """``value`` without resolver prefix, percent-encoding or surrounding whitespace."""
+    doi = (value or "").strip()
+    for _ in range(2):  # Doubly encoded values (%252F) come from re-quoted route params
+        if "%" not in doi:
+            break
+        doi = unquote(doi)
+    while True:
+        stripped = _PREFIX.sub("", doi).strip()
+        if stripped == doi:
+            return doi
+        doi = stripped
+
+
+def normalize_doi(value):
+    """The comparison key for ``value``: cleaned and lowercased."""
+    return clean_doi(value).lower()
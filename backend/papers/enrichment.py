@@ -0,0 +1,160 @@
+"""
+Crossref re-validation of stored paper metadata.
+
+Each DOI is resolved once (through the cached, rate-limited client in
+papers/crossref.py) and compared with every stored copy of that paper:
+
+- blank ``journal``/``date``/``publication_type`` fields are filled in
+- stored values that disagree with Crossref are recorded in
+  ``metadata_conflicts`` as ``{field: {"stored": ..., "crossref": ...}}``
+  for a superuser to review; they are never overwritten
+- ``metadata_checked_at`` is stamped, which is what makes batch runs resumable
+
+Runs after a paper is created (the ``enrich_paper_metadata`` job) and
+periodically over all papers (``manage.py enrich_papers``).
+"""
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.utils import timezone
+
+from . import caching
+from .crossref import MAX_CONCURRENCY, lookup_doi
+from .dois import normalize_doi
+from .models import Paper
+
+logger = logging.getLogger(__name__)
+
+# Paper field -> key in the Crossref metadata dict
+FIELDS = {
+    "journal": "Journal",
+    "date": "PublishedOn",
+    "publication_type": "PublicationType",
+}
+
+_MISSING = ("", "n/a", "none", "unknown")
+
+
+def _blank(value):
+    return value is None or str(value).strip().lower() in _MISSING
+
+
+def _normalize_text(value):
+    value = str(value).casefold().replace("&", " and ")
+    value = re.sub(r"[^\w\s]", " ", value)
+    value = re.sub(r"^the\s+", "", value.strip())
+    return " ".join(value.split())
+
+
+def _date_parts(value):
+    value = str(value).strip()
+    match = re.fullmatch(r"(\d{4})(?:[-/.](\d{1,2})(?:[-/.](\d{1,2}))?)?", value)
+    if match:
+        return [int(part) for part in match.groups() if part]
+    year = re.search(r"\b(1[89]\d{2}|2\d{3})\b", value)
+    return [int(year.group(1))] if year else None
+
+
+def _agrees(field, stored, remote):
+    if field == "date":
+        stored_parts, remote_parts = _date_parts(stored), _date_parts(remote)
+        if stored_parts is None or remote_parts is None:
+            return True  # Not comparable; leave it alone rather than flag noise
+        # "2024" and "2024-3-15" agree; "2023" and "2024-3-15" do not
+        common = min(len(stored_parts), len(remote_parts))
+        return stored_parts[:common] == remote_parts[:common]
+    if field == "publication_type" and remote == "other":
+        return True  # Crossref's catch-all carries no information
+    return _normalize_text(stored) == _normalize_text(remote)
+
+
+def diff_metadata(paper, metadata):
+    """Return ``(fills, conflicts)`` for ``paper`` against Crossref ``metadata``."""
+    fills, conflicts = {}, {}
+    for field, key in FIELDS.items():
+        remote = metadata.get(key)
+        if _blank(remote):
+            continue
+        stored = getattr(paper, field)
+        if _blank(stored):
+            fills[field] = remote
+        elif not _agrees(field, stored, remote):
+            conflicts[field] = {"stored": stored, "crossref": remote}
+    return fills, conflicts
+
+
+def apply_metadata(papers, metadata, checked_at=None):
+    """
+    Reconcile every copy in ``papers`` (all sharing one DOI) with ``metadata``.
+    Returns ``{"filled": n, "conflicts": n}``.
+    """
+    checked_at = checked_at or timezone.now()
+    counts = {"filled": 0, "conflicts": 0}
+    stamp_only = {}
+
+    for paper in papers:
+        if metadata.get("not_found"):
+            fills, conflicts = {}, {"doi": {"stored": paper.doi, "crossref": None}}
+        else:
+            fills, conflicts = diff_metadata(paper, metadata)
+        counts["filled"] += bool(fills)
+        counts["conflicts"] += bool(conflicts)
+
+        if not fills and conflicts == paper.metadata_conflicts:
+            stamp_only[paper.pk] = paper.user_id
+            continue
+        # Visible change: save() so the list caches and event stream hear about it
+        for field, value in fills.items():
+            setattr(paper, field, value)
+        paper.metadata_conflicts = conflicts
+        paper.metadata_checked_at = checked_at
+        paper.save(update_fields=[*fills, "metadata_conflicts", "metadata_checked_at"])
+
+    if stamp_only:
+        Paper.objects.filter(pk__in=list(stamp_only)).update(metadata_checked_at=checked_at)
+        # .update() bypasses post_save
+        caching.invalidate_papers(*stamp_only.values())
+    return counts
+
+
+def enrich_doi(doi, refresh=False):
+    """
+    Resolve ``doi`` and reconcile all stored copies. Raises on transient
+    Crossref errors so callers (the job queue) can retry.
+    """
+    metadata = lookup_doi(doi, refresh=refresh)
+    if "error" in metadata and not metadata.get("not_found"):
+        raise RuntimeError(metadata["error"])
+    return apply_metadata(list(Paper.objects.filter(doi_key=normalize_doi(doi))), metadata)
+
+
+def enrich_batch(dois, refresh=False, workers=None):
+    """
+    Resolve ``dois`` concurrently (bounded by the Crossref limits) and apply
+    the results. DOIs that hit transient errors are left unstamped so the
+    next run picks them up. Returns aggregate counts.
+    """
+    totals = {"checked": 0, "filled": 0, "conflicts": 0, "errors": 0}
+    if not dois:
+        return totals
+
+    workers = workers or MAX_CONCURRENCY
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda doi: (doi, lookup_doi(doi, refresh=refresh)), dois))
+
+    papers_by_key = {}
+    for paper in Paper.objects.filter(doi_key__in=[normalize_doi(doi) for doi in dois]):
+        papers_by_key.setdefault(paper.doi_key, []).append(paper)
+
+    checked_at = timezone.now()
+    for doi, metadata in results:
+        if "error" in metadata and not metadata.get("not_found"):
+            logger.warning(f"Metadata enrichment skipped {doi}: {metadata['error']}")
+            totals["errors"] += 1
+            continue
+        counts = apply_metadata(papers_by_key.get(normalize_doi(doi), []), metadata, checked_at)
+        totals["checked"] += 1
+        totals["filled"] += counts["filled"]
+        totals["conflicts"] += counts["conflicts"]
+    return totals
@@ -0,0 +1,214 @@
+"""
+Change notifications for the admin dashboard.
+
+Writers (any gunicorn worker) call ``publish`` which appends a ``ChangeEvent``
+row once the surrounding transaction commits. The ASGI process runs a single
+``EventBroker`` that tails that table and fans new rows out to every connected
+Server-Sent Events client, so the number of database polls does not grow with
+the number of open dashboards.
+
+Browsers' EventSource cannot send an Authorization header, so a stream is
+opened with a ticket from ``issue_ticket``: random, valid for
+EVENT_STREAM_TICKET_SECONDS and good for one connection. Unlike the access
+token, it is worthless once it shows up in an access log.
+"""
+import asyncio
+import json
+import logging
+import secrets
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .caching import CACHE_ALIAS
+from .models import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = getattr(settings, "EVENT_STREAM_POLL_INTERVAL", 1.0)
+HEARTBEAT_INTERVAL = getattr(settings, "EVENT_STREAM_HEARTBEAT", 15.0)
+RETENTION = timedelta(hours=getattr(settings, "EVENT_STREAM_RETENTION_HOURS", 24))
+REPLAY_LIMIT = getattr(settings, "EVENT_STREAM_REPLAY_LIMIT", 500)
+QUEUE_SIZE = getattr(settings, "EVENT_STREAM_QUEUE_SIZE", 1000)
+TICKET_TTL = getattr(settings, "EVENT_STREAM_TICKET_SECONDS", 30)
+
+
+def _ticket_key(ticket):
+    return f"papers-events:ticket:{ticket}"
+
+
+def issue_ticket(user):
+    """A single-use ticket for opening one event stream as ``user``."""
+    ticket = secrets.token_urlsafe(32)
+    caches[CACHE_ALIAS].set(_ticket_key(ticket), user.pk, TICKET_TTL)
+    return ticket
+
+
+def redeem_ticket(ticket):
+    """The id of the user ``ticket`` was issued to, or None; each ticket works once."""
+    cache = caches[CACHE_ALIAS]
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    # delete() is True for only one of several concurrent redemptions
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def publish(model, action, object_id=None, owner_id=None, payload=None):
+    """Record a change event after the current transaction commits."""
+    def _write():
+        try:
+            ChangeEvent.objects.create(
+                model=model,
+                action=action,
+                object_id=object_id,
+                owner_id=owner_id,
+                payload=payload or {},
+            )
+        except Exception as e:
+            # Notifications must never break the write that triggered them
+            logger.error(f"Error publishing change event {model}.{action}: {e}")
+
+    transaction.on_commit(_write)
+
+
+def serialize_event(event):
+    return {
+        "id": event.id,
+        "type": f"{event.model}.{event.action}",
+        "object_id": event.object_id,
+        "owner_id": event.owner_id,
+        "data": event.payload,
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+def format_sse(event):
+    """Encode a serialized event as a single SSE frame."""
+    return (
+        f"id: {event['id']}\n"
+        f"event: {event['type']}\n"
+        f"data: {json.dumps(event)}\n\n"
+    )
+
+
+def _fetch_after(cursor, limit):
+    events = ChangeEvent.objects.order_by("id")
+    if cursor is not None:
+        events = events.filter(id__gt=cursor)
+    return [serialize_event(e) for e in events[:limit]]
+
+
+def _latest_id():
+    return ChangeEvent.objects.order_by("-id").values_list("id", flat=True).first()
+
+
+def prune():
+    """
+    Delete events older than RETENTION; returns the count. Called by the job
+    worker and ``manage.py prune_change_events`` as well as the broker, which
+    only polls while a dashboard is connected.
+    """
+    return ChangeEvent.objects.filter(created_at__lt=timezone.now() - RETENTION).delete()[0]
+
+
+class EventBroker:
+    """
+    In-process fan-out of the change log to SSE subscribers.
+
+    One polling task runs while at least one client is connected; each client
+    gets a bounded queue. A client that falls ``QUEUE_SIZE`` events behind is
+    disconnected and will resume through ``Last-Event-ID`` when it reconnects.
+    """
+
+    def __init__(self):
+        self._subscribers = set()
+        self._task = None
+        self._cursor = None
+        self._last_prune = None
+        self._lock = None
+
+    async def subscribe(self, last_event_id=None):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._running():
+                self._cursor = await sync_to_async(_latest_id)()
+            missed = []
+            if last_event_id is not None:
+                # Replay what the client missed while disconnected
+                missed = await sync_to_async(_fetch_after)(last_event_id, REPLAY_LIMIT)
+
+            queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+            for event in missed:
+                if self._cursor is not None and event["id"] <= self._cursor:
+                    queue.put_nowait(event)
+            self._subscribers.add(queue)
+            if not self._running():
+                self._task = asyncio.create_task(self._run())
+            return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    def is_subscribed(self, queue):
+        return queue in self._subscribers
+
+    def _running(self):
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                events = await sync_to_async(_fetch_after)(self._cursor, QUEUE_SIZE)
+                if events:
+                    self._cursor = events[-1]["id"]
+                    self._dispatch(events)
+                await self._maybe_prune()
+            except Exception as e:
+                logger.error(f"Error polling change events: {e}")
+            await asyncio.sleep(POLL_INTERVAL)
+
+    def _dispatch(self, events):
+        for queue in list(self._subscribers):
+            for event in events:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Slow consumer: drop it instead of buffering without bound
+                    self._subscribers.discard(queue)
+                    break
+
+    async def _maybe_prune(self):
+        now = timezone.now()
+        if self._last_prune is None or now - self._last_prune > timedelta(minutes=10):
+            self._last_prune = now
+            await sync_to_async(prune)()
+
+
+broker = EventBroker()
+
+
+async def stream_events(last_event_id=None):
+    """Async iterator of SSE frames for one connected client."""
+    queue = await broker.subscribe(last_event_id)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                if not broker.is_subscribed(queue):
+                    return
+                yield ": keepalive\n\n"
+                continue
+            yield format_sse(event)
+            if queue.empty() and not broker.is_subscribed(queue):
+                return
+    finally:
+        broker.unsubscribe(queue)
@@ -0,0 +1,129 @@
+"""
+Project funding amounts: parsing legacy free-text amounts and SQL aggregates
+for the funding dashboards.
+
+Amounts used to be stored as strings ("1 500 000", "2,5 MSEK", "€300k").
+``parse_amount`` turns such text into ``(Decimal, currency, note)``; it is
+used by ``manage.py funding_amount_report`` (migration 0011 has its own
+frozen copy).
+Totals are only ever summed within one currency.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, Sum
+
+DEFAULT_CURRENCY = "SEK"
+CURRENCIES = (("SEK", "SEK"), ("EUR", "EUR"), ("USD", "USD"), ("GBP", "GBP"))
+
+# Checked in order; the first match wins
+_CURRENCY_MARKERS = (
+    ("EUR", ("€", "eur")),
+    ("USD", ("$", "usd")),
+    ("GBP", ("£", "gbp")),
+    ("SEK", ("sek", "kr")),
+)
+_MULTIPLIERS = (
+    (Decimal(10) ** 9, ("bn", "billion", "mdr")),
+    (Decimal(10) ** 6, ("msek", "mkr", "million", "milj", "mn", "m")),
+    (Decimal(10) ** 3, ("ksek", "tkr", "thousand", "k")),
+)
+_NUMBER = re.compile(r"[-+]?\d[\d\s.,']*")
+
+OK, EMPTY, AMBIGUOUS, UNPARSEABLE = "ok", "empty", "ambiguous", "unparseable"
+
+
+def _currency(text):
+    for code, markers in _CURRENCY_MARKERS:
+        if any(marker in text for marker in markers):
+            return code
+    return None
+
+
+def _multiplier(rest):
+    words = re.findall(r"[a-z]+", rest)
+    for factor, suffixes in _MULTIPLIERS:
+        if any(word in suffixes for word in words):
+            return factor
+    return Decimal(1)
+
+
+def _number(token):
+    """Normalise thousands/decimal separators. Returns ``(Decimal, ambiguous)``."""
+    token = re.sub(r"[\s']", "", token).rstrip(".,")
+    ambiguous = False
+    if "," in token and "." in token:
+        # The later separator is the decimal one: 1.234,50 or 1,234.50
+        decimal_sep = "," if token.rfind(",") > token.rfind(".") else "."
+        thousands_sep = "." if decimal_sep == "," else ","
+        token = token.replace(thousands_sep, "").replace(decimal_sep, ".")
+    elif "," in token or "." in token:
+        sep = "," if "," in token else "."
+        head, _, tail = token.rpartition(sep)
+        if token.count(sep) > 1:
+            token = token.replace(sep, "")
+        elif len(tail) == 3:
+            # "1,500" / "1.500": read as thousands, but flag it
+            token, ambiguous = head + tail, True
+        else:
+            token = f"{head}.{tail}"
+    return Decimal(token), ambiguous
+
+
+def named_currency(text):
+    """The currency ``text`` names ("€300k" -> EUR), or None when it names none."""
+    return _currency((text or "").lower())
+
+
+def parse_amount(text):
+    """
+    Parse a legacy amount string. Returns ``(amount, currency, note)`` where
+    ``amount`` is None when nothing numeric could be read and ``note`` is one
+    of ``ok``, ``empty``, ``ambiguous`` or ``unparseable``.
+    """
+    raw = (text or "").strip()
+    if not raw:
+        return Decimal(0), DEFAULT_CURRENCY, EMPTY
+
+    lowered = raw.lower()
+    currency = _currency(lowered) or DEFAULT_CURRENCY
+    match = _NUMBER.search(lowered)
+    if match is None:
+        return None, currency, UNPARSEABLE
+    try:
+        value, ambiguous = _number(match.group())
+    except InvalidOperation:
+        return None, currency, UNPARSEABLE
+
+    value *= _multiplier(lowered[match.end():])
+    return value.quantize(Decimal("0.01")), currency, AMBIGUOUS if ambiguous else OK
+
+
+# Dashboard grouping keys -> Project fields
+GROUP_FIELDS = {
+    "funding_body": "funding_body",
+    "status": "status",
+    "pi": "pi",
+    "year": "funding_year",
+}
+
+
+def funding_totals(projects, group_by):
+    """
+    Sum ``amount`` per currency and ``group_by`` keys in SQL. Returns rows like
+    ``{"funding_body": "VR", "currency": "SEK", "total": "1500000.00", "projects": 3}``.
+    """
+    fields = [GROUP_FIELDS[key] for key in group_by]
+    rows = (
+        projects.values(*fields, "currency")
+        .annotate(total=Sum("amount"), projects=Count("id"))
+        .order_by(*fields, "currency")
+    )
+    results = []
+    for row in rows:
+        entry = {key: row[GROUP_FIELDS[key]] for key in group_by}
+        entry["currency"] = row["currency"]
+        entry["total"] = str((row["total"] or Decimal(0)).quantize(Decimal("0.01")))
+        entry["projects"] = row["projects"]
+        results.append(entry)
+    return results
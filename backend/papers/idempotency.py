@@ -0,0 +1,121 @@
+"""
+Idempotency-Key support for create endpoints.
+
+A client that may retry a create (slow response, double click) sends the
+same ``Idempotency-Key`` header with every attempt. The first request claims
+the (user, key) pair by inserting an ``IdempotencyRecord`` and stores its
+response there; retries get that response back, marked with
+``Idempotent-Replayed: true``, without running validation, the master copy
+logic or any write. A retry that arrives while the first attempt is still
+running gets a 409. Reusing a key for a different request gets a 422;
+requests are compared on their parsed body, so the same JSON with other key
+order or whitespace is the same request.
+
+Records expire after IDEMPOTENCY_TTL_SECONDS and at most IDEMPOTENCY_MAX_RECORDS
+are kept. Server errors are not stored, so those requests can be retried.
+"""
+import hashlib
+import json
+import random
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import IdempotencyRecord
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+MAX_KEY_LENGTH = 255
+PRUNE_PROBABILITY = 0.01  # Share of claims that also enforce the TTL and size bound
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _fingerprint(request):
+    data = request.data
+    if hasattr(data, "lists"):
+        data = dict(data.lists())  # Form data: keep repeated fields
+    digest = hashlib.sha256(f"{request.method} {request.path}\n".encode())
+    digest.update(json.dumps(data, sort_keys=True, separators=(",", ":"), cls=JSONEncoder).encode())
+    return digest.hexdigest()
+
+
+def prune():
+    ttl = timedelta(seconds=_setting("IDEMPOTENCY_TTL_SECONDS", 86400))
+    IdempotencyRecord.objects.filter(created_at__lt=timezone.now() - ttl).delete()
+    keep = _setting("IDEMPOTENCY_MAX_RECORDS", 10000)
+    stale = IdempotencyRecord.objects.order_by("-created_at").values_list("pk", flat=True)[keep:]
+    IdempotencyRecord.objects.filter(pk__in=list(stale)).delete()
+
+
+def _claim(user, key, fingerprint):
+    """Return ``(record, claimed)``; ``claimed`` is False when the key was used before."""
+    now = timezone.now()
+    for _ in range(2):
+        # Look first: a replay is then a single indexed read
+        record = IdempotencyRecord.objects.filter(user=user, key=key).first()
+        if record is not None:
+            expired = record.created_at < now - timedelta(seconds=_setting("IDEMPOTENCY_TTL_SECONDS", 86400))
+            # A worker that died mid-request leaves a claim without a response
+            abandoned = record.status_code is None and record.created_at < now - timedelta(
+                seconds=_setting("IDEMPOTENCY_LOCK_SECONDS", 180))
+            if not (expired or abandoned):
+                return record, False
+            record.delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyRecord.objects.create(user=user, key=key, fingerprint=fingerprint), True
+        except IntegrityError:
+            continue  # A concurrent attempt claimed it first; read its record
+    return None, False
+
+
+def idempotent(method):
+    """Decorator for an APIView ``post`` that honours the Idempotency-Key header."""
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.META.get(HEADER)
+        if not key or not _setting("IDEMPOTENCY_ENABLED", True):
+            return method(view, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response({"error": f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = _fingerprint(request)
+        record, claimed = _claim(request.user, key, fingerprint)
+        if random.random() < PRUNE_PROBABILITY:
+            prune()
+        if record is None:
+            return Response({"error": "Could not claim the Idempotency-Key, please retry"},
+                            status=status.HTTP_409_CONFLICT, headers={"Retry-After": "1"})
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return Response({"error": "Idempotency-Key was already used for a different request"},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record.status_code is None:
+                return Response({"error": "A request with this Idempotency-Key is still being processed"},
+                                status=status.HTTP_409_CONFLICT, headers={"Retry-After": "1"})
+            return Response(record.response, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+        try:
+            response = method(view, request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        if response.status_code >= 500:
+            record.delete()
+        else:
+            # Stored as JSON-safe data (Decimals, dates) exactly as the renderer would emit it
+            record.response = json.loads(json.dumps(response.data, cls=JSONEncoder))
+            record.status_code = response.status_code
+            record.save(update_fields=["response", "status_code"])
+        return response
+
+    return wrapper
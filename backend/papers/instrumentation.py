@@ -0,0 +1,368 @@
+"""
+Request-level performance instrumentation.
+
+``RequestMetricsMiddleware`` records, for every request, the resolved view,
+wall time, database query count/time, outbound call durations (Crossref,
+Bedrock, ... via ``track_outbound``) and response size. Aggregates are kept
+per process and periodically published to the shared cache so ``metrics_view``
+can expose totals across all gunicorn workers in Prometheus text format. When
+a worker exits, the gunicorn master folds its last snapshot into a shared
+"retired" snapshot (``retire_worker``), so counters keep counting up across
+worker restarts instead of losing that worker's share.
+Sampled requests are also written as one JSON log line each.
+"""
+import contextvars
+import ipaddress
+import json
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError, connections
+from django.http import HttpResponse, JsonResponse
+
+logger = logging.getLogger("papers.requests")
+
+LOG_SAMPLE_RATE = getattr(settings, "REQUEST_LOG_SAMPLE_RATE", 0.0)
+LOG_SLOW_MS = getattr(settings, "REQUEST_LOG_SLOW_MS", 1000)
+METRICS_ALLOWED_IPS = getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1/32", "::1/128"])
+FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 10)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+WORKERS_KEY = "papers-metrics:workers"
+RETIRED_KEY = "papers-metrics:retired"
+RETIRED_TOKENS = 100  # Recently retired snapshots remembered, to skip their leftover worker entries
+
+_current = contextvars.ContextVar("papers_request_metrics", default=None)
+
+
+def _worker_key(pid):
+    return f"papers-metrics:worker:{pid}"
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_time", "outbound")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.outbound = {}
+
+    def add_outbound(self, service, duration):
+        self.outbound.setdefault(service, []).append(duration)
+
+
+class MetricsRegistry:
+    """Thread-safe per-process counters and histograms keyed by label tuples."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self._last_flush = 0.0
+        self._pid = None
+        self._token = None
+
+    def token(self):
+        """Identifies this process's snapshots; workers forked from a preloaded master each get their own."""
+        if self._pid != os.getpid():
+            self._pid, self._token = os.getpid(), secrets.token_hex(8)
+        return self._token
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, labels)
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {"buckets": list(buckets), "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(hist["buckets"]):
+                if value <= bound:
+                    hist["counts"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {**_as_snapshot(self.counters, self.histograms), "token": self.token()}
+
+    def maybe_flush(self, force=False):
+        """Publish this worker's snapshot to the shared cache every FLUSH_INTERVAL seconds."""
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        try:
+            pid = os.getpid()
+            workers = set(cache.get(WORKERS_KEY) or ())
+            if pid not in workers:
+                workers.add(pid)
+                cache.set(WORKERS_KEY, sorted(workers), None)
+            cache.set(_worker_key(pid), self.snapshot(), FLUSH_INTERVAL * 30)
+        except Exception as e:
+            logger.error(f"Error publishing metrics snapshot: {e}")
+
+
+registry = MetricsRegistry()
+
+
+def current_stats():
+    return _current.get()
+
+
+@contextmanager
+def track_outbound(service):
+    """Time an outbound call (HTTP API, LLM, ...) for the current request and process totals."""
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        registry.observe("papers_outbound_duration_seconds", (service, outcome), duration)
+        stats = _current.get()
+        if stats is not None:
+            stats.add_outbound(service, duration)
+
+
+def _db_wrapper(stats):
+    def wrapper(execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            stats.db_queries += 1
+            stats.db_time += time.perf_counter() - start
+    return wrapper
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unresolved"
+    return match.view_name or match._func_path
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_db_wrapper(stats)))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - start
+        self._record(request, response, stats, duration)
+        return response
+
+    def process_exception(self, request, exception):
+        # Lock timeouts surface as 500s; count them so saturation is visible
+        if isinstance(exception, OperationalError):
+            kind = "locked" if "locked" in str(exception) else "operational"
+            registry.inc("papers_db_errors_total", (kind,))
+        return None
+
+    def _record(self, request, response, stats, duration):
+        view = _view_name(request)
+        status_class = f"{response.status_code // 100}xx"
+        labels = (view, request.method, status_class)
+
+        size = None
+        if not response.streaming:
+            size = len(response.content)
+            registry.observe("papers_response_size_bytes", (view,), size, SIZE_BUCKETS)
+
+        registry.inc("papers_requests_total", labels)
+        registry.observe("papers_request_duration_seconds", labels, duration)
+        registry.inc("papers_db_queries_total", (view,), stats.db_queries)
+        registry.observe("papers_db_duration_seconds", (view,), stats.db_time)
+        registry.maybe_flush()
+
+        slow = duration * 1000 >= LOG_SLOW_MS
+        if slow or (LOG_SAMPLE_RATE and random.random() < LOG_SAMPLE_RATE):
+            logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+                "view": view,
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "db_queries": stats.db_queries,
+                "db_ms": round(stats.db_time * 1000, 2),
+                "outbound_ms": {
+                    service: round(sum(durations) * 1000, 2)
+                    for service, durations in stats.outbound.items()
+                },
+                "response_bytes": size,
+            }))
+
+
+def _as_snapshot(counters, histograms):
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [
+            [name, list(labels), dict(hist, counts=list(hist["counts"]))]
+            for (name, labels), hist in histograms.items()
+        ],
+    }
+
+
+def _merge(snapshots):
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap["counters"]:
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, hist in snap["histograms"]:
+            key = (name, tuple(labels))
+            merged = histograms.get(key)
+            if merged is None:
+                histograms[key] = dict(hist, counts=list(hist["counts"]))
+            else:
+                merged["counts"] = [a + b for a, b in zip(merged["counts"], hist["counts"])]
+                merged["sum"] += hist["sum"]
+                merged["count"] += hist["count"]
+    return counters, histograms
+
+
+def retire_worker(pid):
+    """
+    Fold the last snapshot of the exited worker ``pid`` into the retired
+    totals and forget the worker. Called by the gunicorn master, which reaps
+    workers one at a time, so the read-modify-write needs no lock.
+    """
+    try:
+        snapshot = cache.get(_worker_key(pid))
+        retired = cache.get(RETIRED_KEY) or {"counters": [], "histograms": [], "tokens": []}
+        if snapshot is not None and snapshot.get("token") not in retired["tokens"]:
+            counters, histograms = _merge([retired, snapshot])
+            tokens = [*retired["tokens"], snapshot.get("token")][-RETIRED_TOKENS:]
+            # Written before the worker entry goes, so a scrape never misses these counts
+            cache.set(RETIRED_KEY, {**_as_snapshot(counters, histograms), "tokens": tokens}, None)
+        cache.delete(_worker_key(pid))
+        cache.set(WORKERS_KEY, sorted(set(cache.get(WORKERS_KEY) or ()) - {pid}), None)
+    except Exception as e:
+        logger.error(f"Error retiring metrics of worker {pid}: {e}")
+
+
+def _published():
+    """Snapshots of live workers plus the retired totals."""
+    pids = cache.get(WORKERS_KEY) or []
+    # The retired totals are read last: a worker entry still present after
+    # its retirement is then recognised by its token and skipped
+    found = cache.get_many([*map(_worker_key, pids), RETIRED_KEY])
+    retired = found.pop(RETIRED_KEY, None)
+    if len(found) != len(pids):
+        cache.set(WORKERS_KEY, sorted(int(key.rsplit(":", 1)[1]) for key in found), None)
+    if retired is None:
+        return list(found.values())
+    tokens = set(retired["tokens"])
+    return [snapshot for snapshot in found.values() if snapshot.get("token") not in tokens] + [retired]
+
+
+LABEL_NAMES = {
+    "papers_requests_total": ("view", "method", "status"),
+    "papers_request_duration_seconds": ("view", "method", "status"),
+    "papers_db_queries_total": ("view",),
+    "papers_db_duration_seconds": ("view",),
+    "papers_db_errors_total": ("kind",),
+    "papers_response_size_bytes": ("view",),
+    "papers_outbound_duration_seconds": ("service", "outcome"),
+    "papers_throttle_decisions_total": ("scope", "outcome"),
+    "papers_llm_attempts_total": ("backend", "outcome"),
+}
+
+
+def _labels(name, values, extra=None):
+    pairs = list(zip(LABEL_NAMES.get(name, ()), values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + escaped + "}"
+
+
+def render_prometheus(counters, histograms):
+    lines = []
+    for name in sorted({name for name, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_labels(name, labels)} {value}")
+    for name in sorted({name for name, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), hist in sorted(histograms.items(), key=lambda item: item[0]):
+            if n != name:
+                continue
+            for bound, count in zip(hist["buckets"], hist["counts"]):
+                lines.append(f"{name}_bucket{_labels(name, labels, ('le', bound))} {count}")
+            lines.append(f"{name}_bucket{_labels(name, labels, ('le', '+Inf'))} {hist['count']}")
+            lines.append(f"{name}_sum{_labels(name, labels)} {hist['sum']}")
+            lines.append(f"{name}_count{_labels(name, labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _in_networks(remote, networks):
+    try:
+        address = ipaddress.ip_address(remote)
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(net) for net in networks)
+
+
+def client_ip(request):
+    """
+    The client's address. Behind nginx every request arrives from loopback,
+    so X-Real-IP is used, but only when it was set by one of TRUSTED_PROXIES:
+    anyone reaching gunicorn directly could send their own.
+    """
+    remote = request.META.get("REMOTE_ADDR", "")
+    forwarded = request.META.get("HTTP_X_REAL_IP")
+    if forwarded and _in_networks(remote, getattr(settings, "TRUSTED_PROXIES", ["127.0.0.1/32", "::1/128"])):
+        return forwarded
+    return remote
+
+
+def _client_allowed(request):
+    return _in_networks(client_ip(request), METRICS_ALLOWED_IPS)
+
+
+def metrics_view(request):
+    """
+    GET: Prometheus text exposition of request metrics, summed over all
+    workers that published a snapshot recently and all workers that exited.
+    """
+    if not _client_allowed(request):
+        return JsonResponse({"error": "Forbidden"}, status=403)
+
+    registry.maybe_flush(force=True)
+    counters, histograms = _merge(_published())
+    return HttpResponse(
+        render_prometheus(counters, histograms),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
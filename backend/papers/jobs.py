@@ -0,0 +1,223 @@
+"""
+Lightweight database-backed job queue.
+
+Request handlers call ``enqueue`` to move slow side effects (master copies,
+metadata lookups, emails) off the request path; ``manage.py run_jobs`` claims
+and executes them. Features:
+
+- retries with exponential backoff and jitter, up to ``max_attempts``
+- idempotency keys: enqueueing an existing key returns the existing job
+- per-job-name concurrency limits across all workers
+- recovery of jobs left ``running`` by a crashed worker: a running job's
+  lock is refreshed every LOCK_TIMEOUT / 4, so only jobs whose worker
+  stopped heartbeating are requeued
+
+Handlers are registered with ``@job("name")`` in ``papers/tasks.py``.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+LOCK_TIMEOUT = timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 600))
+HEARTBEAT_INTERVAL = LOCK_TIMEOUT / 4
+BACKOFF_BASE = getattr(settings, "JOBS_BACKOFF_BASE", 5)
+BACKOFF_MAX = getattr(settings, "JOBS_BACKOFF_MAX", 3600)
+RETENTION = timedelta(days=getattr(settings, "JOBS_RETENTION_DAYS", 7))
+
+_handlers = {}
+
+
+class JobSpec:
+    def __init__(self, func, name, max_attempts, concurrency):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+
+def job(name, max_attempts=5, concurrency=None):
+    """Register ``func(payload)`` as the handler for jobs called ``name``."""
+    def decorator(func):
+        limit = getattr(settings, "JOBS_CONCURRENCY", {}).get(name, concurrency)
+        _handlers[name] = JobSpec(func, name, max_attempts, limit)
+        return func
+    return decorator
+
+
+def _load_handlers():
+    if not _handlers:
+        from . import tasks  # noqa: F401  (registers handlers)
+    return _handlers
+
+
+def enqueue(name, payload=None, idempotency_key=None, delay=None):
+    """
+    Queue a job, returning the ``Job``. The row is written in the caller's
+    transaction, so it is only visible to workers once that commits.
+    """
+    spec = _load_handlers().get(name)
+    if spec is None:
+        raise ValueError(f"Unknown job {name!r}")
+
+    if getattr(settings, "JOBS_RUN_EAGER", False):
+        # Development/tests without a worker: run right after commit
+        transaction.on_commit(lambda: spec.func(payload or {}))
+        return None
+
+    run_at = timezone.now() + (delay or timedelta(0))
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                name=name,
+                payload=payload or {},
+                idempotency_key=idempotency_key,
+                max_attempts=spec.max_attempts,
+                run_at=run_at,
+            )
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        return Job.objects.get(idempotency_key=idempotency_key)
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def _saturated_names():
+    limits = {name: spec.concurrency for name, spec in _load_handlers().items() if spec.concurrency}
+    if not limits:
+        return set()
+    running = (
+        Job.objects.filter(status=Job.RUNNING, name__in=list(limits))
+        .values("name").annotate(n=Count("id"))
+    )
+    return {row["name"] for row in running if row["n"] >= limits[row["name"]]}
+
+
+def claim_next(worker):
+    """Atomically claim one due job, honouring concurrency limits. Returns a Job or None."""
+    now = timezone.now()
+    candidates = (
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        .exclude(name__in=_saturated_names())
+        .order_by("run_at", "id")
+        .values_list("id", "name")[:20]
+    )
+    for job_id, name in candidates:
+        # Compare-and-set: only one worker can move the row out of "queued"
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F("attempts") + 1,
+        )
+        if not claimed:
+            continue
+        spec = _handlers.get(name)
+        if spec and spec.concurrency:
+            running = Job.objects.filter(status=Job.RUNNING, name=name).count()
+            if running > spec.concurrency:
+                # Lost a race with another worker: give the slot back
+                Job.objects.filter(pk=job_id).update(
+                    status=Job.QUEUED, locked_by="", locked_at=None, attempts=F("attempts") - 1,
+                )
+                continue
+        return Job.objects.get(pk=job_id)
+    return None
+
+
+def backoff_delay(attempts):
+    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** max(0, attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def heartbeat(job_obj):
+    """Refresh the lock of a job we are still running; False once it is no longer ours."""
+    return bool(
+        Job.objects.filter(pk=job_obj.pk, status=Job.RUNNING, locked_by=job_obj.locked_by)
+        .update(locked_at=timezone.now())
+    )
+
+
+@contextmanager
+def _heartbeating(job_obj):
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(HEARTBEAT_INTERVAL.total_seconds()):
+                try:
+                    heartbeat(job_obj)
+                except Exception as e:
+                    logger.warning(f"Heartbeat for job {job_obj} failed: {e}")
+        finally:
+            connection.close()  # This thread's own connection
+
+    thread = threading.Thread(target=beat, name=f"job-heartbeat-{job_obj.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def execute(job_obj):
+    spec = _load_handlers().get(job_obj.name)
+    try:
+        if spec is None:
+            raise LookupError(f"No handler registered for {job_obj.name!r}")
+        with _heartbeating(job_obj):
+            spec.func(job_obj.payload)
+    except Exception as e:
+        logger.warning(f"Job {job_obj} failed (attempt {job_obj.attempts}): {e}")
+        if job_obj.attempts >= job_obj.max_attempts or spec is None:
+            status, run_at = Job.FAILED, job_obj.run_at
+        else:
+            status, run_at = Job.QUEUED, timezone.now() + backoff_delay(job_obj.attempts)
+        Job.objects.filter(pk=job_obj.pk).update(
+            status=status, run_at=run_at, last_error=f"{type(e).__name__}: {e}",
+            locked_by="", locked_at=None, updated_at=timezone.now(),
+        )
+        return False
+
+    Job.objects.filter(pk=job_obj.pk).update(
+        status=Job.DONE, last_error="", locked_by="", locked_at=None, updated_at=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale():
+    """
+    Return jobs whose worker died mid-run (no heartbeat for LOCK_TIMEOUT) to the queue, or fail them when
+    that was their last attempt: a job that kills its worker (out of memory,
+    timeout) would otherwise be retried forever. Returns ``(requeued, failed)``.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - LOCK_TIMEOUT)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, locked_by="", locked_at=None, updated_at=now,
+        last_error="Worker stopped responding while running the job",
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by="", locked_at=None, updated_at=now)
+    if failed:
+        logger.warning(f"Failed {failed} jobs whose worker died on their last attempt")
+    return requeued, failed
+
+
+def prune_finished():
+    """Delete done and failed jobs last touched more than RETENTION ago; returns the count."""
+    return Job.objects.filter(
+        status__in=[Job.DONE, Job.FAILED], updated_at__lt=timezone.now() - RETENTION,
+    ).delete()[0]
@@ -0,0 +1,264 @@
+"""
+Bedrock model invocation for the chatbot.
+
+One client per process and region: boto3 clients are thread-safe and
+expensive to build (credential resolution, endpoint metadata), so views no
+longer create one per request. ``BEDROCK_CLIENT_FACTORY`` may name a
+callable taking the region and returning a compatible client, which is how
+benchmarks swap in local fakes.
+
+boto3 is imported when the first client is built, not when the app loads:
+it is the largest import in the project and only the chatbot needs it.
+
+``generate(native_request, make_parser)`` returns the first reply a parser
+accepts from LLM_BACKENDS, an ordered list of model/region backends. A
+parser (see ``chatreply.ReplyParser``) is fed the generation as Bedrock
+streams it: ``feed(text)`` returns True once it needs no more text, and the
+stream is closed so the model stops generating; ``result()`` returns the
+reply or raises InvalidOutput; ``resume()`` returns a prefix to append to
+the prompt so a retry only generates what was malformed or missing.
+Up to LLM_REPAIR_ATTEMPTS such retries go to the same backend.
+
+- Hedging: when the leading backend has not answered within its recent p95
+  latency (clamped to LLM_HEDGE_MIN_DELAY..LLM_HEDGE_MAX_DELAY), the same
+  request also goes to the next backend; the first valid reply wins, and
+  the attempts still running close their streams at their next chunk.
+- Failover: a backend that errors, is throttled or returns output the
+  parser rejects (after repairs) is replaced by the next one at once. Throttled backends are
+  skipped for LLM_THROTTLE_COOLDOWN seconds. LLM_FALLBACK_BACKENDS (smaller
+  models) are only used once no primary backend is left.
+
+Latencies are tracked per backend and process, and exported as
+``papers_outbound_duration_seconds{service="bedrock:<name>"}``; every attempt
+is counted in ``papers_llm_attempts_total{backend,outcome}``.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import closing
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .instrumentation import registry, track_outbound
+
+# Bedrock error codes that mean "busy, try elsewhere" rather than "broken request"
+THROTTLE_CODES = {
+    "ThrottlingException", "TooManyRequestsException", "ServiceUnavailableException", "ModelNotReadyException",
+}
+
+_lock = threading.Lock()
+_clients = {}
+_stats = {}
+_pool = None
+_pool_pid = None
+
+
+class InvalidOutput(ValueError):
+    """Raised by a ``parse`` callback for a generation it cannot use."""
+
+
+class LLMUnavailable(RuntimeError):
+    """No backend produced a usable reply in time."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _default_factory(region):
+    import boto3
+
+    return boto3.client("bedrock-runtime", region_name=region)
+
+
+def bedrock_client(region=None):
+    region = region or settings.BEDROCK_REGION
+    factory_path = getattr(settings, "BEDROCK_CLIENT_FACTORY", "")
+    key = (factory_path, region)
+    client = _clients.get(key)
+    if client is None:
+        with _lock:
+            client = _clients.get(key)
+            if client is None:
+                factory = import_string(factory_path) if factory_path else _default_factory
+                client = _clients[key] = factory(region)
+    return client
+
+
+def reset():
+    """Forget clients, latency history and cooldowns (benchmarks switch fakes between runs)."""
+    with _lock:
+        _clients.clear()
+        _stats.clear()
+
+
+def backends():
+    """``(primary, fallback)`` backend lists from the settings."""
+    primary = _setting("LLM_BACKENDS", None) or [
+        {"name": "default", "model_id": settings.BEDROCK_MODEL_ID, "region": settings.BEDROCK_REGION},
+    ]
+    return list(primary), list(_setting("LLM_FALLBACK_BACKENDS", []))
+
+
+class _BackendStats:
+    def __init__(self):
+        self.latencies = deque(maxlen=_setting("LLM_LATENCY_WINDOW", 200))
+        self.cooldown_until = 0.0
+
+
+def _stats_for(name):
+    stats = _stats.get(name)
+    if stats is None:
+        with _lock:
+            stats = _stats.setdefault(name, _BackendStats())
+    return stats
+
+
+def hedge_delay(name):
+    """Seconds to wait for ``name`` before hedging: its recent p95, clamped."""
+    samples = sorted(_stats_for(name).latencies)
+    if len(samples) < _setting("LLM_HEDGE_MIN_SAMPLES", 20):
+        delay = _setting("LLM_HEDGE_DEFAULT_DELAY", 4.0)
+    else:
+        delay = samples[int(0.95 * (len(samples) - 1))]
+    return min(max(delay, _setting("LLM_HEDGE_MIN_DELAY", 1.0)), _setting("LLM_HEDGE_MAX_DELAY", 10.0))
+
+
+def _available(backend):
+    return _stats_for(backend["name"]).cooldown_until <= time.monotonic()
+
+
+def _executor():
+    # Threads do not survive fork; build the pool in each (preloaded) worker
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ThreadPoolExecutor(max_workers=_setting("LLM_MAX_WORKERS", 8),
+                                           thread_name_prefix="llm")
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def _record(backend, outcome):
+    registry.inc("papers_llm_attempts_total", (backend["name"], outcome))
+
+
+def _throttled(error):
+    code = ((getattr(error, "response", None) or {}).get("Error") or {}).get("Code") or ""
+    # Errors inside a response stream arrive as "throttlingException"
+    return code[:1].upper() + code[1:] in THROTTLE_CODES
+
+
+def _generations(backend, native_request):
+    """Generation text for ``native_request``, chunk by chunk as the model produces it."""
+    client = bedrock_client(backend.get("region"))
+    body = json.dumps(native_request)
+    if not _setting("LLM_STREAMING", True):
+        response = client.invoke_model(modelId=backend["model_id"], body=body)
+        yield json.loads(response["body"].read())["generation"]
+        return
+    stream = client.invoke_model_with_response_stream(modelId=backend["model_id"], body=body)["body"]
+    try:
+        for event in stream:
+            if "chunk" in event:
+                yield json.loads(event["chunk"]["bytes"])["generation"]
+    finally:
+        stream.close()  # Also when the parser stopped early: ends the generation
+
+
+def _attempt(backend, native_request, make_parser, cancel):
+    """One backend's reply, or None once ``cancel`` is set (another attempt won or the call gave up)."""
+    parser = make_parser()
+    request = native_request
+    start = time.perf_counter()
+    for repair in range(_setting("LLM_REPAIR_ATTEMPTS", 1) + 1):
+        try:
+            with track_outbound(f"bedrock:{backend['name']}"), closing(_generations(backend, request)) as chunks:
+                for chunk in chunks:
+                    if cancel.is_set() or parser.feed(chunk):
+                        break
+        except Exception as e:
+            if _throttled(e):
+                _stats_for(backend["name"]).cooldown_until = time.monotonic() + _setting("LLM_THROTTLE_COOLDOWN", 30)
+                _record(backend, "throttled")
+            else:
+                _record(backend, "error")
+            raise
+        if cancel.is_set():
+            _record(backend, "cancelled")
+            return None
+        try:
+            result = parser.result()
+        except InvalidOutput:
+            prefix = parser.resume()
+            if prefix is None or repair == _setting("LLM_REPAIR_ATTEMPTS", 1):
+                _record(backend, "invalid")
+                raise
+            _record(backend, "repair")
+            request = {**native_request, "prompt": native_request["prompt"] + prefix}
+            continue
+        _stats_for(backend["name"]).latencies.append(time.perf_counter() - start)
+        _record(backend, "ok")
+        return result
+
+
+def generate(native_request, make_parser):
+    """
+    Send ``native_request`` to the configured backends and return
+    ``(reply, backend_name)`` for the first generation a ``make_parser()``
+    parser accepts. Raises LLMUnavailable when every backend failed or
+    LLM_TIMEOUT passed.
+    """
+    primary, fallback = backends()
+    # Cooling down is advisory: with nothing else left, throttled backends are retried
+    queue = [b for b in primary if _available(b)] + [b for b in fallback if _available(b)] or primary + fallback
+    primary_names = {b["name"] for b in primary}
+    deadline = time.monotonic() + _setting("LLM_TIMEOUT", 90)
+    hedges_left = _setting("LLM_MAX_HEDGES", 1)
+    pending = {}
+    errors = []
+    cancel = threading.Event()
+
+    def launch():
+        backend = queue.pop(0)
+        # copy_context: outbound timings land in the calling request's stats
+        future = _executor().submit(contextvars.copy_context().run, _attempt, backend, native_request,
+                                     make_parser, cancel)
+        pending[future] = backend
+        return time.monotonic() + hedge_delay(backend["name"])
+
+    try:
+        hedge_at = launch()
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            can_hedge = hedges_left > 0 and queue and queue[0]["name"] in primary_names
+            timeout = min(hedge_at, deadline) - now if can_hedge else deadline - now
+            done, _ = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            if not done:
+                if can_hedge and time.monotonic() >= hedge_at:
+                    hedges_left -= 1
+                    _record(queue[0], "hedge")
+                    hedge_at = launch()
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result(), backend["name"]
+                except Exception as e:
+                    errors.append(f"{backend['name']}: {type(e).__name__}: {e}")
+            if queue:
+                hedge_at = launch()  # Fail over right away
+        raise LLMUnavailable("; ".join(errors) or "Timed out waiting for the model")
+    finally:
+        # Losing and timed-out attempts stop streaming; queued ones never start
+        cancel.set()
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,120 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from papers.benchmarks import git_commit, isolated_environment
+from papers.benchmarks.scenarios import (
+    SCENARIOS, ClientTransport, HTTPTransport, login_all, prepare_state, run_scenario,
+)
+from papers.benchmarks.seed import seed
+from papers.benchmarks.server import FAKE_BEDROCK, start_gunicorn, stop, stub_environment
+from papers.benchmarks.stubs import CrossrefStub
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark every endpoint in papers/urls.py against a seeded throwaway "
+        "database, with a local Crossref stub and a fake Bedrock client. Prints "
+        "one JSON document (p50/p95/p99, throughput, queries per request) that "
+        "can be saved with --output and compared across commits."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--papers-per-user", type=int, default=50)
+        parser.add_argument("--projects-per-user", type=int, default=5)
+        parser.add_argument("--messages-per-user", type=int, default=20)
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per endpoint")
+        parser.add_argument("--warmup", type=int, default=1, help="Untimed requests per endpoint")
+        parser.add_argument("--concurrency", type=int, default=1, help="Parallel clients per endpoint")
+        parser.add_argument("--only", default="", help="Comma-separated scenario names (default: all)")
+        parser.add_argument("--transport", choices=("client", "gunicorn"), default="client",
+                            help="Django test client in-process, or HTTP against a local gunicorn")
+        parser.add_argument("--gunicorn-workers", type=int, default=1,
+                            help="Query counts are exact with 1 worker; others publish metrics every 10s")
+        parser.add_argument("--crossref-latency-ms", type=float, default=50)
+        parser.add_argument("--bedrock-latency-ms", type=float, default=200)
+        parser.add_argument("--output", help="Also write the JSON result to this file")
+        parser.add_argument("--child", action="store_true", help="Internal: run in the throwaway database")
+
+    def handle(self, *args, **options):
+        names = [name for name in options["only"].split(",") if name]
+        unknown = set(names) - {scenario.name for scenario in SCENARIOS}
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        if options["child"]:
+            self._run_child(options, names)
+            return
+
+        # A file-backed test database can be shared by threads and by gunicorn
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DB_ENGINE="sqlite", SQLITE_TEST_PATH=os.path.join(tmp, "bench.sqlite3"),
+                       CACHE_BACKEND="locmem")
+            proc = subprocess.run([sys.executable, sys.argv[0], *sys.argv[1:], "--child"],
+                                  env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            self.stderr.write(proc.stderr)
+            raise CommandError("Benchmark failed")
+        output = proc.stdout.strip().splitlines()[-1]
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+        self.stdout.write(output)
+
+    def _run_child(self, options, names):
+        scenarios = [s for s in SCENARIOS if not names or s.name in names]
+        os.environ["BENCH_BEDROCK_LATENCY_MS"] = str(options["bedrock_latency_ms"])
+
+        with CrossrefStub(options["crossref_latency_ms"]) as stub, isolated_environment():
+            overrides = dict(CROSSREF_API_URL=stub.url, CROSSREF_RATE_LIMIT=10 ** 6,
+                             BEDROCK_CLIENT_FACTORY=FAKE_BEDROCK, THROTTLE_ENABLED=False)
+            with override_settings(**overrides):
+                seeded = seed(options["users"], options["papers_per_user"],
+                              options["projects_per_user"], options["messages_per_user"])
+                state = prepare_state(seeded)
+
+                server = None
+                if options["transport"] == "gunicorn":
+                    server, base_url = start_gunicorn(
+                        dict(stub_environment(stub.url), CACHE_BACKEND="locmem"),
+                        workers=options["gunicorn_workers"], threads=options["concurrency"],
+                    )
+                    transport = HTTPTransport(base_url)
+                else:
+                    transport = ClientTransport()
+                try:
+                    login_all(transport, state)
+                    results = {}
+                    for scenario in scenarios:
+                        results[scenario.name] = run_scenario(
+                            transport, scenario, state, options["requests"],
+                            options["concurrency"], options["warmup"],
+                        )
+                finally:
+                    if server is not None:
+                        stop(server)
+
+        self.stdout.write(json.dumps({
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "transport": options["transport"],
+                "debug": settings.DEBUG,
+                "data": {key: options[key] for key in
+                         ("users", "papers_per_user", "projects_per_user", "messages_per_user")},
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "crossref_latency_ms": options["crossref_latency_ms"],
+                "bedrock_latency_ms": options["bedrock_latency_ms"],
+                "crossref_stub_hits": stub.hits,
+            },
+            "endpoints": results,
+        }))
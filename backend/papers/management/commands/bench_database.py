@@ -0,0 +1,130 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+
+from papers.benchmarks import isolated_environment, summarize
+
+PROFILES = {
+    "sqlite-default": {"DB_ENGINE": "sqlite", "SQLITE_TUNED": "0"},
+    "sqlite-tuned": {"DB_ENGINE": "sqlite", "SQLITE_TUNED": "1"},
+    "postgres": {"DB_ENGINE": "postgres"},
+}
+
+
+def _worker(worker_id, ops, results):
+    """Concurrent writer: paper create (+ master copy), chat message, list read."""
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+    from papers.models import ChatMessage
+
+    connections.close_all()
+    user = User.objects.get(username=f"bench-writer-{worker_id}")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    samples = {"create_paper": [], "chat_message": [], "list_papers": []}
+    errors = {"locked": 0, "other": 0}
+    for i in range(ops):
+        steps = (
+            ("create_paper", lambda: client.post("/api/papers/", {
+                "doi": f"10.9999/db.{worker_id}.{i}", "title": "T", "author_name": "A",
+                "journal": "J", "date": "2024"}, format="json")),
+            ("chat_message", lambda: ChatMessage.objects.create(user=user, role="user", content=f"message {i}")),
+            ("list_papers", lambda: client.get("/api/papers/")),
+        )
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                response = step()
+                if getattr(response, "status_code", 200) >= 500:
+                    errors["other"] += 1
+            except OperationalError as e:
+                errors["locked" if "locked" in str(e) else "other"] += 1
+            except Exception:
+                errors["other"] += 1
+            samples[name].append(time.perf_counter() - start)
+    connections.close_all()
+    results.put((samples, errors))
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency benchmark of the database profiles: several processes "
+        "create papers (with master copies), write chat messages and read lists "
+        "at once. Each profile runs in a fresh subprocess against a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", default="sqlite-default,sqlite-tuned",
+                            help=f"Comma-separated profiles: {', '.join(PROFILES)} "
+                                 "(postgres uses a test database on DATABASE_URL's server)")
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument("--ops", type=int, default=100, help="Iterations per worker")
+        parser.add_argument("--child", action="store_true", help="Internal: run one profile")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self._run_child(options["workers"], options["ops"])
+            return
+
+        for profile in options["profiles"].split(","):
+            if profile not in PROFILES:
+                raise CommandError(f"Unknown profile {profile!r}")
+            with tempfile.TemporaryDirectory() as tmp:
+                env = dict(os.environ, **PROFILES[profile])
+                env["SQLITE_TEST_PATH"] = os.path.join(tmp, "bench.sqlite3")
+                env["CACHE_BACKEND"] = "locmem"
+                proc = subprocess.run(
+                    [sys.executable, sys.argv[0], "bench_database", "--child",
+                     "--workers", str(options["workers"]), "--ops", str(options["ops"])],
+                    env=env, capture_output=True, text=True,
+                )
+            if proc.returncode != 0:
+                self.stderr.write(proc.stderr)
+                raise CommandError(f"Profile {profile} failed")
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            self.stdout.write(json.dumps(dict(profile=profile, **result)))
+
+    def _run_child(self, workers, ops):
+        from django.contrib.auth.models import User
+
+        with isolated_environment():
+            User.objects.create_superuser("bench-admin", "admin@example.com", "x")
+            for worker_id in range(workers):
+                User.objects.create_user(f"bench-writer-{worker_id}")
+            connections.close_all()
+
+            ctx = multiprocessing.get_context("fork")
+            results = ctx.Queue()
+            start = time.perf_counter()
+            procs = [ctx.Process(target=_worker, args=(w, ops, results)) for w in range(workers)]
+            for proc in procs:
+                proc.start()
+            collected = [results.get() for _ in procs]
+            for proc in procs:
+                proc.join()
+            wall = time.perf_counter() - start
+
+        merged = {}
+        errors = {"locked": 0, "other": 0}
+        for samples, worker_errors in collected:
+            for name, values in samples.items():
+                merged.setdefault(name, []).extend(values)
+            for key, value in worker_errors.items():
+                errors[key] += value
+
+        total_ops = sum(len(values) for values in merged.values())
+        self.stdout.write(json.dumps({
+            "workers": workers,
+            "wall_s": round(wall, 3),
+            "throughput_ops_s": round(total_ops / wall, 1),
+            "errors": errors,
+            "operations": {name: summarize(values) for name, values in merged.items()},
+        }))
@@ -0,0 +1,78 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a gunicorn worker imports before it can answer the first request
+STARTUP = (
+    "import os; os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend_paper.settings'); "
+    "import backend_paper.wsgi; from importlib import import_module; from django.conf import settings; "
+    "import_module(settings.ROOT_URLCONF)"
+)
+
+
+def _measure():
+    """One cold start under ``-X importtime``: ``({module: (self_us, cumulative_us, depth)}, total_us)``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP],
+        cwd=settings.BASE_DIR, env=dict(os.environ), capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise CommandError(f"Startup import failed:\n{proc.stderr[-2000:]}")
+
+    modules, total = {}, 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+        if depth == 0:
+            total += int(cumulative_us)
+    return modules, total
+
+
+class Command(BaseCommand):
+    help = (
+        "Import-time budget for worker startup: imports the WSGI app and URLconf "
+        "in fresh interpreters under -X importtime and reports the median total, "
+        "the most expensive modules and any heavy modules that should only load "
+        "on first use. Exits non-zero when over budget, for CI."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--budget-ms", type=float,
+                            default=getattr(settings, "STARTUP_IMPORT_BUDGET_MS", 1000))
+        parser.add_argument("--top", type=int, default=15, help="Most expensive packages to list")
+
+    def handle(self, *args, **options):
+        runs = [_measure() for _ in range(options["runs"])]
+        modules = runs[-1][0]
+        total_ms = statistics.median(total for _, total in runs) / 1000
+        forbidden = [
+            name for name in getattr(settings, "STARTUP_LAZY_MODULES", ("boto3", "botocore")) if name in modules
+        ]
+        # Top-level packages by cumulative time, as the worker sees them
+        packages = {}
+        for name, (_, cumulative_us, _) in modules.items():
+            package = name.split(".")[0]
+            packages[package] = max(packages.get(package, 0), cumulative_us)
+        top = sorted(packages.items(), key=lambda item: -item[1])[:options["top"]]
+
+        self.stdout.write(json.dumps({
+            "runs": options["runs"],
+            "total_ms": round(total_ms, 1),
+            "budget_ms": options["budget_ms"],
+            "modules": len(modules),
+            "eagerly_loaded": forbidden,
+            "top_packages_ms": {package: round(us / 1000, 1) for package, us in top},
+        }))
+        if forbidden:
+            raise CommandError(f"Modules meant to load on first use were imported at startup: {', '.join(forbidden)}")
+        if total_ms > options["budget_ms"]:
+            raise CommandError(f"Startup imports took {total_ms:.0f} ms, over the {options['budget_ms']:.0f} ms budget")
@@ -0,0 +1,89 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from papers.benchmarks import isolated_environment
+from papers.fastpath import FastJSONRenderer, serialize_rows
+from papers.models import Paper, Project
+from papers.serializers import PaperSerializer, ProjectSerializer, SuperuserPaperSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ModelSerializer + JSONRenderer against the .values() fast path "
+        "for the list endpoints. Seeds rows into a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        with isolated_environment():
+            self._run(options["rows"], options["repeat"])
+
+    def _seed(self, rows):
+        users = [User.objects.create(username=f"bench-user-{i}") for i in range(20)]
+        Paper.objects.bulk_create(
+            Paper(
+                author_name=f"Author {i} Ünicode",
+                doi=f"10.9999/bench.{i}",
+                title=f"Benchmark paper {i}   title",
+                journal="Journal of Benchmarks",
+                date="2024-1-1",
+                additional_authors=[f"Co Author {i}", "Second Author"],
+                user=users[i % len(users)],
+                publication_type="Article in journal",
+                submission_year=2024 if i % 3 else None,
+            )
+            for i in range(rows)
+        )
+        Project.objects.bulk_create(
+            Project(
+                project_name=f"Project {i}",
+                status="Approved",
+                pi=f"PI {i}",
+                funding_body="VR",
+                additional_authors=["Someone"],
+                user=users[i % len(users)],
+                amount=str(i * 1000),
+            )
+            for i in range(rows)
+        )
+
+    def _time(self, fn, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = fn()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
+
+    def _run(self, rows, repeat):
+        self._seed(rows)
+        cases = [
+            ("papers", Paper.objects.filter(doi__startswith="10.9999/bench."), PaperSerializer),
+            ("superuser papers", Paper.objects.filter(doi__startswith="10.9999/bench."), SuperuserPaperSerializer),
+            ("projects", Project.objects.filter(user__username__startswith="bench-user-"), ProjectSerializer),
+        ]
+        for label, queryset, serializer_class in cases:
+            slow_time, slow_body = self._time(
+                lambda: JSONRenderer().render(serializer_class(queryset.order_by("pk"), many=True).data),
+                repeat,
+            )
+            fast_time, fast_body = self._time(
+                lambda: FastJSONRenderer().render(serialize_rows(queryset, serializer_class)),
+                repeat,
+            )
+            if slow_body != fast_body:
+                raise CommandError(f"{label}: fast path output differs from the serializer output")
+
+            self.stdout.write(
+                f"{label:<18} rows={rows} "
+                f"serializer={slow_time * 1000:.1f}ms ({rows / slow_time:,.0f} rows/s) "
+                f"fast={fast_time * 1000:.1f}ms ({rows / fast_time:,.0f} rows/s) "
+                f"speedup={slow_time / fast_time:.1f}x bytes={len(fast_body)} identical=yes"
+            )
@@ -0,0 +1,135 @@
+import json
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from papers import llm
+from papers.benchmarks import git_commit, summarize
+from papers.benchmarks.stubs import fake_bedrock_client
+from papers.chatreply import ReplyParser
+
+REQUEST = {
+    "prompt": "<|begin_of_text|><|start_header_id|>user<|end_header_id|>\nbench<|eot_id|>"
+              "<|start_header_id|>assistant<|end_header_id|>\n",
+    "max_gen_len": 512,
+    "temperature": 0.5,
+}
+
+_fakes = []
+
+
+def _factory(region):
+    """BEDROCK_CLIENT_FACTORY for this command: the env-configured fake, remembered for call counts."""
+    client = fake_bedrock_client(region)
+    _fakes.append(client)
+    return client
+
+
+@contextmanager
+def _environ(values):
+    old = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in old.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+class Command(BaseCommand):
+    help = (
+        "Chatbot model invocation against fake Bedrock backends with injected "
+        "latency, slow tails, throttling and malformed replies. Runs "
+        "llm.generate once per hedge setting and prints one JSON document "
+        "(p50/p95/p99, model calls, repairs and streamed chunks per request, "
+        "replies per backend) to compare tail latency with and without "
+        "hedging, and streaming with --no-streaming."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300)
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--hedges", default="0,1", help="Comma-separated LLM_MAX_HEDGES values to compare")
+        parser.add_argument("--latency-ms", type=float, default=100)
+        parser.add_argument("--tail-ms", type=float, default=1500)
+        parser.add_argument("--tail-ratio", type=float, default=0.03, help="Share of calls that take --tail-ms")
+        parser.add_argument("--model-latency-ms", default="",
+                            help="Per-backend overrides, model@region=ms,...")
+        parser.add_argument("--throttled", default="", help="Backends that always throttle, model@region,...")
+        parser.add_argument("--chunk-ms", type=float, default=2, help="Time per streamed chunk of 16 characters")
+        parser.add_argument("--malformed-ratio", type=float, default=0.0,
+                            help="Share of replies with a broken member, repaired by continuation")
+        parser.add_argument("--no-streaming", action="store_true", help="Wait for whole generations (LLM_STREAMING=False)")
+        parser.add_argument("--hedge-min-delay", type=float, default=0.05,
+                            help="LLM_HEDGE_MIN_DELAY for the run (the fakes answer faster than Bedrock)")
+        parser.add_argument("--output", help="Also write the JSON result to this file")
+
+    def handle(self, *args, **options):
+        env = {
+            "BENCH_BEDROCK_LATENCY_MS": str(options["latency_ms"]),
+            "BENCH_BEDROCK_TAIL_MS": str(options["tail_ms"]),
+            "BENCH_BEDROCK_TAIL_RATIO": str(options["tail_ratio"]),
+            "BENCH_BEDROCK_MODEL_LATENCY_MS": options["model_latency_ms"],
+            "BENCH_BEDROCK_THROTTLED": options["throttled"],
+            "BENCH_BEDROCK_CHUNK_MS": str(options["chunk_ms"]),
+            "BENCH_BEDROCK_MALFORMED_RATIO": str(options["malformed_ratio"]),
+        }
+        runs = {}
+        with _environ(env):
+            for hedges in (int(value) for value in options["hedges"].split(",") if value.strip()):
+                with override_settings(
+                    BEDROCK_CLIENT_FACTORY=f"{__name__}._factory",
+                    LLM_MAX_HEDGES=hedges,
+                    LLM_STREAMING=not options["no_streaming"],
+                    LLM_HEDGE_MIN_DELAY=options["hedge_min_delay"],
+                    LLM_HEDGE_DEFAULT_DELAY=max(options["hedge_min_delay"], options["latency_ms"] * 2 / 1000),
+                ):
+                    runs[f"hedges={hedges}"] = self._run(options)
+
+        result = {
+            "commit": git_commit(),
+            "backends": [backend["name"] for backend in getattr(settings, "LLM_BACKENDS", [])],
+            "fallbacks": [backend["name"] for backend in getattr(settings, "LLM_FALLBACK_BACKENDS", [])],
+            "options": {name: options[name] for name in (
+                "requests", "concurrency", "latency_ms", "tail_ms", "tail_ratio", "model_latency_ms", "throttled",
+                "chunk_ms", "malformed_ratio", "no_streaming",
+            )},
+            "runs": runs,
+        }
+        text = json.dumps(result, indent=2)
+        self.stdout.write(text)
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(text + "\n")
+
+    def _run(self, options):
+        llm.reset()
+        _fakes.clear()
+
+        def one(_):
+            start = time.perf_counter()
+            try:
+                _, backend = llm.generate(REQUEST, ReplyParser)
+            except llm.LLMUnavailable:
+                backend = "unavailable"
+            return time.perf_counter() - start, backend
+
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            outcomes = list(pool.map(one, range(options["requests"])))
+        count = max(len(outcomes), 1)
+        return {
+            **summarize([elapsed for elapsed, _ in outcomes]),
+            "model_calls_per_request": round(sum(fake.calls for fake in _fakes) / count, 3),
+            "repairs_per_request": round(sum(fake.continuations for fake in _fakes) / count, 3),
+            "chunks_per_request": round(sum(fake.chunks_sent for fake in _fakes) / count, 3),
+            "replies_by_backend": dict(Counter(backend for _, backend in outcomes)),
+        }
@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from papers.benchmarks import git_commit, isolated_environment
+from papers.benchmarks.load import (
+    Controller, find_saturation, parse_profile, server_totals, start_virtual_users,
+    summarize_actions, summarize_stage,
+)
+from papers.benchmarks.scenarios import prepare_state
+from papers.benchmarks.seed import seed
+from papers.benchmarks.server import start_gunicorn, stop, stub_environment
+from papers.benchmarks.stubs import CrossrefStub
+
+
+class Command(BaseCommand):
+    help = (
+        "Reporting-deadline load test: researchers submitting papers and chatting "
+        "while superusers run bulk updates and stats, ramped through a profile of "
+        "virtual users against a local gunicorn with stubbed Crossref/Bedrock. "
+        "Reports per-stage latency, throughput, queueing and DB lock errors, and "
+        "the first stage where the backend saturates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profile", default="5@20,15@20,30@20,60@20",
+                            help="Ramp stages as USERS@SECONDS, comma-separated")
+        parser.add_argument("--superusers", type=int, default=2,
+                            help="Virtual users acting as the superuser (counted in the profile)")
+        parser.add_argument("--gunicorn-workers", type=int, default=3, help="Production runs 3")
+        parser.add_argument("--gunicorn-threads", type=int, default=1)
+        parser.add_argument("--no-preload", action="store_true", help="Import the app in every worker")
+        parser.add_argument("--think-ms", type=float, default=1000, help="Mean pause between actions")
+        parser.add_argument("--request-timeout", type=float, default=30)
+        parser.add_argument("--papers-per-user", type=int, default=30)
+        parser.add_argument("--crossref-latency-ms", type=float, default=150)
+        parser.add_argument("--bedrock-latency-ms", type=float, default=1500)
+        parser.add_argument("--output", help="Also write the JSON report to this file")
+        parser.add_argument("--child", action="store_true", help="Internal: run in the throwaway database")
+
+    def handle(self, *args, **options):
+        try:
+            stages = parse_profile(options["profile"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options["child"]:
+            self._run_child(options, stages)
+            return
+
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ, DB_ENGINE="sqlite", SQLITE_TEST_PATH=os.path.join(tmp, "load.sqlite3"),
+                # Shared by the gunicorn workers, like production: caches and metrics
+                CACHE_BACKEND="file", CACHE_DIR=os.path.join(tmp, "cache"), METRICS_FLUSH_INTERVAL="1",
+            )
+            proc = subprocess.run([sys.executable, sys.argv[0], *sys.argv[1:], "--child"],
+                                  env=env, capture_output=True, text=True)
+        if proc.returncode != 0:
+            self.stderr.write(proc.stderr)
+            raise CommandError("Load test failed")
+        output = proc.stdout.strip().splitlines()[-1]
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                fh.write(output + "\n")
+        self.stdout.write(output)
+
+    def _run_child(self, options, stages):
+        peak = max(users for users, _ in stages)
+        researchers = max(0, peak - options["superusers"])
+        os.environ["BENCH_BEDROCK_LATENCY_MS"] = str(options["bedrock_latency_ms"])
+
+        with CrossrefStub(options["crossref_latency_ms"]) as stub, isolated_environment():
+            seeded = seed(users=max(1, researchers), papers_per_user=options["papers_per_user"],
+                          projects_per_user=3, messages_per_user=10)
+            state = prepare_state(seeded)
+            server, base_url = start_gunicorn(
+                dict(stub_environment(stub.url), CACHE_BACKEND="file", CACHE_DIR=os.environ["CACHE_DIR"]),
+                workers=options["gunicorn_workers"], threads=options["gunicorn_threads"],
+                preload=not options["no_preload"],
+            )
+            controller = Controller()
+            try:
+                users = start_virtual_users(base_url, state, controller, researchers, options["superusers"],
+                                            options["think_ms"], options["request_timeout"])
+                reports = []
+                for index, (active, seconds) in enumerate(stages):
+                    before = server_totals(base_url)
+                    controller.stage, controller.active = index, active
+                    started = time.monotonic()
+                    time.sleep(seconds)
+                    duration = time.monotonic() - started
+                    time.sleep(1.5)  # let workers publish their metrics
+                    after = server_totals(base_url)
+                    samples = [s for s in controller.samples if s[0] == index]
+                    reports.append(summarize_stage(samples, round(duration, 1), active, before, after))
+                controller.done.set()
+                for user in users:
+                    user.join(timeout=options["request_timeout"] + 5)
+            finally:
+                controller.done.set()
+                stop(server)
+
+        self.stdout.write(json.dumps({
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "profile": options["profile"],
+                "superusers": options["superusers"],
+                "gunicorn_workers": options["gunicorn_workers"],
+                "gunicorn_threads": options["gunicorn_threads"],
+                "gunicorn_preload": not options["no_preload"],
+                "think_ms": options["think_ms"],
+                "crossref_latency_ms": options["crossref_latency_ms"],
+                "bedrock_latency_ms": options["bedrock_latency_ms"],
+            },
+            "saturation": find_saturation(reports, options["gunicorn_workers"] * options["gunicorn_threads"]),
+            "stages": reports,
+            "actions": summarize_actions(controller.samples),
+        }))
@@ -0,0 +1,112 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from papers.benchmarks import QueryCounter, isolated_environment, summarize
+
+
+def _worker(worker_id, dois, barrier, results):
+    """Submit the shared DOI list as one user, starting together with the other workers."""
+    from django.contrib.auth.models import User
+    from rest_framework.test import APIClient
+
+    connections.close_all()
+    user = User.objects.get(username=f"bench-submitter-{worker_id}")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    samples, failures = [], 0
+    counter = QueryCounter()
+    barrier.wait()
+    with counter.installed():
+        for doi in dois:
+            start = time.perf_counter()
+            response = client.post("/api/papers/", {
+                "doi": doi, "title": "T", "author_name": "A", "journal": "J", "date": "2024",
+            }, format="json")
+            samples.append(time.perf_counter() - start)
+            failures += response.status_code != 201
+    connections.close_all()
+    results.put((samples, failures, counter.count))
+
+
+class Command(BaseCommand):
+    help = (
+        "Concurrency check for master copy creation: several users submit the "
+        "same DOIs at the same moment. Reports duplicate master copies (must be "
+        "0), failed creates and queries per create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--dois", type=int, default=100)
+        parser.add_argument("--child", action="store_true", help="Internal: run in the throwaway database")
+
+    def handle(self, *args, **options):
+        if options["child"]:
+            self._run_child(options["workers"], options["dois"])
+            return
+
+        # Processes need a file-backed test database to share
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SQLITE_TEST_PATH=os.path.join(tmp, "bench.sqlite3"), CACHE_BACKEND="locmem")
+            proc = subprocess.run(
+                [sys.executable, sys.argv[0], "bench_master_copy", "--child",
+                 "--workers", str(options["workers"]), "--dois", str(options["dois"])],
+                env=env, capture_output=True, text=True,
+            )
+        if proc.returncode != 0:
+            self.stderr.write(proc.stderr)
+            raise CommandError("Benchmark failed")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.stdout.write(json.dumps(result))
+        if result["duplicate_master_copies"] or result["missing_master_copies"]:
+            raise CommandError("Master copies are not unique per DOI")
+
+    def _run_child(self, workers, n_dois):
+        from django.contrib.auth.models import User
+        from django.db.models import Count
+        from papers.models import Paper
+
+        dois = [f"10.9999/race.{i}" for i in range(n_dois)]
+        with isolated_environment():
+            User.objects.create_superuser("bench-admin", "admin@example.com", "x")
+            for worker_id in range(workers):
+                User.objects.create_user(f"bench-submitter-{worker_id}")
+            connections.close_all()
+
+            ctx = multiprocessing.get_context("fork")
+            barrier, results = ctx.Barrier(workers), ctx.Queue()
+            procs = [ctx.Process(target=_worker, args=(w, dois, barrier, results)) for w in range(workers)]
+            for proc in procs:
+                proc.start()
+            collected = [results.get() for _ in procs]
+            for proc in procs:
+                proc.join()
+
+            masters = (
+                Paper.objects.filter(is_master_copy=True).values("doi")
+                .annotate(n=Count("id")).values_list("doi", "n")
+            )
+            per_doi = dict(masters)
+            duplicates = sum(n - 1 for n in per_doi.values() if n > 1)
+            missing = sum(1 for doi in dois if doi not in per_doi)
+
+        samples = [s for worker_samples, _, _ in collected for s in worker_samples]
+        creates = len(samples)
+        self.stdout.write(json.dumps({
+            "workers": workers,
+            "creates": creates,
+            "failed_creates": sum(failures for _, failures, _ in collected),
+            "duplicate_master_copies": duplicates,
+            "missing_master_copies": missing,
+            "queries_per_create": round(sum(count for _, _, count in collected) / creates, 2),
+            "latency": summarize(samples),
+        }))
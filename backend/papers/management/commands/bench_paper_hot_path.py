@@ -0,0 +1,80 @@
+import json
+import logging
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from papers.benchmarks import QueryCounter, isolated_environment, summarize, timed
+from papers.models import Paper
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure POST/GET /api/papers/ latency and query counts as the papers "
+        "table grows, with diagnostics mode off and on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,50000",
+                            help="Comma-separated total table sizes to test")
+        parser.add_argument("--requests", type=int, default=50,
+                            help="Requests per endpoint and mode")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options["sizes"].split(",")]
+        diagnostics_logger = logging.getLogger("papers.diagnostics")
+        diagnostics_logger.addHandler(logging.NullHandler())
+        diagnostics_logger.propagate = False
+
+        results = []
+        with isolated_environment():
+            owner = User.objects.create_user("bench-owner")
+            User.objects.create_superuser("bench-admin", "admin@example.com", "x")
+            user = User.objects.create_user("bench-user")
+            client = APIClient()
+            client.force_authenticate(user)
+
+            seeded = 0
+            for size in sizes:
+                Paper.objects.bulk_create(
+                    Paper(doi=f"10.9999/filler.{i}", title="Filler", author_name="A",
+                          journal="J", date="2024", user=owner)
+                    for i in range(seeded, size)
+                )
+                seeded = max(seeded, size)
+
+                for diagnostics in (False, True):
+                    with override_settings(PAPERS_DIAGNOSTICS=diagnostics):
+                        results.append(self._measure(client, size, diagnostics, options["requests"]))
+
+        for row in results:
+            self.stdout.write(json.dumps(row))
+
+    def _measure(self, client, size, diagnostics, requests):
+        post_times, get_times = [], []
+        post_queries, get_queries = QueryCounter(), QueryCounter()
+        tag = f"{size}-{int(diagnostics)}"
+
+        for i in range(requests):
+            payload = {"doi": f"10.9999/bench.{tag}.{i}", "title": "T", "author_name": "A",
+                       "journal": "J", "date": "2024"}
+            with post_queries.installed():
+                elapsed, response = timed(lambda: client.post("/api/papers/", payload, format="json"))
+            assert response.status_code == 201, response.content
+            post_times.append(elapsed)
+
+            cache.clear()  # Measure the uncached list cost
+            with get_queries.installed():
+                elapsed, response = timed(lambda: client.get("/api/papers/"))
+            assert response.status_code == 200
+            get_times.append(elapsed)
+
+        return {
+            "table_size": size,
+            "diagnostics": diagnostics,
+            "post": dict(summarize(post_times), queries_per_request=post_queries.count / requests),
+            "get": dict(summarize(get_times), queries_per_request=get_queries.count / requests),
+        }
@@ -0,0 +1,130 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+from backend_paper.database import postgres_config, sqlite_config
+
+TARGET_ALIAS = "copy_target"
+
+
+def _models_in_dependency_order():
+    """All concrete models (including M2M through tables) with FK targets first."""
+    models = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy
+    ]
+    ordered, seen = [], set()
+
+    def visit(model, stack=()):
+        if model in seen:
+            return
+        if model in stack:
+            return  # Self/cyclic references are resolved by preserving PKs
+        for field in model._meta.concrete_fields:
+            related = field.related_model
+            if field.is_relation and related is not None and related is not model and related in models:
+                visit(related, stack + (model,))
+        seen.add(model)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+@contextmanager
+def _source_timestamps(model):
+    """Copy auto_now/auto_now_add columns as stored instead of stamping them with the copy's time."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)]
+    flags = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in flags:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every table from the configured database into another database "
+        "profile (e.g. SQLite -> PostgreSQL), preserving primary keys."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--to", choices=["sqlite", "postgres"], required=True,
+                            help="Target profile; postgres reads DATABASE_URL/PG*, sqlite reads --sqlite-path")
+        parser.add_argument("--sqlite-path", help="Target file when --to sqlite")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--no-input", action="store_true",
+                            help="Do not ask before replacing data in the target")
+
+    def handle(self, *args, **options):
+        if options["to"] == "sqlite":
+            if not options["sqlite_path"]:
+                raise CommandError("--sqlite-path is required with --to sqlite")
+            os.environ["SQLITE_PATH"] = options["sqlite_path"]
+            target = sqlite_config(Path(settings.BASE_DIR))
+        else:
+            target = postgres_config()
+
+        source = connections["default"].settings_dict
+        if (target["ENGINE"], str(target["NAME"])) == (source["ENGINE"], str(source["NAME"])):
+            raise CommandError("Source and target are the same database")
+
+        if not options["no_input"]:
+            answer = input(f"This replaces all data in {target['ENGINE']} {target['NAME']}. Continue? [y/N] ")
+            if answer.lower() != "y":
+                raise CommandError("Aborted")
+
+        connections.databases[TARGET_ALIAS] = dict(target)
+        connections.configure_settings(connections.databases)  # fill in defaults
+
+        self.stdout.write("Migrating target schema...")
+        call_command("migrate", database=TARGET_ALIAS, interactive=False, verbosity=0)
+
+        models = _models_in_dependency_order()
+        target_connection = connections[TARGET_ALIAS]
+        with transaction.atomic(using=TARGET_ALIAS):
+            # migrate seeds content types and permissions; replace them with the
+            # source rows. Plain SQL so no model signals fire for the target.
+            with target_connection.cursor() as cursor:
+                for model in reversed(models):
+                    cursor.execute(f"DELETE FROM {target_connection.ops.quote_name(model._meta.db_table)}")
+
+            for model in models:
+                copied = self._copy_model(model, options["batch_size"])
+                self.stdout.write(f"  {model._meta.label}: {copied} rows")
+
+            sql = target_connection.ops.sequence_reset_sql(no_style(), models)
+            if sql:
+                with target_connection.cursor() as cursor:
+                    for statement in sql:
+                        cursor.execute(statement)
+
+        self.stdout.write(self.style.SUCCESS("Copy complete"))
+
+    def _copy_model(self, model, batch_size):
+        copied = 0
+        queryset = model._base_manager.using("default").order_by("pk")
+        batch = []
+        with _source_timestamps(model):
+            for obj in queryset.iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    model._base_manager.using(TARGET_ALIAS).bulk_create(batch)
+                    copied += len(batch)
+                    batch = []
+            if batch:
+                model._base_manager.using(TARGET_ALIAS).bulk_create(batch)
+                copied += len(batch)
+        return copied
@@ -0,0 +1,58 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from papers.enrichment import enrich_batch
+from papers.models import Paper
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-validate stored papers against Crossref: fill blank journal/date/"
+        "publication type and flag conflicting values for review. Progress is "
+        "recorded per paper, so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--stale-days", type=int, default=30,
+                            help="Re-check papers last checked more than this many days ago")
+        parser.add_argument("--batch-size", type=int, default=50, help="DOIs resolved per batch")
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many DOIs")
+        parser.add_argument("--refresh", action="store_true",
+                            help="Bypass the Crossref metadata cache")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["stale_days"])
+        pending = (
+            Paper.objects.filter(Q(metadata_checked_at__isnull=True) | Q(metadata_checked_at__lt=cutoff))
+            .order_by("doi_key").values_list("doi_key", flat=True).distinct()
+        )
+
+        totals = {"checked": 0, "filled": 0, "conflicts": 0, "errors": 0}
+        last_doi = ""
+        remaining = options["limit"]
+        started = time.monotonic()
+        while remaining is None or remaining > 0:
+            size = options["batch_size"] if remaining is None else min(options["batch_size"], remaining)
+            # Keyset pagination: DOIs that failed stay pending but are not retried this run
+            dois = list(pending.filter(doi_key__gt=last_doi)[:size])
+            if not dois:
+                break
+            last_doi = dois[-1]
+            if remaining is not None:
+                remaining -= len(dois)
+
+            counts = enrich_batch(dois, refresh=options["refresh"])
+            for key, value in counts.items():
+                totals[key] += value
+            self.stdout.write(
+                f"{totals['checked']} DOIs checked, {totals['filled']} papers filled, "
+                f"{totals['conflicts']} with conflicts, {totals['errors']} errors"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done in {time.monotonic() - started:.1f}s: {totals}"
+        ))
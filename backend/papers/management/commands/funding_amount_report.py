@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from papers.funding import OK, parse_amount
+from papers.models import Project
+
+
+class Command(BaseCommand):
+    help = (
+        "List projects whose legacy free-text amount could not be parsed cleanly "
+        "(ambiguous separators or unreadable text), with the value now stored."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Also list cleanly parsed amounts")
+
+    def handle(self, *args, **options):
+        counts = {}
+        rows = Project.objects.exclude(amount_text="").order_by("pk").values_list(
+            "pk", "project_name", "amount_text", "amount", "currency",
+        )
+        for pk, name, text, amount, currency in rows.iterator():
+            _, _, note = parse_amount(text)
+            counts[note] = counts.get(note, 0) + 1
+            if note != OK or options["all"]:
+                stored = "NULL" if amount is None else f"{amount} {currency}"
+                self.stdout.write(f"{pk}\t{name}\t{text!r}\t-> {stored}\t({note})")
+
+        summary = ", ".join(f"{count} {note}" for note, count in sorted(counts.items())) or "no legacy amounts"
+        self.stdout.write(self.style.SUCCESS(f"Legacy amounts: {summary}"))
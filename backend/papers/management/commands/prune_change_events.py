@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from papers.events import RETENTION, prune
+from papers.models import ChangeEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete dashboard change events older than EVENT_STREAM_RETENTION_HOURS. "
+        "The job worker and the event stream already prune now and then; run "
+        "this nightly when neither is running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - RETENTION
+        if options["dry_run"]:
+            deleted = ChangeEvent.objects.filter(created_at__lt=cutoff).count()
+        else:
+            deleted = prune()
+        kept = ChangeEvent.objects.filter(created_at__gte=cutoff).count()
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} expired change events; {kept} kept"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from papers.models import RevokedToken
+from papers.revocation import prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete revocations of JWTs that have expired anyway. Revoking already "
+        "prunes now and then; run this nightly to keep the table small when "
+        "few refreshes happen."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["dry_run"]:
+            deleted = RevokedToken.objects.filter(expires_at__lte=now).count()
+        else:
+            deleted = prune()
+        active = RevokedToken.objects.filter(expires_at__gt=now).count()
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} expired token revocations; {active} still active"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from papers.accounts import reconcile_master_copies
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete master copies that no researcher's paper backs any more (e.g. "
+        "after users were deleted). Copies already submitted for a reporting "
+        "year are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted")
+
+    def handle(self, *args, **options):
+        deleted, kept = reconcile_master_copies(dry_run=options["dry_run"])
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {deleted} orphaned master copies; kept {kept} already submitted"
+        ))
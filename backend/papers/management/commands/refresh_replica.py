@@ -0,0 +1,48 @@
+import os
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from papers import caching
+from papers.routers import REPLICA_ALIAS, mark_synced
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the SQLite read replica with a consistent snapshot of the "
+        "primary database. Run periodically (e.g. every minute from cron)."
+    )
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.databases:
+            raise CommandError("No replica configured (set DB_REPLICA=sqlite)")
+        primary = connections["default"].settings_dict
+        replica = connections.databases[REPLICA_ALIAS]
+        if "sqlite3" not in primary["ENGINE"] or "sqlite3" not in replica["ENGINE"]:
+            raise CommandError("refresh_replica only snapshots SQLite; a PostgreSQL standby replicates itself")
+
+        target = str(replica["NAME"])
+        tmp_path = f"{target}.tmp"
+        started_at = time.time()
+
+        # The backup API copies a consistent snapshot while writers continue
+        source = sqlite3.connect(str(primary["NAME"]))
+        dest = sqlite3.connect(tmp_path)
+        try:
+            source.backup(dest, pages=4096)
+            dest.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dest.close()
+            source.close()
+
+        # Atomic swap: readers see either the old or the new snapshot
+        os.replace(tmp_path, target)
+        mark_synced(started_at)
+        # Cached reports may have been built from the previous snapshot
+        caching.invalidate_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Replica refreshed in {time.time() - started_at:.2f}s"
+        ))
@@ -0,0 +1,65 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from papers import events, jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue (see papers/jobs.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=2,
+                            help="Jobs executed in parallel by this process")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds to sleep when the queue is empty")
+        parser.add_argument("--once", action="store_true",
+                            help="Exit once no due jobs are left (cron/testing)")
+
+    def handle(self, *args, **options):
+        self._stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: self._stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self._stop.set())
+
+        jobs.requeue_stale()
+        pruned = jobs.prune_finished()
+        if pruned:
+            self.stdout.write(f"Pruned {pruned} finished jobs")
+        events.prune()
+
+        threads = [
+            threading.Thread(target=self._loop, args=(options["poll_interval"], options["once"]), daemon=True)
+            for _ in range(options["concurrency"])
+        ]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=0.5)
+        self.stdout.write("Worker stopped")
+
+    def _loop(self, poll_interval, once):
+        worker = jobs.worker_id()
+        last_maintenance = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                close_old_connections()
+                job = jobs.claim_next(worker)
+                if job is None:
+                    if once:
+                        return
+                    self._stop.wait(poll_interval)
+                else:
+                    ok = jobs.execute(job)
+                    self.stdout.write(f"{'done' if ok else 'failed'}: {job.name} #{job.pk}")
+
+                if time.monotonic() - last_maintenance > 60:
+                    last_maintenance = time.monotonic()
+                    jobs.requeue_stale()
+                    jobs.prune_finished()
+                    events.prune()
+        finally:
+            connection.close()
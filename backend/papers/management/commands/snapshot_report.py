@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from papers.reporting import create_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        "Freeze the next version of a year's annual report (papers by "
+        "publication type and project, projects funded that year by funding body "
+        "and status), "
+        "e.g. from cron at the reporting deadline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int, help="Year to report on: papers' submission year, projects' funding year")
+        parser.add_argument("--label", default="", help="Free-text label, e.g. 'final'")
+
+    def handle(self, *args, **options):
+        snapshot = create_snapshot(options["year"], label=options["label"])
+        papers, projects = snapshot.report["papers"], snapshot.report["projects"]
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {snapshot.pk}: {snapshot.year} v{snapshot.version}, "
+            f"{papers['total']} papers, {projects['total']} projects "
+            f"({projects['without_funding_year']} without a funding year)"
+        ))
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0009_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paper',
+            name='metadata_checked_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='paper',
+            name='metadata_conflicts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,124 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+# A frozen copy of papers.funding.parse_amount as of this migration, so later
+# changes to the app's parser do not change what this migration did.
+# Run `manage.py funding_amount_report` afterwards to review amounts that
+# were ambiguous or could not be parsed.
+_CURRENCY_MARKERS = (
+    ("EUR", ("€", "eur")),
+    ("USD", ("$", "usd")),
+    ("GBP", ("£", "gbp")),
+    ("SEK", ("sek", "kr")),
+)
+_MULTIPLIERS = (
+    (Decimal(10) ** 9, ("bn", "billion", "mdr")),
+    (Decimal(10) ** 6, ("msek", "mkr", "million", "milj", "mn", "m")),
+    (Decimal(10) ** 3, ("ksek", "tkr", "thousand", "k")),
+)
+_NUMBER = re.compile(r"[-+]?\d[\d\s.,']*")
+
+
+def _currency(text):
+    for code, markers in _CURRENCY_MARKERS:
+        if any(marker in text for marker in markers):
+            return code
+    return None
+
+
+def _multiplier(rest):
+    words = re.findall(r"[a-z]+", rest)
+    for factor, suffixes in _MULTIPLIERS:
+        if any(word in suffixes for word in words):
+            return factor
+    return Decimal(1)
+
+
+def _number(token):
+    token = re.sub(r"[\s']", "", token).rstrip(".,")
+    if "," in token and "." in token:
+        decimal_sep = "," if token.rfind(",") > token.rfind(".") else "."
+        thousands_sep = "." if decimal_sep == "," else ","
+        token = token.replace(thousands_sep, "").replace(decimal_sep, ".")
+    elif "," in token or "." in token:
+        sep = "," if "," in token else "."
+        head, _, tail = token.rpartition(sep)
+        if token.count(sep) > 1:
+            token = token.replace(sep, "")
+        elif len(tail) == 3:
+            token = head + tail
+        else:
+            token = f"{head}.{tail}"
+    return Decimal(token)
+
+
+def _parse_amount(text):
+    """``(amount, currency)``; amount is None when nothing numeric could be read."""
+    raw = (text or "").strip()
+    if not raw:
+        return Decimal(0), "SEK"
+    lowered = raw.lower()
+    currency = _currency(lowered) or "SEK"
+    match = _NUMBER.search(lowered)
+    if match is None:
+        return None, currency
+    try:
+        value = _number(match.group())
+    except InvalidOperation:
+        return None, currency
+    value *= _multiplier(lowered[match.end():])
+    return value.quantize(Decimal("0.01")), currency
+
+
+def parse_amounts(apps, schema_editor):
+    Project = apps.get_model("papers", "Project")
+    for project in Project.objects.all().iterator():
+        amount, currency = _parse_amount(project.amount_text)
+        Project.objects.filter(pk=project.pk).update(amount=amount, currency=currency)
+
+
+def restore_text(apps, schema_editor):
+    Project = apps.get_model("papers", "Project")
+    for project in Project.objects.filter(amount_text="").exclude(amount=None).iterator():
+        Project.objects.filter(pk=project.pk).update(amount_text=str(project.amount))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("papers", "0010_paper_metadata_review"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="project",
+            old_name="amount",
+            new_name="amount_text",
+        ),
+        migrations.AlterField(
+            model_name="project",
+            name="amount_text",
+            field=models.CharField(blank=True, default="", max_length=255),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="amount",
+            field=models.DecimalField(blank=True, decimal_places=2, default=Decimal("0"), max_digits=15, null=True),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="currency",
+            field=models.CharField(
+                choices=[("SEK", "SEK"), ("EUR", "EUR"), ("USD", "USD"), ("GBP", "GBP")],
+                default="SEK", max_length=3,
+            ),
+        ),
+        migrations.AddField(
+            model_name="project",
+            name="funding_year",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(parse_amounts, restore_text),
+    ]
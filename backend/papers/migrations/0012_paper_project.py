@@ -0,0 +1,49 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _match_project(projects, user_id, name):
+    """
+    A frozen copy of papers.milestones.match_project as of this migration:
+    the owner's project of that name, else the only project with that name.
+    """
+    name = (name or "").strip()
+    if not name:
+        return None
+    candidates = list(projects.filter(project_name__iexact=name).values_list("pk", "user_id")[:50])
+    for pk, owner_id in candidates:
+        if owner_id == user_id:
+            return pk
+    return candidates[0][0] if len(candidates) == 1 else None
+
+
+def link_papers(apps, schema_editor):
+    # Papers left unlinked are counted by GET /api/projects/paper-counts/ ("unlinked")
+    Paper = apps.get_model("papers", "Paper")
+    Project = apps.get_model("papers", "Project")
+    pairs = (
+        Paper.objects.exclude(milestone_project="")
+        .values_list("user_id", "milestone_project").distinct().order_by()
+    )
+    for user_id, name in pairs:
+        project_id = _match_project(Project.objects.all(), user_id, name)
+        if project_id is not None:
+            Paper.objects.filter(user_id=user_id, milestone_project=name).update(project_id=project_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0011_project_decimal_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paper',
+            name='project',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='papers', to='papers.project'),
+        ),
+        migrations.RunPython(link_papers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0013_report_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThrottleBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('tat', models.FloatField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ThrottleLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200)),
+                ('slot', models.IntegerField()),
+                ('expires_at', models.DateTimeField()),
+            ],
+            options={
+                'unique_together': {('key', 'slot')},
+            },
+        ),
+    ]
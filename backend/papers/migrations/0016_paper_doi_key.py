@@ -0,0 +1,89 @@
+# Generated by Django 5.1.6 on 2026-10-19 16:02
+
+import re
+from urllib.parse import unquote
+
+from django.db import migrations, models
+
+BATCH_SIZE = 500
+
+# A frozen copy of papers.dois as of this migration
+_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.IGNORECASE)
+
+
+def clean_doi(value):
+    doi = (value or "").strip()
+    for _ in range(2):
+        if "%" not in doi:
+            break
+        doi = unquote(doi)
+    while True:
+        stripped = _PREFIX.sub("", doi).strip()
+        if stripped == doi:
+            return doi
+        doi = stripped
+
+
+def normalize_doi(value):
+    return clean_doi(value).lower()
+
+
+def collapse_variants(apps, schema_editor):
+    Paper = apps.get_model("papers", "Paper")
+
+    papers = []
+    for paper in Paper.objects.only("pk", "doi").order_by("pk").iterator(chunk_size=BATCH_SIZE):
+        paper.doi = clean_doi(paper.doi)
+        paper.doi_key = normalize_doi(paper.doi)
+        papers.append(paper)
+    Paper.objects.bulk_update(papers, ["doi", "doi_key"], batch_size=BATCH_SIZE)
+
+    # Variants of one DOI held by the same user: keep one row, preferring a
+    # submitted one, and carry over what only the others had
+    duplicates = (
+        Paper.objects.values("user_id", "doi_key").annotate(n=models.Count("pk"))
+        .filter(n__gt=1).values_list("user_id", "doi_key").order_by()
+    )
+    for user_id, doi_key in list(duplicates):
+        rows = list(Paper.objects.filter(user_id=user_id, doi_key=doi_key).order_by("pk"))
+        keep = next((row for row in rows if row.submission_year is not None), rows[0])
+        others = [row for row in rows if row.pk != keep.pk]
+        for field in ("project_id", "publication_type", "milestone_project"):
+            if not getattr(keep, field):
+                setattr(keep, field, next((getattr(row, field) for row in others if getattr(row, field)),
+                                          getattr(keep, field)))
+        keep.save(update_fields=["project_id", "publication_type", "milestone_project"])
+        Paper.objects.filter(pk__in=[row.pk for row in others]).delete()
+
+    # Copies filed under a variant spelling missed the submission year sync
+    submitted = Paper.objects.filter(is_master_copy=True, submission_year__isnull=False)
+    for doi_key, submission_year in submitted.values_list("doi_key", "submission_year"):
+        Paper.objects.filter(doi_key=doi_key).exclude(submission_year=submission_year).update(
+            submission_year=submission_year,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('papers', '0015_profile_report'),
+    ]
+
+    operations = [
+        # Cleaning DOIs can make variants collide on the old (user, doi) constraint
+        migrations.AlterUniqueTogether(
+            name='paper',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='paper',
+            name='doi_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=255),
+            preserve_default=False,
+        ),
+        migrations.RunPython(collapse_variants, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='paper',
+            unique_together={('user', 'doi_key')},
+        ),
+    ]
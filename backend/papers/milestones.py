@@ -0,0 +1,81 @@
+"""
+Links between papers and the projects they report to.
+
+Papers carry the milestone project's name in ``milestone_project`` (what the
+submission form sends) and a ``project`` foreign key resolved from it. A name
+resolves to the paper owner's project of that name, or otherwise to the only
+project anywhere with that name; names matching several other users'
+projects, or none, stay unlinked. Renaming a project rewrites the name on its
+linked papers, so the two never drift apart.
+"""
+from django.db.models import Count, Q
+
+from . import caching
+from .events import publish
+
+
+def match_project(projects, user_id, name):
+    """
+    Return the pk of the project ``name`` refers to for a paper owned by
+    ``user_id``, or None. ``projects`` is a Project queryset (migration 0012
+    has a frozen copy of this function).
+    """
+    name = (name or "").strip()
+    if not name:
+        return None
+    candidates = list(projects.filter(project_name__iexact=name).values_list("pk", "user_id")[:50])
+    for pk, owner_id in candidates:
+        if owner_id == user_id:
+            return pk
+    return candidates[0][0] if len(candidates) == 1 else None
+
+
+def resolve(user_id, name):
+    from .models import Project
+
+    return match_project(Project.objects.all(), user_id, name)
+
+
+def link_unresolved(project):
+    """Link papers that named ``project`` before it existed."""
+    from .models import Paper, Project
+
+    unlinked = Paper.objects.filter(project__isnull=True, milestone_project__iexact=project.project_name)
+    if Project.objects.filter(project_name__iexact=project.project_name).count() > 1:
+        unlinked = unlinked.filter(user_id=project.user_id)
+    _update_papers(unlinked, "linked", project, project_id=project.pk)
+
+
+def rename_linked(project):
+    """Carry a project rename over to the ``milestone_project`` of its papers."""
+    from .models import Paper
+
+    linked = Paper.objects.filter(project=project).exclude(milestone_project=project.project_name)
+    _update_papers(linked, "project_renamed", project, milestone_project=project.project_name)
+
+
+def _update_papers(papers, action, project, **fields):
+    owners = list(papers.values_list("user_id", flat=True).distinct())
+    if not owners:
+        return
+    papers.update(**fields)
+    # .update() bypasses post_save, so refresh caches and announce explicitly
+    caching.invalidate_papers(*owners)
+    for owner_id in owners:
+        publish("paper", action, None, owner_id,
+                {"project_id": project.pk, "project_name": project.project_name})
+
+
+def paper_counts(projects, **paper_filter):
+    """
+    ``projects`` annotated with the number of linked papers matching
+    ``paper_filter`` (e.g. ``user_id=3``), as one grouped join on the
+    project index. Returns ``[{"id", "project_name", "paper_count"}]``.
+    """
+    counted = Q(**{f"papers__{field}": value for field, value in paper_filter.items()})
+    rows = (
+        projects.annotate(paper_count=Count("papers", filter=counted))
+        .values("id", "project_name", "paper_count")
+        .order_by("project_name", "id")
+    )
+    return list(rows)
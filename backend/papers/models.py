@@ -1,5 +1,11 @@
+from decimal import Decimal
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .dois import clean_doi, normalize_doi
+from .funding import CURRENCIES, DEFAULT_CURRENCY
 
 class Project(models.Model):
     project_name = models.CharField(max_length=255)
@@ -9,7 +15,12 @@ class Project(models.Model):
     documents = models.CharField(max_length=255, null=True, blank=True)
     additional_authors = models.JSONField(default=list)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    amount = models.CharField(max_length=255, default="0")
+    # Null when a legacy amount could not be parsed (see papers/funding.py)
+    amount = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, default=Decimal("0"))
+    currency = models.CharField(max_length=3, choices=CURRENCIES, default=DEFAULT_CURRENCY)
+    funding_year = models.IntegerField(null=True, blank=True)
+    # Original free-text amount from before amounts were numeric
+    amount_text = models.CharField(max_length=255, blank=True, default="")
 
 
     class Meta:
@@ -17,9 +28,20 @@ class Project(models.Model):
     def __str__(self):
         return self.project_name
 
+class PaperQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create skips Paper.save(); normalize here so no write path misses it
+        objs = list(objs)
+        for paper in objs:
+            paper.normalize_doi()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Paper(models.Model):
     author_name = models.CharField(max_length=255)
     doi = models.CharField(max_length=255)
+    # normalize_doi(doi), used for all lookups (papers/dois.py)
+    doi_key = models.CharField(max_length=255, db_index=True, editable=False)
     title = models.CharField(max_length=255)
     journal = models.CharField(max_length=255)
     date = models.CharField(max_length=255)
@@ -27,14 +49,33 @@ class Paper(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     publication_type = models.CharField(max_length=255, default="")
     milestone_project = models.CharField(max_length=255, default="", blank=True)
+    # Resolved from milestone_project (papers/milestones.py)
+    project = models.ForeignKey(Project, null=True, blank=True, on_delete=models.SET_NULL, related_name="papers")
     submission_year = models.IntegerField(null=True, blank=True)
 
     is_master_copy = models.BooleanField(default=False) 
 
+    # Crossref re-validation (papers/enrichment.py)
+    metadata_checked_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    metadata_conflicts = models.JSONField(default=dict, blank=True)
+
+    objects = PaperQuerySet.as_manager()
+
     class Meta: 
-        unique_together = ('user', 'doi')
+        unique_together = ('user', 'doi_key')
     def __str__(self):
         return self.doi
+
+    def normalize_doi(self):
+        self.doi = clean_doi(self.doi)
+        self.doi_key = normalize_doi(self.doi)
+
+    def save(self, *args, **kwargs):
+        self.normalize_doi()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "doi" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "doi_key"}
+        super().save(*args, **kwargs)
     
 class ChatMessage(models.Model):
     ROLE_CHOICES = (
@@ -48,4 +89,142 @@ class ChatMessage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.user.username} ({self.role}): {self.content[:30]}"
\ No newline at end of file
+        return f"{self.user.username} ({self.role}): {self.content[:30]}"
+
+class ChangeEvent(models.Model):
+    """
+    Append-only log of paper/project changes, tailed by the event stream.
+    Kept in the database so every gunicorn worker can publish and the ASGI
+    process can fan events out without an external broker.
+    """
+    model = models.CharField(max_length=20)
+    action = models.CharField(max_length=20)
+    object_id = models.BigIntegerField(null=True, blank=True)
+    owner_id = models.IntegerField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.model}.{self.action} ({self.object_id})"
+
+
+class Job(models.Model):
+    """A unit of background work, executed by ``manage.py run_jobs``."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    )
+
+    name = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+    locked_by = models.CharField(max_length=100, blank=True, default="")
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class ReportSnapshot(models.Model):
+    """
+    A frozen, versioned annual report (papers/reporting.py). ``report`` holds
+    the aggregates, ``papers`` the paper rows as ``{"columns", "rows"}``.
+    """
+    year = models.IntegerField()
+    version = models.IntegerField()
+    label = models.CharField(max_length=255, blank=True, default="")
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    report = models.JSONField(default=dict)
+    papers = models.JSONField(default=dict)
+
+    class Meta:
+        unique_together = ('year', 'version')
+        ordering = ['-year', '-version']
+
+    def __str__(self):
+        return f"{self.year} v{self.version}"
+
+
+class ThrottleBucket(models.Model):
+    """Token-bucket state for one scope and client (papers/throttling.py)."""
+    key = models.CharField(max_length=200, unique=True)
+    tat = models.FloatField()  # GCRA theoretical arrival time, unix seconds
+
+    def __str__(self):
+        return self.key
+
+
+class ThrottleLease(models.Model):
+    """One in-flight request slot held by a client (papers/throttling.py)."""
+    key = models.CharField(max_length=200)
+    slot = models.IntegerField()
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('key', 'slot')
+
+    def __str__(self):
+        return f"{self.key} #{self.slot}"
+
+
+class ProfileReport(models.Model):
+    """A profiled request (papers/profiling.py); pruned by age and count."""
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    query_string = models.CharField(max_length=500, blank=True, default="")
+    view = models.CharField(max_length=200, blank=True, default="")
+    status_code = models.IntegerField()
+    duration_ms = models.FloatField()
+    sql_count = models.IntegerField(default=0)
+    sql_ms = models.FloatField(default=0)
+    report = models.JSONField(default=dict)
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+
+class IdempotencyRecord(models.Model):
+    """Stored response of a create request sent with an Idempotency-Key (papers/idempotency.py)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)  # Method, path and body of the first request
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Null while the first request is still running
+    status_code = models.IntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('user', 'key')
+
+    def __str__(self):
+        return f"{self.user_id}:{self.key}"
+
+
+class RevokedToken(models.Model):
+    """A JWT that may no longer be used, by ``jti`` (papers/revocation.py)."""
+    jti = models.CharField(max_length=255, unique=True)
+    # Rows are only needed until the token would have expired anyway
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,257 @@
+"""
+On-demand profiling of single production requests.
+
+A superuser adds ``X-Profile: 1`` (or ``?_profile=1``) to any ``/api/``
+request. ``ProfilingMiddleware`` then runs the request under cProfile and
+records every SQL statement with its timing, runs ``EXPLAIN`` on the most
+expensive distinct SELECTs afterwards, and collects the outbound call
+timings from the request metrics. Parameters are kept only for SELECTs
+that do not touch credential tables (REDACTED_TABLES); writes and those
+reads are stored as SQL text alone, so reports never hold passwords, token
+ids or request payloads. The report is stored as a
+``ProfileReport`` (at most PROFILE_MAX_REPORTS, each kept for
+PROFILE_RETENTION_DAYS) and its id returned in the ``X-Profile-Id`` header;
+``/api/profiles/`` lists them. Requests without the trigger, or from anyone
+else, pay one header lookup.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections
+from django.utils import timezone
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .instrumentation import _view_name, current_stats
+from .models import IdempotencyRecord, ProfileReport, RevokedToken
+
+logger = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_PROFILE"
+QUERY_FLAG = "_profile"
+EXCLUDED_PREFIXES = ("/api/events/", "/api/metrics/", "/api/profiles/")
+REDACTED_TABLES = tuple(f'"{model._meta.db_table}"' for model in (User, RevokedToken, IdempotencyRecord))
+REDACTED = "[redacted]"
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _requested(request):
+    return (
+        _setting("PROFILING_ENABLED", True)
+        and request.path.startswith("/api/")
+        and not request.path.startswith(EXCLUDED_PREFIXES)
+        and (request.META.get(HEADER) == "1" or request.GET.get(QUERY_FLAG) == "1")
+    )
+
+
+def _superuser(request):
+    """The JWT user if the request carries a valid superuser token (views authenticate later)."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user if user.is_superuser else None
+    try:
+        result = JWTAuthentication().authenticate(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    if result is None or not result[0].is_superuser:
+        return None
+    return result[0]
+
+
+def _redacted(query):
+    return not query["sql"].lstrip().upper().startswith("SELECT") or any(
+        table in query["sql"] for table in REDACTED_TABLES
+    )
+
+
+class _QueryLog:
+    def __init__(self, alias):
+        self.alias = alias
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                "alias": self.alias,
+                "sql": sql,
+                "params": None if many else params,
+                "many": many,
+                "ms": round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def _call_tree(stats, total, min_fraction=0.01, max_depth=25):
+    """Nested ``{"function", "cumulative_ms", "calls", "children"}`` from cProfile data."""
+    children = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, calls, _, cumulative) in callers.items():
+            children.setdefault(caller, []).append((func, calls, cumulative))
+
+    def label(func):
+        filename, line, name = func
+        if filename == "~":
+            return name  # builtins
+        return f"{name} ({os.path.relpath(filename) if filename.startswith(os.getcwd()) else filename}:{line})"
+
+    def build(func, calls, cumulative, depth, seen):
+        node = {"function": label(func), "cumulative_ms": round(cumulative * 1000, 3), "calls": calls, "children": []}
+        if depth < max_depth and func not in seen:
+            for child, child_calls, child_cumulative in sorted(children.get(func, ()), key=lambda c: -c[2]):
+                if child_cumulative >= total * min_fraction:
+                    node["children"].append(build(child, child_calls, child_cumulative, depth + 1, seen | {func}))
+        return node
+
+    roots = [
+        (func, nc, ct) for func, (_, nc, _, ct, callers) in stats.stats.items()
+        if not callers and ct >= total * min_fraction
+    ]
+    if not roots and stats.stats:
+        # The middleware chain recurses through the same wrapper, so the
+        # outermost frame has callers too; it has the largest cumulative time
+        func, (_, nc, _, ct, _) = max(stats.stats.items(), key=lambda item: item[1][3])
+        roots = [(func, nc, ct)]
+    return [build(func, calls, cumulative, 0, frozenset()) for func, calls, cumulative in sorted(roots, key=lambda r: -r[2])]
+
+
+def _top_functions(stats, limit=40):
+    rows = []
+    for (filename, line, name), (_, nc, tt, ct, _) in stats.stats.items():
+        rows.append({
+            "function": name, "file": filename, "line": line, "calls": nc,
+            "self_ms": round(tt * 1000, 3), "cumulative_ms": round(ct * 1000, 3),
+        })
+    return sorted(rows, key=lambda row: -row["self_ms"])[:limit]
+
+
+def _explain(queries):
+    """EXPLAIN the most expensive distinct SELECTs not redacted, after the request finished."""
+    totals = {}
+    for query in queries:
+        if query["many"] or _redacted(query):
+            continue
+        entry = totals.setdefault((query["alias"], query["sql"]), {"ms": 0.0, "params": query["params"]})
+        entry["ms"] += query["ms"]
+
+    plans = []
+    ranked = sorted(totals.items(), key=lambda item: -item[1]["ms"])
+    for (alias, sql), entry in ranked[:_setting("PROFILE_EXPLAIN_LIMIT", 10)]:
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", entry["params"])
+                plan = ["\t".join(str(col) for col in row) for row in cursor.fetchall()]
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        plans.append({"alias": alias, "sql": sql, "total_ms": round(entry["ms"], 3), "plan": plan})
+    return plans
+
+
+def _sql_summary(queries):
+    repeated = {}
+    for query in queries:
+        repeated[query["sql"]] = repeated.get(query["sql"], 0) + 1
+    return {
+        "count": len(queries),
+        "total_ms": round(sum(query["ms"] for query in queries), 3),
+        # The same statement run many times usually means an N+1 loop
+        "repeated": sorted(
+            ({"sql": sql, "count": count} for sql, count in repeated.items() if count > 1),
+            key=lambda row: -row["count"],
+        )[:20],
+    }
+
+
+def prune():
+    cutoff = timezone.now() - timedelta(days=_setting("PROFILE_RETENTION_DAYS", 7))
+    ProfileReport.objects.filter(created_at__lt=cutoff).delete()
+    keep = _setting("PROFILE_MAX_REPORTS", 200)
+    stale = ProfileReport.objects.order_by("-created_at").values_list("pk", flat=True)[keep:]
+    ProfileReport.objects.filter(pk__in=list(stale)).delete()
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _requested(request):
+            return self.get_response(request)
+        user = _superuser(request)
+        if user is None:
+            return self.get_response(request)
+        return self._profile(request, user)
+
+    def _profile(self, request, user):
+        logs = [_QueryLog(alias) for alias in connections]
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for log in logs:
+                stack.enter_context(connections[log.alias].execute_wrapper(log))
+            profiler.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        try:
+            report = self._save(request, user, response, profiler, duration, logs)
+            response["X-Profile-Id"] = str(report.pk)
+        except Exception as e:
+            # Profiling must never break the request being profiled
+            logger.error(f"Error storing profile report: {e}")
+        return response
+
+    def _save(self, request, user, response, profiler, duration, logs):
+        stats = pstats.Stats(profiler)
+        queries = [query for log in logs for query in log.queries]
+        max_queries = _setting("PROFILE_MAX_QUERIES", 500)
+        request_stats = current_stats()
+        outbound = {}
+        if request_stats is not None:
+            outbound = {
+                service: [round(d * 1000, 3) for d in durations]
+                for service, durations in request_stats.outbound.items()
+            }
+
+        report = ProfileReport.objects.create(
+            user=user,
+            method=request.method,
+            path=request.path[:500],
+            query_string=request.META.get("QUERY_STRING", "")[:500],
+            view=_view_name(request)[:200],
+            status_code=response.status_code,
+            duration_ms=round(duration * 1000, 3),
+            sql_count=len(queries),
+            sql_ms=round(sum(query["ms"] for query in queries), 3),
+            report={
+                "call_tree": _call_tree(stats, duration),
+                "top_functions": _top_functions(stats),
+                "sql": {
+                    **_sql_summary(queries),
+                    "statements": [
+                        dict(query, params=REDACTED if _redacted(query) else repr(query["params"]))
+                        for query in queries[:max_queries]
+                    ],
+                    "truncated": len(queries) > max_queries,
+                    "explain": _explain(queries),
+                },
+                "outbound_ms": outbound,
+            },
+        )
+        prune()
+        return report
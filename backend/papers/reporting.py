@@ -0,0 +1,149 @@
+"""
+Frozen annual reporting snapshots.
+
+``create_snapshot(year)`` reads the live tables once, inside one
+transaction, and stores the result as a versioned ``ReportSnapshot`` row:
+the aggregate report (papers by publication type and project, projects by
+funding body and status, funding totals) plus the paper rows behind it in a
+compact columns/rows layout. Papers count towards their submission year and
+projects towards their ``funding_year``; projects without one are only
+counted (``without_funding_year``), never attributed to a year. Reading, exporting and diffing snapshots only
+ever touches that one row per snapshot, never the paper or project tables.
+"""
+import csv
+import io
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+
+from . import caching
+from .funding import funding_totals
+from .models import Paper, Project, ReportSnapshot
+
+PAPER_COLUMNS = (
+    "doi", "title", "author_name", "journal", "date", "publication_type", "project", "submission_year",
+)
+UNASSIGNED = "(none)"
+
+
+def _counts(queryset, field):
+    rows = queryset.values(field).annotate(n=Count("id")).order_by(field)
+    return {str(row[field]) if row[field] not in (None, "") else UNASSIGNED: row["n"] for row in rows}
+
+
+def build_report(year):
+    """Aggregate report for ``year``'s submitted master copies and projects funded that year."""
+    papers = Paper.objects.filter(
+        user_id=caching.superuser_id(), is_master_copy=True, submission_year=year,
+    )
+    projects = Project.objects.filter(funding_year=year)
+
+    rows = []
+    by_project = {}
+    for paper in papers.values_list(*PAPER_COLUMNS[:-2], "project__project_name", "milestone_project",
+                                    "submission_year").order_by("doi"):
+        *fields, linked_name, milestone, submission_year = paper
+        project = linked_name or milestone or UNASSIGNED
+        by_project[project] = by_project.get(project, 0) + 1
+        rows.append([*fields, project, submission_year])
+
+    report = {
+        "papers": {
+            "total": len(rows),
+            "by_publication_type": _counts(papers, "publication_type"),
+            "by_project": dict(sorted(by_project.items())),
+        },
+        "projects": {
+            "total": projects.count(),
+            "by_funding_body": _counts(projects, "funding_body"),
+            "by_status": _counts(projects, "status"),
+            "funding": funding_totals(projects, ["funding_body"]),
+            "without_funding_year": Project.objects.filter(funding_year__isnull=True).count(),
+        },
+    }
+    return report, {"columns": list(PAPER_COLUMNS), "rows": rows}
+
+
+def create_snapshot(year, user=None, label=""):
+    """Materialize the next version of ``year``'s report."""
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                report, papers = build_report(year)
+                latest = ReportSnapshot.objects.filter(year=year).aggregate(v=Max("version"))["v"]
+                return ReportSnapshot.objects.create(
+                    year=year, version=(latest or 0) + 1, label=label,
+                    created_by=user, report=report, papers=papers,
+                )
+        except IntegrityError:
+            continue  # Someone else took this version number; retry with the next
+    raise IntegrityError(f"Could not allocate a snapshot version for {year}")
+
+
+def export_csv(snapshot):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(snapshot.papers["columns"])
+    writer.writerows(snapshot.papers["rows"])
+    return buffer.getvalue()
+
+
+def _diff_counts(old, new):
+    changes = {}
+    for key in sorted(set(old) | set(new)):
+        before, after = old.get(key, 0), new.get(key, 0)
+        if before != after:
+            changes[key] = {"from": before, "to": after, "change": after - before}
+    return changes
+
+
+def _diff_totals(old, new):
+    """Funding rows keyed by (funding_body, currency)."""
+    def keyed(rows):
+        return {f"{row['funding_body'] or UNASSIGNED} {row['currency']}": row["total"] for row in rows}
+
+    old, new = keyed(old), keyed(new)
+    return {
+        key: {"from": old.get(key), "to": new.get(key)}
+        for key in sorted(set(old) | set(new)) if old.get(key) != new.get(key)
+    }
+
+
+def diff_snapshots(old, new):
+    """What changed between two snapshots: aggregates and individual papers."""
+    old_rows = {row[0]: row for row in old.papers["rows"]}
+    new_rows = {row[0]: row for row in new.papers["rows"]}
+    columns = new.papers["columns"]
+    changed = {}
+    for doi in sorted(set(old_rows) & set(new_rows)):
+        fields = {
+            column: {"from": before, "to": after}
+            for column, before, after in zip(columns, old_rows[doi], new_rows[doi]) if before != after
+        }
+        if fields:
+            changed[doi] = fields
+
+    old_papers, new_papers = old.report["papers"], new.report["papers"]
+    old_projects, new_projects = old.report["projects"], new.report["projects"]
+    return {
+        "from": {"id": old.pk, "year": old.year, "version": old.version},
+        "to": {"id": new.pk, "year": new.year, "version": new.version},
+        "papers": {
+            "total": {"from": old_papers["total"], "to": new_papers["total"]},
+            "by_publication_type": _diff_counts(old_papers["by_publication_type"], new_papers["by_publication_type"]),
+            "by_project": _diff_counts(old_papers["by_project"], new_papers["by_project"]),
+            "added": sorted(set(new_rows) - set(old_rows)),
+            "removed": sorted(set(old_rows) - set(new_rows)),
+            "changed": changed,
+        },
+        "projects": {
+            "total": {"from": old_projects["total"], "to": new_projects["total"]},
+            "by_funding_body": _diff_counts(old_projects["by_funding_body"], new_projects["by_funding_body"]),
+            "by_status": _diff_counts(old_projects["by_status"], new_projects["by_status"]),
+            "funding": _diff_totals(old_projects["funding"], new_projects["funding"]),
+            # Snapshots taken before projects were filtered by year lack the count
+            "without_funding_year": {
+                "from": old_projects.get("without_funding_year"), "to": new_projects.get("without_funding_year"),
+            },
+        },
+    }
@@ -0,0 +1,136 @@
+"""
+Revocation of JWTs by ``jti``.
+
+Refresh tokens are rotated (SIMPLE_JWT ``ROTATE_REFRESH_TOKENS``): each
+refresh revokes the token it was given, so a leaked or replayed refresh
+token works at most once. Unlike simplejwt's token_blacklist app, which
+records every issued token, only revoked tokens are stored, in
+``RevokedToken``, and only until they would have expired anyway. ``revoke``
+prunes expired rows now and then (PRUNE_PROBABILITY), and the
+``prune_revoked_tokens`` command does it on a schedule.
+
+Almost every check is for a token that was never revoked. Each process keeps
+a fixed-size Bloom filter of the revoked jtis (REVOCATION_FILTER_BITS), so
+a jti the filter has not seen is answered without a query; only possible
+members are looked up. ``revoke`` bumps a version in the cache once its row
+is committed. A process that sees a new version adds the rows revoked since
+its last sync, and rebuilds the filter every
+REVOCATION_FILTER_REBUILD_SECONDS so expired entries stop costing lookups.
+"""
+import hashlib
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .caching import CACHE_ALIAS
+from .models import RevokedToken
+
+VERSION_KEY = "papers-revocation:version"
+PRUNE_PROBABILITY = 0.01  # Share of revocations that also delete expired rows
+SYNC_OVERLAP = timedelta(seconds=5)  # Re-read rows near the last sync: clock skew, late commits
+
+_lock = threading.Lock()
+_filter = None
+_filter_version = None
+_synced_at = None
+_built_at = 0.0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class BloomFilter:
+    """Set membership in fixed memory: false positives, never false negatives."""
+
+    def __init__(self, bits, hashes):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+def _version():
+    cache = caches[CACHE_ALIAS]
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Evicted or never set: any new value makes every process resync
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _bump():
+    caches[CACHE_ALIAS].set(VERSION_KEY, time.time_ns(), None)
+
+
+def _revoked_jtis(since=None):
+    # Always the primary: a lagging replica would let a revoked token through
+    rows = RevokedToken.objects.using("default").filter(expires_at__gt=timezone.now())
+    if since is not None:
+        rows = rows.filter(revoked_at__gte=since - SYNC_OVERLAP)
+    return rows.values_list("jti", flat=True).iterator()
+
+
+def _current_filter():
+    global _filter, _filter_version, _synced_at, _built_at
+    # Read the version before the rows: a revocation bumps it only after committing
+    version = _version()
+    if version == _filter_version:
+        return _filter
+    with _lock:
+        if version != _filter_version:
+            started_at = timezone.now()
+            if _filter is None or time.monotonic() - _built_at > _setting("REVOCATION_FILTER_REBUILD_SECONDS", 3600):
+                bloom = BloomFilter(_setting("REVOCATION_FILTER_BITS", 1 << 20),
+                                    _setting("REVOCATION_FILTER_HASHES", 7))
+                since = None
+                _built_at = time.monotonic()
+            else:
+                bloom, since = _filter, _synced_at
+            for jti in _revoked_jtis(since):
+                bloom.add(jti)
+            _filter, _filter_version, _synced_at = bloom, version, started_at
+    return _filter
+
+
+def is_revoked(jti):
+    if not jti or jti not in _current_filter():
+        return False
+    return RevokedToken.objects.using("default").filter(jti=jti, expires_at__gt=timezone.now()).exists()
+
+
+def revoke(jti, expires_at):
+    """Revoke ``jti`` until ``expires_at``; False when it already was (e.g. by a concurrent refresh)."""
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    transaction.on_commit(_bump)
+    if random.random() < PRUNE_PROBABILITY:
+        prune()
+    return True
+
+
+def prune():
+    """Delete revocations of tokens that have expired; returns how many."""
+    return RevokedToken.objects.filter(expires_at__lte=timezone.now()).delete()[0]
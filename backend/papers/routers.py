@@ -0,0 +1,111 @@
+"""
+Read/write routing between the primary database and an optional read replica.
+
+Only views that opt in with ``ReplicaReadMixin`` read from the ``replica``
+alias, and only for GET/HEAD requests. A user who has just written (any
+successful POST/PUT/PATCH/DELETE, recorded by ``ReplicaStickinessMiddleware``)
+keeps reading from the primary until the replica has caught up: until the
+next snapshot for a SQLite copy (``manage.py refresh_replica``), or for
+``REPLICA_STICKY_SECONDS`` when the replica's sync time is unknown.
+"""
+import contextvars
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA_ALIAS = "replica"
+STICKY_SECONDS = getattr(settings, "REPLICA_STICKY_SECONDS", 30)
+SYNCED_AT_KEY = "replica:synced-at"
+
+_read_alias = contextvars.ContextVar("papers_read_alias", default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def current_read_alias():
+    return _read_alias.get() or "default"
+
+
+def _last_write_key(user_id):
+    return f"replica:last-write:user:{user_id}"
+
+
+def record_write(user_id):
+    cache.set(_last_write_key(user_id), time.time(), max(STICKY_SECONDS, 24 * 3600))
+
+
+def mark_synced(timestamp):
+    cache.set(SYNCED_AT_KEY, timestamp, None)
+
+
+def replica_fresh_for(user_id):
+    """True if the replica already reflects this user's latest write."""
+    last_write = cache.get(_last_write_key(user_id))
+    if last_write is None:
+        return True
+    synced_at = cache.get(SYNCED_AT_KEY)
+    if synced_at is not None:
+        return synced_at > last_write
+    return time.time() - last_write > STICKY_SECONDS
+
+
+class ReplicaRouter:
+    """Send reads to the replica only inside an opted-in request."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary (or a read-only standby)
+        return db != REPLICA_ALIAS
+
+
+class ReplicaReadMixin:
+    """
+    APIView mixin for read-heavy reporting views: safe-method requests read
+    from the replica unless the user needs to see their own recent writes.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            replica_configured()
+            and request.method in ("GET", "HEAD")
+            and replica_fresh_for(request.user.pk)
+        ):
+            self._replica_token = _read_alias.set(REPLICA_ALIAS)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "_replica_token", None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaStickinessMiddleware:
+    """Remember when each user last changed data, for read-your-writes."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            replica_configured()
+            and request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+        ):
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                record_write(user.pk)
+        return response
@@ -1,22 +1,76 @@
 from rest_framework import serializers
 from .models import Paper, Project
-from rest_framework_simplejwt.serializers import TokenVerifySerializer
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer, TokenVerifySerializer
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import UntypedToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from django.db import transaction
 from django.contrib.auth.models import User
+from .events import publish
+from . import caching
+from .caching import invalidate_papers_for_dois
+from .jobs import enqueue
+from .dois import clean_doi, normalize_doi
+from .funding import AMBIGUOUS, named_currency, parse_amount
+from . import milestones
+from . import revocation
+
+class AmountField(serializers.DecimalField):
+    """
+    Decimal amount that also accepts the free-text forms users type ("2,5 MSEK").
+    A currency named in the text is applied by ``ProjectSerializer.validate``.
+    """
+    default_error_messages = {
+        'ambiguous': 'Ambiguous amount "{value}": write it without a thousands separator, e.g. 1500 or 1.5 MSEK.',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            amount, _, note = parse_amount(data)
+            if amount is None:
+                self.fail('invalid')
+            if note == AMBIGUOUS:
+                self.fail('ambiguous', value=data)
+            data = amount
+        return super().to_internal_value(data)
+
 
 class ProjectSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     submitted_by = serializers.ReadOnlyField(source='user.username')
+    amount = AmountField(max_digits=15, decimal_places=2, required=False, allow_null=True)
 
     class Meta:
         model = Project
         fields = '__all__'
         extra_kwargs = {
             'id': {'read_only': True},
+            'amount_text': {'read_only': True},
         }
 
+    def validate(self, attrs):
+        text = self.initial_data.get('amount') if isinstance(self.initial_data, dict) else None
+        named = named_currency(text) if isinstance(text, str) else None
+        if named:
+            if attrs.get('currency', named) != named:
+                raise ValidationError({'currency': f"The amount is in {named}, not {attrs['currency']}."})
+            attrs['currency'] = named
+        return attrs
+
+    def create(self, validated_data):
+        project = super().create(validated_data)
+        milestones.link_unresolved(project)
+        return project
+
+    def update(self, instance, validated_data):
+        project = super().update(instance, validated_data)
+        if 'project_name' in validated_data:
+            milestones.rename_linked(project)
+            milestones.link_unresolved(project)
+        return project
+
 
 
 
@@ -32,59 +86,90 @@ class PaperSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'submission_year': {'read_only': True},  # Only superuser can modify via special endpoints
             'is_master_copy': {'read_only': True},
+            'metadata_checked_at': {'read_only': True},
+            'metadata_conflicts': {'read_only': True},  # Maintained by papers/enrichment.py
+            'project': {'read_only': True},  # Resolved from milestone_project
         }
+
+    def validate_doi(self, value):
+        doi = clean_doi(value)
+        if not doi:
+            raise ValidationError("Enter a DOI.")
+        return doi
+
+    def validate(self, attrs):
+        # (user, doi_key) is unique; DRF cannot derive that validator from the non-editable key
+        user = attrs.get('user') or getattr(self.instance, 'user', None)
+        if 'doi' in attrs and user is not None:
+            duplicates = Paper.objects.filter(user=user, doi_key=normalize_doi(attrs['doi']))
+            if self.instance is not None:
+                duplicates = duplicates.exclude(pk=self.instance.pk)
+            if duplicates.exists():
+                raise ValidationError("The fields user, doi must make a unique set.", code='unique')
+        return attrs
     
     def create(self, validated_data):
         request = self.context.get('request')
         user = request.user if request else None
+        _link_project(validated_data, validated_data['user'].id)
         
-        if user and user.is_superuser:
-            # Superuser creates a master copy directly
-            validated_data['is_master_copy'] = True
-            paper = super().create(validated_data)
-        else:
-            # Regular user creates normal paper
-            validated_data['is_master_copy'] = False
-            paper = super().create(validated_data)
-            
-            # Auto-copy to superuser if not already exists
-            self._create_superuser_copy(paper)
+        # The user's paper and its master copy commit (or fail) together
+        with transaction.atomic():
+            if user and user.is_superuser:
+                # Superuser creates a master copy directly
+                validated_data['is_master_copy'] = True
+                paper = super().create(validated_data)
+            else:
+                # Regular user creates normal paper
+                validated_data['is_master_copy'] = False
+                paper = super().create(validated_data)
+                
+                # Auto-copy to superuser if not already exists
+                self._create_superuser_copy(paper)
+
+            # Check the entered metadata against Crossref in the background
+            enqueue("enrich_paper_metadata", {"doi": paper.doi},
+                    idempotency_key=f"enrich:{paper.pk}")
         
         return paper
+
+    def update(self, instance, validated_data):
+        _link_project(validated_data, instance.user_id)
+        return super().update(instance, validated_data)
     
     def _create_superuser_copy(self, paper):
-        """Create a master copy for the superuser if it doesn't exist"""
-        try:
-            superuser = User.objects.filter(is_superuser=True).first()
-            if not superuser:
-                return  # No superuser found
-            
-            # Check if superuser already has this DOI
-            if not Paper.objects.filter(
-                doi=paper.doi, 
-                user=superuser, 
-                is_master_copy=True
-            ).exists():
-                # Create master copy for superuser
-                Paper.objects.create(
-                    doi=paper.doi,
-                    title=paper.title,
-                    author_name=paper.author_name,
-                    publication_type=paper.publication_type,
-                    milestone_project=getattr(paper, 'milestone_project', ''),
-                    journal=getattr(paper, 'journal', ''),
-                    date=getattr(paper, 'date', ''),
-                    additional_authors=getattr(paper, 'additional_authors', ''),
-                    user=superuser,
-                    is_master_copy=True,
-                    submission_year=None  # Default to not submitted
-                )
-        except Exception as e:
-            # Log error but don't fail the original paper creation
-            print(f"Error creating superuser copy: {e}")
-            # You might want to use proper logging here
-            import logging
-            logging.error(f"Error creating superuser copy: {e}")
+        """
+        Insert the superuser's master copy unless one already exists, as a
+        single INSERT ... ON CONFLICT DO NOTHING against the (user, doi_key)
+        unique constraint, so concurrent submissions of a DOI cannot race.
+        """
+        superuser_id = caching.superuser_id()
+        if superuser_id is None or superuser_id == paper.user_id:
+            return
+
+        Paper.objects.bulk_create([
+            Paper(
+                doi=paper.doi,
+                title=paper.title,
+                author_name=paper.author_name,
+                publication_type=paper.publication_type,
+                milestone_project=paper.milestone_project,
+                project_id=paper.project_id,
+                journal=paper.journal,
+                date=paper.date,
+                additional_authors=paper.additional_authors,
+                user_id=superuser_id,
+                is_master_copy=True,
+                submission_year=None,  # Default to not submitted
+            )
+        ], ignore_conflicts=True)
+        # bulk_create bypasses post_save; the user's paper event already carries the DOI
+        caching.invalidate_papers(superuser_id)
+
+
+def _link_project(validated_data, user_id):
+    if 'milestone_project' in validated_data:
+        validated_data['project_id'] = milestones.resolve(user_id, validated_data['milestone_project'])
 
 
 class SuperuserPaperSerializer(serializers.ModelSerializer):
@@ -94,15 +179,25 @@ class SuperuserPaperSerializer(serializers.ModelSerializer):
     class Meta:
         model = Paper
         fields = '__all__'
+        extra_kwargs = {
+            'project': {'read_only': True},
+        }
         
+    @transaction.atomic
     def update(self, instance, validated_data):
+        _link_project(validated_data, instance.user_id)
         # When superuser updates submission year, sync to all copies
         if 'submission_year' in validated_data:
             submission_year = validated_data['submission_year']
             # Update all papers with the same DOI
-            Paper.objects.filter(doi=instance.doi).update(
+            Paper.objects.filter(doi_key=instance.doi_key).update(
                 submission_year=submission_year
             )
+            # .update() bypasses post_save, so announce the change explicitly and
+            # drop cached lists once it commits
+            publish("paper", "submission_year", instance.pk, instance.user_id,
+                    {"doi": instance.doi, "submission_year": submission_year})
+            invalidate_papers_for_dois([instance.doi])
         
         return super().update(instance, validated_data)
 
@@ -124,6 +219,9 @@ class CustomTokenVerifySerializer(TokenVerifySerializer):
             validated_token = UntypedToken(token_str)
         except TokenError as e:
             raise ValidationError({"detail": str(e)})
+
+        if revocation.is_revoked(validated_token.get(api_settings.JTI_CLAIM)):
+            raise ValidationError({"detail": "Token is blacklisted"})
         
         # Once decoded, the payload is in validated_token.payload (a dict)
         user_id = validated_token.payload.get("user_id")
@@ -138,6 +236,36 @@ class CustomTokenVerifySerializer(TokenVerifySerializer):
         data["username"] = user.username
         return data
 
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer that rejects revoked refresh tokens and, when
+    rotating, revokes the one it was given in papers/revocation.py instead of
+    the token_blacklist app, which is not installed.
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        jti = refresh[api_settings.JTI_CLAIM]
+        if revocation.is_revoked(jti):
+            raise TokenError("Token is blacklisted")
+
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user_id and (user is None or not api_settings.USER_AUTHENTICATION_RULE(user)):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            # Only one of several concurrent refreshes with the same token wins
+            if api_settings.BLACKLIST_AFTER_ROTATION and not revocation.revoke(jti, datetime_from_epoch(refresh["exp"])):
+                raise TokenError("Token is blacklisted")
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
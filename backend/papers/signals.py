@@ -0,0 +1,72 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Paper, Project
+from .events import publish
+from .caching import invalidate_papers, invalidate_projects, invalidate_superuser
+
+
+def _paper_payload(paper):
+    return {
+        "doi": paper.doi,
+        "title": paper.title,
+        "is_master_copy": paper.is_master_copy,
+        "submission_year": paper.submission_year,
+    }
+
+
+def _project_payload(project):
+    return {
+        "project_name": project.project_name,
+        "status": project.status,
+    }
+
+
+@receiver(post_save, sender=Paper)
+def paper_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_papers(instance.user_id)
+    publish("paper", "created" if created else "updated",
+            instance.pk, instance.user_id, _paper_payload(instance))
+
+
+@receiver(post_delete, sender=Paper)
+def paper_deleted(sender, instance, **kwargs):
+    invalidate_papers(instance.user_id)
+    publish("paper", "deleted", instance.pk, instance.user_id, _paper_payload(instance))
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_projects(instance.user_id)
+    publish("project", "created" if created else "updated",
+            instance.pk, instance.user_id, _project_payload(instance))
+
+
+@receiver(pre_delete, sender=Project)
+def project_deleting(sender, instance, **kwargs):
+    # Linked papers are unlinked by an UPDATE that sends no post_save
+    owners = Paper.objects.filter(project=instance).values_list("user_id", flat=True).distinct()
+    invalidate_papers(*owners)
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    invalidate_projects(instance.user_id)
+    publish("project", "deleted", instance.pk, instance.user_id, _project_payload(instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Cached lists embed the owner's username as ``submitted_by``
+    if kwargs.get("raw"):
+        return
+    invalidate_papers(instance.pk)
+    invalidate_projects(instance.pk)
+    # The master copy owner may have been created, demoted or removed
+    invalidate_superuser()
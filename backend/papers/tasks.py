@@ -0,0 +1,70 @@
+"""Background job handlers (see papers/jobs.py)."""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from . import accounts
+from .enrichment import enrich_doi
+from .jobs import job
+from .models import Paper
+
+
+@job("create_master_copy", max_attempts=5)
+def create_master_copy(payload):
+    """
+    Create the superuser's master copy of a paper. Master copies are now
+    written in the create transaction; this drains jobs queued before that.
+    """
+    from .serializers import PaperSerializer
+
+    paper = Paper.objects.filter(pk=payload["paper_id"]).first()
+    if paper is None:
+        return  # Deleted before the job ran
+    PaperSerializer()._create_superuser_copy(paper)
+
+
+@job("enrich_paper_metadata", max_attempts=4, concurrency=2)
+def enrich_paper_metadata(payload):
+    """Fill gaps and flag conflicts against Crossref for every copy of a DOI."""
+    doi = payload.get("doi")
+    if doi is None:
+        # Jobs queued before payloads carried the DOI
+        doi = Paper.objects.filter(pk=payload["paper_id"]).values_list("doi", flat=True).first()
+    if doi:
+        enrich_doi(doi)
+
+
+@job("delete_user", max_attempts=3, concurrency=1)
+def delete_user(payload):
+    """Chunked deletion of a deactivated user (papers/accounts.py)."""
+    accounts.delete_user(payload["user_id"])
+
+
+@job("send_password_reset_email", max_attempts=6, concurrency=2)
+def send_password_reset_email(payload):
+    user = User.objects.filter(pk=payload["user_id"]).first()
+    if user is None:
+        return
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_link = f"https://yourfrontend.com/reset/{uid}/{token}"
+
+    subject = "Password Reset Request"
+    message = (
+        f"Hi {user.username},\n\n"
+        "You requested a password reset.\n\n"
+        f"Use the link below to reset your password:\n{reset_link}\n\n"
+        "If you did not request this, please ignore this email.\n"
+    )
+    # Raise on failure so the queue retries with backoff
+    send_mail(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        fail_silently=False,
+    )
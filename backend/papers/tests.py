@@ -1,3 +1,1102 @@
-from django.test import TestCase
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import accounts, caching, events, instrumentation, jobs, llm, profiling, revocation, routers, throttling
+from .benchmarks.stubs import CHAT_REPLY, FakeBedrockClient
+from .chatreply import ReplyParser
+from .dois import clean_doi, normalize_doi
+from .funding import AMBIGUOUS, EMPTY, OK, UNPARSEABLE, parse_amount
+from .idempotency import idempotent
+from .management.commands import copy_database
+from .management.commands.bench_import_time import _measure
+from .models import (
+    ChangeEvent, ChatMessage, IdempotencyRecord, Job, Paper, ProfileReport, Project, RevokedToken, ThrottleLease,
+)
+
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "papers-tests",
+    }
+}
+
+WEST = "meta.llama3-70b-instruct-v1:0@us-west-2"
+REQUEST = {"prompt": "<|start_header_id|>assistant<|end_header_id|>\n", "max_gen_len": 512}
+
+_bedrock = {"options": {}, "clients": {}}
+
+PAPER = {"doi": "10.1000/shared", "title": "T", "author_name": "A", "journal": "J", "date": "2024"}
+
+
+def fake_bedrock(region):
+    """BEDROCK_CLIENT_FACTORY for the tests: a FakeBedrockClient configured by ``_bedrock["options"]``."""
+    client = _bedrock["clients"][region] = FakeBedrockClient(region=region, **_bedrock["options"])
+    return client
+
+
+def _client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class MasterCopyConcurrencyTests(TransactionTestCase):
+    """Users submitting the same DOI at the same moment share one master copy."""
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser("admin", password="x")
+        self.users = [User.objects.create_user(f"researcher-{i}", password="x") for i in range(2)]
+
+    def test_concurrent_creates_leave_one_master_copy(self):
+        barrier = threading.Barrier(len(self.users))
+        statuses = []
+
+        def submit(user):
+            try:
+                client = _client(user)
+                barrier.wait()
+                # Variant spellings of one DOI must collapse onto the same master copy
+                doi = PAPER["doi"] if user is self.users[0] else "https://doi.org/10.1000/SHARED"
+                statuses.append(client.post("/api/papers/", {**PAPER, "doi": doi}, format="json").status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=submit, args=(user,)) for user in self.users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses, [201, 201])
+        self.assertEqual(Paper.objects.filter(is_master_copy=False).count(), 2)
+        self.assertEqual(Paper.objects.filter(is_master_copy=True, user=self.superuser).count(), 1)
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class MasterCopyAtomicityTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("researcher", password="x")
+
+    def test_failure_after_user_row_leaves_no_orphan_master_copy(self):
+        # Enqueueing runs after both rows are written, inside the same transaction
+        with mock.patch("papers.serializers.enqueue", side_effect=RuntimeError("queue down")):
+            with self.assertRaises(RuntimeError):
+                _client(self.user).post("/api/papers/", PAPER, format="json")
+
+        self.assertFalse(Paper.objects.filter(user=self.user).exists())
+        self.assertFalse(Paper.objects.filter(user=self.superuser, is_master_copy=True).exists())
+
+    def test_master_copy_is_written_with_the_user_row(self):
+        response = _client(self.user).post("/api/papers/", PAPER, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Paper.objects.filter(user=self.superuser, doi_key=PAPER["doi"], is_master_copy=True).exists())
+
+
+class StartupImportTests(SimpleTestCase):
+    """Worker startup stays within STARTUP_IMPORT_BUDGET_MS and leaves boto3 for first use."""
+
+    def test_startup_imports_within_budget(self):
+        runs = [_measure() for _ in range(3)]
+        modules = runs[-1][0]
+
+        self.assertEqual([name for name in settings.STARTUP_LAZY_MODULES if name in modules], [])
+        self.assertLessEqual(statistics.median(total for _, total in runs) / 1000, settings.STARTUP_IMPORT_BUDGET_MS)
+
+
+@override_settings(
+    BEDROCK_CLIENT_FACTORY=f"{__name__}.fake_bedrock", LLM_MAX_HEDGES=1, LLM_STREAMING=True,
+    LLM_HEDGE_DEFAULT_DELAY=0.05, LLM_HEDGE_MIN_DELAY=0.05, LLM_THROTTLE_COOLDOWN=30, LLM_TIMEOUT=5,
+)
+class GenerateTests(SimpleTestCase):
+    """llm.generate against fake Bedrock backends (LLM_BACKENDS: 70b in us-west-2 and us-east-1, 8b fallback)."""
+
+    def setUp(self):
+        llm.reset()
+        _bedrock["clients"].clear()
+
+    def _generate(self, **options):
+        _bedrock["options"] = {"chunk_ms": 5, **options}
+        return llm.generate(REQUEST, ReplyParser)
+
+    def test_slow_primary_is_hedged_and_stops_streaming(self):
+        reply, backend = self._generate(model_latency_ms={WEST: 300})
+
+        self.assertEqual(backend, "llama3-70b-us-east-1")
+        self.assertEqual(reply, CHAT_REPLY)
+        time.sleep(0.5)
+        # The losing stream was closed at its first chunk instead of running to the end of the reply
+        self.assertEqual(_bedrock["clients"]["us-west-2"].chunks_sent, 1)
+
+    def test_throttled_primary_fails_over_and_cools_down(self):
+        _, backend = self._generate(throttled=[WEST], model_latency_ms={WEST: 0})
+        self.assertEqual(backend, "llama3-70b-us-east-1")
+
+        west = _bedrock["clients"]["us-west-2"]
+        _, backend = llm.generate(REQUEST, ReplyParser)
+        self.assertEqual(backend, "llama3-70b-us-east-1")
+        self.assertEqual(west.calls, 1)  # Skipped during LLM_THROTTLE_COOLDOWN
+
+    def test_fallback_only_after_primaries(self):
+        _, backend = self._generate(throttled=["meta.llama3-70b-instruct-v1:0"])
+
+        self.assertEqual(backend, "llama3-8b-us-west-2")
+
+    def test_all_throttled_raises_unavailable(self):
+        with self.assertRaises(llm.LLMUnavailable):
+            self._generate(throttled=["meta.llama3-70b-instruct-v1:0", "meta.llama3-8b-instruct-v1:0"])
+
+    def test_throttled_ignores_errors_without_a_response(self):
+        error = RuntimeError("boom")
+        error.response = None
+
+        self.assertFalse(llm._throttled(error))
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CopyDatabaseTests(TestCase):
+    def setUp(self):
+        self.target = os.path.join(tempfile.mkdtemp(), "copy.sqlite3")
+        self.addCleanup(self._drop_target, os.environ.get("SQLITE_PATH"))
+        # The command adds its target alias at runtime, after the test databases were set up
+        patcher = mock.patch.object(type(self), "databases", {"default", copy_database.TARGET_ALIAS})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _drop_target(self, sqlite_path):
+        if copy_database.TARGET_ALIAS in connections.databases:
+            connections[copy_database.TARGET_ALIAS].close()
+            del connections.databases[copy_database.TARGET_ALIAS]
+        if sqlite_path is None:
+            os.environ.pop("SQLITE_PATH", None)  # The command points SQLITE_PATH at the target
+        else:
+            os.environ["SQLITE_PATH"] = sqlite_path
+
+    def test_copy_keeps_primary_keys_and_timestamps(self):
+        created = datetime(2026, 7, 11, 9, 30, tzinfo=dt_timezone.utc)
+        user = User.objects.create_user("researcher")
+        ChatMessage.objects.create(user=user, role="user", content="skipped pk")
+        message = ChatMessage.objects.create(user=user, role="user", content="hello")
+        ChatMessage.objects.filter(pk=message.pk).update(created_at=created)
+        job = Job.objects.create(name="noop")
+        Job.objects.filter(pk=job.pk).update(created_at=created, updated_at=created)
+        token = RevokedToken.objects.create(jti="abc", expires_at=created)
+        RevokedToken.objects.filter(pk=token.pk).update(revoked_at=created)
+        ChatMessage.objects.filter(content="skipped pk").delete()
+
+        call_command("copy_database", to="sqlite", sqlite_path=self.target, no_input=True, stdout=StringIO())
+
+        alias = copy_database.TARGET_ALIAS
+        self.assertEqual(
+            list(ChatMessage.objects.using(alias).values_list("pk", "created_at")), [(message.pk, created)],
+        )
+        self.assertEqual(
+            list(Job.objects.using(alias).values_list("pk", "created_at", "updated_at")), [(job.pk, created, created)],
+        )
+        self.assertEqual(
+            list(RevokedToken.objects.using(alias).values_list("pk", "revoked_at")), [(token.pk, created)],
+        )
+        # The fields are stamped again outside the copy
+        self.assertTrue(ChatMessage._meta.get_field("created_at").auto_now_add)
+
+
+class ParseAmountTests(SimpleTestCase):
+    def test_legacy_forms(self):
+        cases = {
+            "1 500 000": (Decimal("1500000.00"), "SEK", OK),
+            "2,5 MSEK": (Decimal("2500000.00"), "SEK", OK),
+            "€300k": (Decimal("300000.00"), "EUR", OK),
+            "$1.2bn": (Decimal("1200000000.00"), "USD", OK),
+            "1.234,50 £": (Decimal("1234.50"), "GBP", OK),
+            "1,500": (Decimal("1500.00"), "SEK", AMBIGUOUS),
+            "": (Decimal("0"), "SEK", EMPTY),
+            "about a million": (None, "SEK", UNPARSEABLE),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(parse_amount(text), expected)
+
+
+@override_settings(CACHES=TEST_CACHES, THROTTLE_ENABLED=False)
+class ProjectAmountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = _client(User.objects.create_user("researcher"))
+
+    def _create(self, **fields):
+        return self.client.post("/api/projects/", {"project_name": "P", "status": "Draft", **fields}, format="json")
+
+    def test_currency_is_taken_from_the_amount_text(self):
+        response = self._create(amount="€300k")
+
+        self.assertEqual(response.status_code, 201)
+        project = Project.objects.get()
+        self.assertEqual((project.amount, project.currency), (Decimal("300000.00"), "EUR"))
+
+    def test_explicit_currency_must_match_the_amount_text(self):
+        response = self._create(amount="€300k", currency="SEK")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("currency", response.json())
+        self.assertEqual(self._create(amount="€300k", currency="EUR").status_code, 201)
+
+    def test_plain_amount_keeps_the_given_currency(self):
+        self.assertEqual(self._create(amount="1500000", currency="USD").status_code, 201)
+        self.assertEqual(Project.objects.get().currency, "USD")
+
+    def test_ambiguous_amount_is_rejected(self):
+        response = self._create(amount="1,500")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("amount", response.json())
+        self.assertFalse(Project.objects.exists())
+
+
+@override_settings(
+    CACHES=TEST_CACHES, THROTTLE_ENABLED=True, THROTTLE_RATES={"chat": ("1/min", 2)},
+    THROTTLE_CONCURRENCY={"chat": 1}, THROTTLE_CONCURRENCY_RETRY_AFTER=2,
+    BEDROCK_CLIENT_FACTORY=f"{__name__}.fake_bedrock", LLM_HEDGE_DEFAULT_DELAY=0.05, LLM_HEDGE_MIN_DELAY=0.05,
+)
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        llm.reset()
+        _bedrock["options"] = {}
+        self.user = User.objects.create_user("researcher")
+        self.client = _client(self.user)
+        self.ident = f"user:{self.user.pk}"
+
+    def _chat(self):
+        return self.client.post("/api/chat/", {"message": "hello"}, format="json")
+
+    def test_burst_then_429_with_retry_after(self):
+        self.assertEqual([self._chat().status_code for _ in range(2)], [200, 200])
+
+        response = self._chat()
+        self.assertEqual(response.status_code, 429)
+        # The next token arrives one interval (60 s) after the burst was spent
+        self.assertIn(int(response["Retry-After"]), (59, 60))
+
+    def test_bucket_refills(self):
+        now = time.time()
+        with mock.patch("papers.throttling.time") as clock:
+            clock.time.return_value = now
+            self.assertEqual([throttling.take_token("chat", self.ident) for _ in range(2)], [0, 0])
+            self.assertAlmostEqual(throttling.take_token("chat", self.ident), 60, delta=0.01)
+
+            clock.time.return_value = now + 60
+            self.assertEqual(throttling.take_token("chat", self.ident), 0)
+            self.assertGreater(throttling.take_token("chat", self.ident), 0)
+
+    def test_second_in_flight_chat_gets_429(self):
+        # The first request still holds the user's only slot
+        throttling.acquire_lease("chat", self.ident, 1)
+
+        response = self._chat()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "2")
+
+    def test_expired_lease_is_reclaimed(self):
+        lease = throttling.acquire_lease("chat", self.ident, 1)
+        ThrottleLease.objects.filter(pk=lease).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self._chat().status_code, 200)
+        self.assertFalse(ThrottleLease.objects.exists())
+
+    def test_lease_released_when_view_raises(self):
+        with mock.patch("papers.views.llm.generate", side_effect=RuntimeError("boom")):
+            with self.assertRaises(RuntimeError):
+                self._chat()
+
+        self.assertFalse(ThrottleLease.objects.exists())
+        self.assertEqual(self._chat().status_code, 200)
+
+
+@override_settings(TRUSTED_PROXIES=["127.0.0.1/32"])
+class ClientIdentTests(SimpleTestCase):
+    def _ident(self, remote, real_ip):
+        request = RequestFactory().get("/", REMOTE_ADDR=remote, HTTP_X_REAL_IP=real_ip)
+        return throttling.client_ident(request)
+
+    def test_real_ip_from_trusted_proxy(self):
+        self.assertEqual(self._ident("127.0.0.1", "198.51.100.7"), "ip:198.51.100.7")
+
+    def test_real_ip_from_anyone_else_is_ignored(self):
+        self.assertEqual(self._ident("203.0.113.5", "198.51.100.7"), "ip:203.0.113.5")
+
+
+@override_settings(CACHES=TEST_CACHES, THROTTLE_ENABLED=False)
+class RevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # Each test starts from an empty per-process filter
+        patcher = mock.patch.multiple(revocation, _filter=None, _filter_version=None, _synced_at=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user("researcher")
+        self.refresh = RefreshToken.for_user(self.user)
+
+    def _refresh(self, token):
+        # Revocations publish their version bump on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            return APIClient().post("/api/auth/token/refresh/", {"refresh": str(token)}, format="json")
+
+    def test_rotated_refresh_token_is_rejected_on_reuse(self):
+        first = self._refresh(self.refresh)
+        self.assertEqual(first.status_code, 200)
+        self.assertNotEqual(first.json()["refresh"], str(self.refresh))
+
+        self.assertEqual(self._refresh(self.refresh).status_code, 401)
+        self.assertEqual(self._refresh(first.json()["refresh"]).status_code, 200)
+
+    def test_only_one_concurrent_refresh_wins(self):
+        self.assertEqual(self._refresh(self.refresh).status_code, 200)
+
+        # The loser read "not revoked" before the winner committed; revoke() settles it
+        with mock.patch.object(revocation, "is_revoked", return_value=False):
+            self.assertEqual(self._refresh(self.refresh).status_code, 401)
+        self.assertFalse(revocation.revoke(self.refresh["jti"], timezone.now() + timedelta(days=1)))
+
+    def test_verify_rejects_revoked_jti(self):
+        access = self.refresh.access_token
+        verify = lambda: APIClient().post("/api/auth/token/verify/", {"token": str(access)}, format="json")
+        self.assertEqual(verify().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            revocation.revoke(access["jti"], timezone.now() + timedelta(minutes=5))
+
+        self.assertEqual(verify().status_code, 400)
+
+    def test_prune_deletes_only_expired_rows(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti="expired", expires_at=now - timedelta(seconds=1))
+        RevokedToken.objects.create(jti="live", expires_at=now + timedelta(hours=1))
+
+        self.assertEqual(revocation.prune(), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list("jti", flat=True)), ["live"])
+        self.assertTrue(revocation.is_revoked("live"))
+        self.assertFalse(revocation.is_revoked("expired"))
+
+
+class _ScriptedView(APIView):
+    """Answers with the next of ``outcomes``: a status code, or an exception to raise."""
+    outcomes = []
+
+    @idempotent
+    def post(self, request):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response({"status": outcome}, status=outcome)
+
+
+@override_settings(CACHES=TEST_CACHES, THROTTLE_ENABLED=False, IDEMPOTENCY_ENABLED=True, IDEMPOTENCY_TTL_SECONDS=3600)
+class IdempotencyTests(TestCase):
+    PROJECT = {"project_name": "P", "status": "Draft"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("researcher")
+        self.client = _client(self.user)
+
+    def _create(self, key, body=None, **extra):
+        return self.client.post("/api/projects/", body or self.PROJECT, format="json", HTTP_IDEMPOTENCY_KEY=key, **extra)
+
+    def test_replay_returns_the_stored_response(self):
+        first = self._create("k1")
+        replay = self._create("k1")
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual((replay.status_code, replay.json()), (201, first.json()))
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_same_json_in_another_key_order_is_a_replay(self):
+        self._create("k1")
+        replay = self.client.post(
+            "/api/projects/", '{ "status": "Draft",  "project_name": "P" }', content_type="application/json",
+            HTTP_IDEMPOTENCY_KEY="k1",
+        )
+
+        self.assertEqual(replay["Idempotent-Replayed"], "true")
+
+    def test_different_body_under_the_same_key_is_422(self):
+        self._create("k1")
+
+        self.assertEqual(self._create("k1", {"project_name": "Other", "status": "Draft"}).status_code, 422)
+        self.assertEqual(Project.objects.count(), 1)
+
+    def test_in_flight_key_is_409(self):
+        self._create("k1")
+        IdempotencyRecord.objects.update(status_code=None, response=None)  # As if the first attempt still ran
+
+        response = self._create("k1")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+
+    def test_key_expires_after_the_ttl(self):
+        self._create("k1")
+        IdempotencyRecord.objects.update(created_at=timezone.now() - timedelta(seconds=3601))
+
+        # Project names are unique per user, so the retry names another one
+        response = self._create("k1", {"project_name": "P2", "status": "Draft"})
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertEqual(Project.objects.count(), 2)
+
+    def _scripted(self, *outcomes):
+        _ScriptedView.outcomes = list(outcomes)
+        view = _ScriptedView.as_view()
+        results = []
+        for _ in outcomes:
+            request = APIRequestFactory().post("/scripted/", {"a": 1}, format="json", HTTP_IDEMPOTENCY_KEY="k1")
+            force_authenticate(request, self.user)
+            try:
+                results.append(view(request).status_code)
+            except RuntimeError:
+                results.append("raised")
+        return results
+
+    def test_server_error_releases_the_key(self):
+        self.assertEqual(self._scripted(503, 201, 200), [503, 201, 201])
+
+    def test_exception_releases_the_key(self):
+        self.assertEqual(self._scripted(RuntimeError("boom"), 201), ["raised", 201])
+        self.assertEqual(IdempotencyRecord.objects.get().status_code, 201)
+
+
+class DoiTests(SimpleTestCase):
+    def test_variants_share_one_key(self):
+        variants = [
+            "10.1000/ABC.def", "https://doi.org/10.1000/abc.DEF", "http://dx.doi.org/10.1000/abc.def",
+            "doi:10.1000/ABC.DEF", " DOI: 10.1000/abc.def ", "10.1000%2Fabc.def", "10.1000%252Fabc.def",
+        ]
+        self.assertEqual({normalize_doi(variant) for variant in variants}, {"10.1000/abc.def"})
+
+    def test_clean_keeps_the_registrants_casing(self):
+        self.assertEqual(clean_doi("https://doi.org/10.1000/ABC"), "10.1000/ABC")
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class PaperDoiValidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser("admin", password="x")
+        self.client = _client(User.objects.create_user("researcher"))
+
+    def test_variant_duplicate_is_rejected(self):
+        self.assertEqual(self.client.post("/api/papers/", PAPER, format="json").status_code, 201)
+
+        response = self.client.post("/api/papers/", {**PAPER, "doi": "https://doi.org/10.1000/SHARED"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Paper.objects.filter(is_master_copy=False).count(), 1)
+
+
+class DoiKeyMigrationTests(TransactionTestCase):
+    """0016 collapses one user's DOI variants and syncs submission years from the master copy."""
+    before = [("papers", "0015_profile_report")]
+    after = [("papers", "0016_paper_doi_key")]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        self.addCleanup(self._migrate, executor.loader.graph.leaf_nodes())
+        self.apps = self._migrate(self.before)
+
+    def _migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_collapses_variants_and_syncs_submission_year(self):
+        User_ = self.apps.get_model("auth", "User")
+        Paper_ = self.apps.get_model("papers", "Paper")
+        admin = User_.objects.create(username="admin", is_superuser=True)
+        alice = User_.objects.create(username="alice")
+        bob = User_.objects.create(username="bob")
+
+        def paper(user, doi, **fields):
+            return Paper_.objects.create(user=user, doi=doi, title="T", author_name="A", journal="J", date="2024",
+                                         **fields)
+
+        master = paper(admin, "doi:10.1000/XYZ", is_master_copy=True, submission_year=2025)
+        kept = paper(alice, "10.1000/xyz")
+        paper(alice, "https://doi.org/10.1000/XYZ", publication_type="journal-article")
+        paper(bob, "10.1000/abc", milestone_project="M")
+        submitted = paper(bob, "10.1000/ABC", submission_year=2024)
+
+        apps = self._migrate(self.after)
+        Paper_ = apps.get_model("papers", "Paper")
+
+        alice_rows = list(Paper_.objects.filter(user_id=alice.pk).values(
+            "pk", "doi", "doi_key", "publication_type", "submission_year"))
+        self.assertEqual(alice_rows, [{
+            "pk": kept.pk, "doi": "10.1000/xyz", "doi_key": "10.1000/xyz",
+            "publication_type": "journal-article", "submission_year": 2025,
+        }])
+        # A submitted variant is kept over an older unsubmitted one, and gains its project
+        bob_rows = list(Paper_.objects.filter(user_id=bob.pk).values("pk", "milestone_project", "submission_year"))
+        self.assertEqual(bob_rows, [{"pk": submitted.pk, "milestone_project": "M", "submission_year": 2024}])
+        self.assertEqual(Paper_.objects.get(pk=master.pk).doi, "10.1000/XYZ")
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class BulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+        self.alice_client = _client(self.alice)
+        self.a1, self.a2 = (self._paper(self.alice_client, f"10.1000/a{i}") for i in (1, 2))
+        self.b1 = self._paper(_client(self.bob), "10.1000/b1")
+
+    def _paper(self, client, doi):
+        response = client.post("/api/papers/", {**PAPER, "doi": doi}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def _statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {result["id"]: result["status"] for result in response.json()["results"]}
+
+    def test_other_users_ids_are_reported_not_deleted(self):
+        response = self.alice_client.post("/api/papers/bulk-delete/", {"ids": [self.a1, self.b1, 999999]},
+                                          format="json")
+
+        self.assertEqual(self._statuses(response), {self.a1: "deleted", self.b1: "not_found", 999999: "not_found"})
+        self.assertTrue(Paper.objects.filter(pk=self.b1).exists())
+        self.assertFalse(Paper.objects.filter(pk=self.a1).exists())
+
+    def test_other_users_ids_are_reported_not_updated(self):
+        response = self.alice_client.post("/api/papers/bulk-update/",
+                                          {"ids": [self.a1, self.b1], "patch": {"journal": "Nature"}}, format="json")
+
+        self.assertEqual(self._statuses(response), {self.a1: "updated", self.b1: "not_found"})
+        self.assertEqual(Paper.objects.get(pk=self.b1).journal, "J")
+
+    def test_mixed_success_and_failure(self):
+        # The first row takes the new DOI; the second would then duplicate it
+        response = self.alice_client.post(
+            "/api/papers/bulk-update/", {"ids": [self.a1, self.a2, self.b1], "patch": {"doi": "10.1000/new"}},
+            format="json",
+        )
+
+        self.assertEqual(self._statuses(response), {self.a1: "updated", self.a2: "invalid", self.b1: "not_found"})
+        self.assertEqual((response.json()["updated"], response.json()["invalid"]), (1, 1))
+        self.assertEqual(Paper.objects.get(pk=self.a1).doi, "10.1000/new")
+        self.assertEqual(Paper.objects.get(pk=self.a2).doi, "10.1000/a2")
+
+    def test_bulk_update_refreshes_cached_list(self):
+        self.alice_client.get("/api/papers/")  # Cache the list
+
+        # Invalidation waits for the commit
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice_client.post("/api/papers/bulk-update/", {"ids": [self.a1], "patch": {"journal": "Nature"}},
+                                   format="json")
+
+        journals = {paper["id"]: paper["journal"] for paper in self.alice_client.get("/api/papers/").json()}
+        self.assertEqual(journals[self.a1], "Nature")
+
+    def test_superuser_bulk_update_refreshes_cached_lists(self):
+        self.alice_client.get("/api/papers/")
+        master = Paper.objects.get(user=self.admin, doi_key="10.1000/a1")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = _client(self.admin).post("/api/superuser/papers/bulk-update/",
+                                                {"paper_ids": [master.pk], "submission_year": 2025}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        years = {paper["id"]: paper["submission_year"] for paper in self.alice_client.get("/api/papers/").json()}
+        self.assertEqual(years, {self.a1: 2025, self.a2: None})
+
+
+class ReplyParserTests(SimpleTestCase):
+    REPLY = '{"intent": "chitchat", "answer": "Hi!", "action": "none", "collected_data": {}, "missing_fields": []}'
+
+    def _parse(self, *chunks):
+        parser = ReplyParser()
+        for chunk in chunks:
+            if parser.feed(chunk):
+                break
+        return parser
+
+    def test_fenced_code_block(self):
+        parser = self._parse("Sure:\n```json\n", self.REPLY, "\n```\n")
+
+        self.assertEqual(parser.result()["answer"], "Hi!")
+
+    def test_trailing_prose_is_not_needed(self):
+        parser = ReplyParser()
+
+        self.assertTrue(parser.feed(self.REPLY + " Anything else?"))
+        self.assertTrue(parser.feed("More prose {\"intent\": \"other\"}"))
+        self.assertEqual(parser.result()["intent"], "chitchat")
+
+    def test_escape_split_across_chunks(self):
+        parser = self._parse('{"intent": "chitchat", "answer": "say \\', '"hi\\" now", "action": "none"}')
+
+        self.assertEqual(parser.result()["answer"], 'say "hi" now')
+
+    def test_truncated_reply_resumes_after_the_last_valid_member(self):
+        parser = self._parse('{"intent": "chitchat", "answer": "Hi!", "act')
+        with self.assertRaises(llm.InvalidOutput):
+            parser.result()
+
+        prefix = parser.resume()
+        self.assertEqual(prefix, '{"intent": "chitchat", "answer": "Hi!", ')
+        parser.feed('"action": "none"}')
+        self.assertEqual(parser.result(), {
+            "intent": "chitchat", "answer": "Hi!", "action": "none", "collected_data": {}, "missing_fields": [],
+        })
+
+    def test_invalid_member_stops_the_generation(self):
+        parser = ReplyParser()
+
+        self.assertTrue(parser.feed('{"intent": "chitchat", "action": "launch_rockets", "answer": "'))
+        with self.assertRaisesMessage(llm.InvalidOutput, "unknown action"):
+            parser.result()
+
+    def test_trailing_comma_is_repaired(self):
+        parser = self._parse('{"intent": "chitchat", "answer": "Hi!", "action": "none", "missing_fields": ["a",],}')
+
+        self.assertEqual(parser.result()["missing_fields"], ["a"])
+
+    @override_settings(BEDROCK_CLIENT_FACTORY=f"{__name__}.fake_bedrock", LLM_REPAIR_ATTEMPTS=1, LLM_STREAMING=True)
+    def test_malformed_reply_is_repaired_by_continuation(self):
+        llm.reset()
+        _bedrock["options"] = {"malformed_ratio": 1.0}
+
+        reply, _ = llm.generate(REQUEST, ReplyParser)
+
+        self.assertEqual(reply, CHAT_REPLY)
+        self.assertEqual(sum(client.continuations for client in _bedrock["clients"].values()), 1)
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("researcher")
+        self.admin_client, self.user_client = _client(self.admin), _client(self.user)
+
+    def _create(self, doi):
+        # Invalidation runs on commit
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user_client.post("/api/papers/", {**PAPER, "doi": doi}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()["id"]
+
+    def test_entries_are_reused_until_their_namespace_is_invalidated(self):
+        builder = mock.Mock(side_effect=[["v1"], ["v2"]])
+        namespaces = [caching.papers_ns(self.user.pk)]
+
+        self.assertEqual(caching.get_or_build(namespaces, ("k",), builder), ["v1"])
+        self.assertEqual(caching.get_or_build(namespaces, ("k",), builder), ["v1"])
+        with self.captureOnCommitCallbacks(execute=True):
+            caching.invalidate_papers(self.user.pk)
+            # Until the writes commit, readers keep the old entry
+            self.assertEqual(caching.get_or_build(namespaces, ("k",), builder), ["v1"])
+        self.assertEqual(caching.get_or_build(namespaces, ("k",), builder), ["v2"])
+
+    def test_master_copy_insert_refreshes_superuser_list(self):
+        self._create("10.1000/one")
+        self.assertEqual(len(self.admin_client.get("/api/superuser/papers/").json()), 1)
+
+        # The master copy is written with bulk_create, which sends no post_save
+        self._create("10.1000/two")
+
+        dois = {paper["doi"] for paper in self.admin_client.get("/api/superuser/papers/").json()}
+        self.assertEqual(dois, {"10.1000/one", "10.1000/two"})
+
+    def test_submission_year_update_refreshes_every_copy_list(self):
+        paper_id = self._create("10.1000/one")
+        self.user_client.get("/api/papers/")  # Cached before the update
+        master = Paper.objects.get(user=self.admin)
+
+        # The copies are updated with .update(), which sends no post_save
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.admin_client.put(f"/api/superuser/papers/{master.pk}/", {"submission_year": 2025},
+                                             format="json")
+
+        self.assertEqual(response.status_code, 200)
+        papers = self.user_client.get("/api/papers/").json()
+        self.assertEqual([(paper["id"], paper["submission_year"]) for paper in papers], [(paper_id, 2025)])
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class ReplicaStickinessTests(TestCase):
+    """
+    The replica is a second, read-only connection to the test database: it
+    cannot see this test's uncommitted writes, so a read that finds them
+    must have gone to the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        replica = {**connections.databases["default"], "OPTIONS": {"init_command": "PRAGMA query_only=ON;"}}
+        connections.databases[routers.REPLICA_ALIAS] = replica
+        self.addCleanup(self._drop_replica)
+        patcher = mock.patch.object(type(self), "databases", {"default", routers.REPLICA_ALIAS})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user("researcher")
+        self.client = _client(self.user)
+
+    def _drop_replica(self):
+        connections[routers.REPLICA_ALIAS].close()
+        del connections.databases[routers.REPLICA_ALIAS]
+
+    def _names(self):
+        response = self.client.get("/api/projects/")
+        self.assertEqual(response.status_code, 200)
+        return [project["project_name"] for project in response.json()]
+
+    def test_reads_stay_on_the_primary_until_the_replica_catches_up(self):
+        self.assertTrue(routers.replica_configured())
+        self.assertEqual(self._names(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/projects/", {"project_name": "P1", "status": "Draft"},
+                                        format="json")
+        self.assertEqual(response.status_code, 201)
+
+        self.assertFalse(routers.replica_fresh_for(self.user.pk))
+        self.assertEqual(self._names(), ["P1"])
+
+        routers.mark_synced(time.time() + 1)
+        self.assertEqual(self._names(), [])  # The replica has not really seen the write
+        self.assertEqual(routers.current_read_alias(), "default")
+
+    def test_failed_writes_do_not_make_the_user_sticky(self):
+        response = self.client.post("/api/projects/", {}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(routers.replica_fresh_for(self.user.pk))
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class ReportSnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("researcher")
+        self.admin_client, self.user_client = _client(self.admin), _client(self.user)
+
+    def _submit(self, doi):
+        """Create ``doi`` as the researcher and count its master copy towards 2025."""
+        response = self.user_client.post("/api/papers/", {**PAPER, "doi": doi}, format="json")
+        self.assertEqual(response.status_code, 201)
+        master = Paper.objects.get(user=self.admin, doi=doi)
+        response = self.admin_client.put(f"/api/superuser/papers/{master.pk}/", {"submission_year": 2025},
+                                         format="json")
+        self.assertEqual(response.status_code, 200)
+        return master
+
+    def _snapshot(self):
+        response = self.admin_client.post("/api/reports/snapshots/", {"year": 2025}, format="json")
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def test_snapshot_is_frozen_against_later_edits(self):
+        master = self._submit("10.1000/one")
+        first = self._snapshot()
+
+        Paper.objects.filter(pk=master.pk).update(title="Retitled")
+        self._submit("10.1000/two")
+
+        detail = self.admin_client.get(f"/api/reports/snapshots/{first['id']}/?include=papers").json()
+        self.assertEqual(detail["report"]["papers"]["total"], 1)
+        title = detail["papers"]["columns"].index("title")
+        self.assertEqual([row[title] for row in detail["papers"]["rows"]], ["T"])
+        export = self.admin_client.get(f"/api/reports/snapshots/{first['id']}/export/")
+        self.assertEqual(export["Content-Disposition"], 'attachment; filename="report-2025-v1.csv"')
+        self.assertNotIn("Retitled", export.content.decode())
+
+    def test_diff_reports_added_and_changed_papers(self):
+        master = self._submit("10.1000/one")
+        first = self._snapshot()
+        Paper.objects.filter(pk=master.pk).update(title="Retitled")
+        self._submit("10.1000/two")
+        second = self._snapshot()
+        self.assertEqual(second["version"], 2)
+
+        diff = self.admin_client.get(f"/api/reports/snapshots/diff/?from={first['id']}&to={second['id']}").json()
+
+        self.assertEqual(diff["papers"]["total"], {"from": 1, "to": 2})
+        self.assertEqual(diff["papers"]["added"], ["10.1000/two"])
+        self.assertEqual(diff["papers"]["removed"], [])
+        self.assertEqual(diff["papers"]["changed"], {"10.1000/one": {"title": {"from": "T", "to": "Retitled"}}})
+
+    def test_snapshots_are_superuser_only(self):
+        response = self.user_client.post("/api/reports/snapshots/", {"year": 2025}, format="json")
+
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False, PROFILING_ENABLED=True)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("researcher")
+
+    def _get(self, user, path="/api/papers/"):
+        # The middleware runs before DRF authenticates, so it needs a real token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        return client.get(path, HTTP_X_PROFILE="1")
+
+    def test_superuser_request_is_profiled_with_credentials_redacted(self):
+        response = self._get(self.admin, "/api/superuser/papers/stats/")
+
+        self.assertEqual(response.status_code, 200)
+        report = ProfileReport.objects.get(pk=response["X-Profile-Id"])
+        self.assertEqual((report.user, report.path), (self.admin, "/api/superuser/papers/stats/"))
+        statements = report.report["sql"]["statements"]
+        users = [query for query in statements if '"auth_user"' in query["sql"]]
+        self.assertTrue(users)
+        self.assertTrue(all(query["params"] == profiling.REDACTED for query in users))
+        # Plain reads of other tables keep their parameters
+        counts = [query for query in statements if '"auth_user"' not in query["sql"]]
+        self.assertTrue(counts)
+        self.assertEqual({query["params"] for query in counts}, {repr((self.admin.pk,))})
+
+    def test_non_superuser_is_not_profiled(self):
+        response = self._get(self.user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("X-Profile-Id", response)
+        self.assertFalse(ProfileReport.objects.exists())
+
+    def test_writes_are_always_redacted(self):
+        self.assertTrue(profiling._redacted({"sql": 'UPDATE "papers_paper" SET "title" = %s'}))
+        self.assertTrue(profiling._redacted({"sql": ' SELECT * FROM "papers_revokedtoken"'}))
+        self.assertFalse(profiling._redacted({"sql": 'SELECT * FROM "papers_paper"'}))
+
+    @override_settings(PROFILE_RETENTION_DAYS=7, PROFILE_MAX_REPORTS=2)
+    def test_prune_drops_expired_then_oldest_reports(self):
+        now = timezone.now()
+        ages = {"expired": 8, "old": 3, "middle": 2, "new": 1}
+        for path, days in ages.items():
+            report = ProfileReport.objects.create(method="GET", path=path, status_code=200, duration_ms=1)
+            ProfileReport.objects.filter(pk=report.pk).update(created_at=now - timedelta(days=days))
+
+        profiling.prune()
+
+        self.assertEqual(set(ProfileReport.objects.values_list("path", flat=True)), {"middle", "new"})
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False, USER_DELETE_BATCH_SIZE=2)
+class UserDeletionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser("admin", password="x")
+        self.user = User.objects.create_user("researcher")
+        self.other = User.objects.create_user("colleague")
+        self.admin_client = _client(self.admin)
+        user_client = _client(self.user)
+        for doi in ("10.1000/shared", "10.1000/solo", "10.1000/submitted", "10.1000/four", "10.1000/five"):
+            self.assertEqual(user_client.post("/api/papers/", {**PAPER, "doi": doi}, format="json").status_code, 201)
+        self.assertEqual(
+            _client(self.other).post("/api/papers/", {**PAPER, "doi": "10.1000/shared"}, format="json").status_code,
+            201,
+        )
+        Paper.objects.filter(user=self.admin, doi="10.1000/submitted").update(submission_year=2025)
+        project = Project.objects.create(user=self.user, project_name="P", status="Draft")
+        Paper.objects.filter(user=self.other).update(project=project)
+        ChatMessage.objects.bulk_create(ChatMessage(user=self.user, role="user", content=str(i)) for i in range(5))
+        Job.objects.all().delete()  # Metadata lookups queued by the creates
+
+    def _master_dois(self):
+        return set(Paper.objects.filter(user=self.admin, is_master_copy=True).values_list("doi", flat=True))
+
+    def test_background_delete_deactivates_then_the_worker_deletes_in_chunks(self):
+        response = self.admin_client.delete(f"/api/users/{self.user.pk}/?background=true")
+
+        self.assertEqual(response.status_code, 202)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(self.admin_client.delete(f"/api/users/{self.user.pk}/?background=true").status_code, 202)
+        self.assertEqual(Job.objects.filter(name="delete_user").count(), 1)  # The retry reused the queued job
+
+        job = jobs.claim_next("test-worker")
+        self.assertTrue(jobs.execute(job))
+
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(Paper.objects.filter(user_id=self.user.pk).exists())
+        self.assertFalse(ChatMessage.objects.filter(user_id=self.user.pk).exists())
+        self.assertEqual(Paper.objects.get(user=self.other).project, None)
+        # The shared paper is still backed by a colleague and the submitted one stays on record
+        self.assertEqual(self._master_dois(), {"10.1000/shared", "10.1000/submitted"})
+
+    def test_delete_reports_chunked_counts(self):
+        counts = accounts.delete_user(self.user.pk)
+
+        self.assertEqual(counts, {
+            "chat_messages": 5, "papers": 5, "projects": 1,
+            "orphaned_master_copies": 3, "kept_submitted_master_copies": 1,
+        })
+
+    def test_reconcile_dry_run_leaves_orphans_in_place(self):
+        Paper.objects.filter(user=self.user).delete()
+
+        self.assertEqual(accounts.reconcile_master_copies(dry_run=True), (3, 1))
+        self.assertEqual(len(self._master_dois()), 5)
+        self.assertEqual(accounts.reconcile_master_copies(), (3, 1))
+        self.assertEqual(self._master_dois(), {"10.1000/shared", "10.1000/submitted"})
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class ChangeEventRetentionTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        for model, hours in (("expired", 25), ("recent", 1)):
+            event = ChangeEvent.objects.create(model=model, action="created")
+            ChangeEvent.objects.filter(pk=event.pk).update(created_at=now - timedelta(hours=hours))
+
+    def _models(self):
+        return set(ChangeEvent.objects.values_list("model", flat=True))
+
+    def test_command_prunes_expired_events(self):
+        out = StringIO()
+        call_command("prune_change_events", "--dry-run", stdout=out)
+        self.assertIn("Would delete 1 expired change events; 1 kept", out.getvalue())
+        self.assertEqual(self._models(), {"expired", "recent"})
+
+        call_command("prune_change_events", stdout=StringIO())
+
+        self.assertEqual(self._models(), {"recent"})
+
+    def test_job_worker_prunes_without_an_event_stream(self):
+        with mock.patch("signal.signal"):  # Keep the test runner's handlers
+            call_command("run_jobs", "--once", "--concurrency", "1", stdout=StringIO())
+
+        self.assertEqual(self._models(), {"recent"})
+
+
+@override_settings(CACHES=TEST_CACHES, JOBS_RUN_EAGER=False, THROTTLE_ENABLED=False)
+class JobMaintenanceTests(TestCase):
+    def _job(self, status, age, **fields):
+        job = Job.objects.create(**{"name": "noop", "status": status, **fields})
+        moment = timezone.now() - age
+        Job.objects.filter(pk=job.pk).update(updated_at=moment, locked_at=moment if status == Job.RUNNING else None)
+        return Job.objects.get(pk=job.pk)
+
+    def test_prune_removes_old_done_and_failed_jobs(self):
+        old = jobs.RETENTION + timedelta(days=1)
+        for status in (Job.DONE, Job.FAILED, Job.QUEUED):
+            self._job(status, old)
+        recent = self._job(Job.FAILED, timedelta(days=1))
+
+        self.assertEqual(jobs.prune_finished(), 2)
+
+        self.assertEqual(set(Job.objects.values_list("status", flat=True)), {Job.QUEUED, Job.FAILED})
+        self.assertTrue(Job.objects.filter(pk=recent.pk).exists())
+
+    def test_heartbeat_keeps_a_long_running_job_from_being_requeued(self):
+        running = self._job(Job.RUNNING, jobs.LOCK_TIMEOUT * 2, locked_by="busy-worker", attempts=1)
+        dead = self._job(Job.RUNNING, jobs.LOCK_TIMEOUT * 2, locked_by="dead-worker", attempts=1)
+
+        self.assertTrue(jobs.heartbeat(running))
+        self.assertEqual(jobs.requeue_stale(), (1, 0))
+
+        self.assertEqual(Job.objects.get(pk=running.pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=dead.pk).status, Job.QUEUED)
+        self.assertFalse(jobs.heartbeat(dead))  # No longer ours to refresh
+
+    def test_execute_heartbeats_while_the_handler_runs(self):
+        job = self._job(Job.RUNNING, timedelta(0), name="slow", locked_by="worker", attempts=1)
+        spec = jobs.JobSpec(lambda payload: time.sleep(0.3), "slow", 1, None)
+
+        with mock.patch.dict(jobs._handlers, {"slow": spec}), \
+                mock.patch.object(jobs, "HEARTBEAT_INTERVAL", timedelta(seconds=0.05)), \
+                mock.patch.object(jobs, "heartbeat") as beat:
+            self.assertTrue(jobs.execute(job))
+
+        self.assertGreaterEqual(beat.call_count, 2)
+        calls = beat.call_count
+        time.sleep(0.1)
+        self.assertEqual(beat.call_count, calls)  # Stopped with the handler
+
+
+@override_settings(CACHES=TEST_CACHES)
+class MetricsRetirementTests(SimpleTestCase):
+    LABELS = ("papers.views.PaperListCreateView", "GET", "2xx")
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(instrumentation, "registry", instrumentation.MetricsRegistry())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _publish(self, pid, requests):
+        """Flush a worker's snapshot as process ``pid`` would."""
+        registry = instrumentation.MetricsRegistry()
+        registry.inc("papers_requests_total", self.LABELS, requests)
+        with mock.patch("os.getpid", return_value=pid):
+            registry.maybe_flush(force=True)
+
+    def _total(self):
+        response = instrumentation.metrics_view(RequestFactory().get("/api/metrics/"))
+        self.assertEqual(response.status_code, 200)
+        prefix = 'papers_requests_total{view="papers.views.PaperListCreateView",method="GET",status="2xx"} '
+        lines = [line for line in response.content.decode().splitlines() if line.startswith(prefix)]
+        return int(lines[0][len(prefix):]) if lines else 0
+
+    def test_exited_worker_counts_are_kept(self):
+        self._publish(111, 3)
+        self._publish(222, 2)
+        self.assertEqual(self._total(), 5)
+
+        instrumentation.retire_worker(111)
+
+        self.assertNotIn(111, cache.get(instrumentation.WORKERS_KEY))
+        self.assertEqual(self._total(), 5)
+        self._publish(333, 4)  # Its replacement
+        self.assertEqual(self._total(), 9)
+
+    def test_leftover_entry_of_a_retired_worker_is_not_counted_twice(self):
+        self._publish(111, 3)
+        snapshot = cache.get(instrumentation._worker_key(111))
+        instrumentation.retire_worker(111)
+        instrumentation.retire_worker(111)
+
+        # A scrape between writing the retired totals and deleting the worker entry
+        cache.set(instrumentation._worker_key(111), snapshot)
+        cache.set(instrumentation.WORKERS_KEY, [111])
+
+        self.assertEqual(self._total(), 3)
+
+    def test_forked_workers_get_their_own_token(self):
+        registry = instrumentation.MetricsRegistry()
+        with mock.patch("os.getpid", return_value=111):
+            first = registry.token()
+            self.assertEqual(registry.token(), first)
+        with mock.patch("os.getpid", return_value=222):
+            self.assertNotEqual(registry.token(), first)
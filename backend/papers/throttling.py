@@ -0,0 +1,159 @@
+"""
+Rate limits and concurrency caps for expensive endpoints.
+
+Limits are token buckets per scope ("chat", "doi_lookup", ...) and client
+(user id when authenticated, otherwise IP), configured in THROTTLE_RATES as
+``(rate, burst)``: ``("10/min", 5)`` allows bursts of 5 requests refilled at
+10 per minute. Bucket state is one row per scope and client holding the
+GCRA "theoretical arrival time", advanced by a single conditional UPDATE, so
+all gunicorn workers share limits exactly (the file cache has no atomic
+increment). ``ConcurrencyLimitMixin`` additionally caps in-flight requests
+per user with expiring leases.
+
+Both answer 429 with Retry-After through DRF's Throttled handling. Every
+decision is counted in ``papers_throttle_decisions_total``.
+"""
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from .instrumentation import client_ip, registry
+from .models import ThrottleBucket, ThrottleLease
+
+PERIODS = {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "hour": 3600, "d": 86400, "day": 86400}
+PRUNE_PROBABILITY = 0.001  # Share of checks that also delete long-idle buckets
+
+
+def enabled():
+    return getattr(settings, "THROTTLE_ENABLED", True)
+
+
+def parse_rate(rate):
+    """``"10/min"`` -> seconds between tokens (0.1 per second -> 6.0)."""
+    count, _, period = rate.partition("/")
+    return PERIODS[period] / int(count)
+
+
+def _limits(scope):
+    rate, burst = getattr(settings, "THROTTLE_RATES", {})[scope]
+    return parse_rate(rate), burst
+
+
+def client_ident(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return "ip:" + client_ip(request)
+
+
+def _record(scope, outcome):
+    registry.inc("papers_throttle_decisions_total", (scope, outcome))
+
+
+def take_token(scope, ident):
+    """
+    Spend one token from ``ident``'s bucket for ``scope``. Returns 0 when the
+    request may proceed, otherwise the seconds until a token is available.
+    """
+    interval, burst = _limits(scope)
+    key = f"{scope}:{ident}"
+    for _ in range(2):
+        now = time.time()
+        # GCRA: allowed while the arrival time is at most burst-1 intervals ahead
+        allowed = ThrottleBucket.objects.filter(key=key, tat__lte=now + (burst - 1) * interval).update(
+            tat=Greatest(F("tat"), Value(now)) + interval,
+        )
+        if allowed:
+            break
+        tat = ThrottleBucket.objects.filter(key=key).values_list("tat", flat=True).first()
+        if tat is not None:
+            _record(scope, "rate_limited")
+            return max(tat - (burst - 1) * interval - now, 0.001)
+        try:
+            with transaction.atomic():
+                ThrottleBucket.objects.create(key=key, tat=now + interval)
+            break
+        except IntegrityError:
+            continue  # Another worker created the bucket first; apply the update
+    if random.random() < PRUNE_PROBABILITY:
+        ThrottleBucket.objects.filter(tat__lt=time.time() - 86400).delete()
+    _record(scope, "allowed")
+    return 0
+
+
+class ScopedRateThrottle(BaseThrottle):
+    """Token-bucket throttle for the view's ``throttle_scope``."""
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        if not enabled():
+            return True
+        self.wait_seconds = take_token(view.throttle_scope, client_ident(request))
+        return not self.wait_seconds
+
+    def wait(self):
+        return self.wait_seconds
+
+
+def acquire_lease(scope, ident, limit):
+    """Take one of ``limit`` in-flight slots; returns the lease id or None."""
+    now = timezone.now()
+    key = f"{scope}:{ident}"
+    # Leases of workers that died mid-request expire instead of leaking
+    ThrottleLease.objects.filter(key=key, expires_at__lt=now).delete()
+    expires_at = now + timedelta(seconds=getattr(settings, "THROTTLE_LEASE_SECONDS", 180))
+    for slot in range(limit):
+        try:
+            with transaction.atomic():
+                return ThrottleLease.objects.create(key=key, slot=slot, expires_at=expires_at).pk
+        except IntegrityError:
+            continue
+    return None
+
+
+def release_lease(lease_id):
+    ThrottleLease.objects.filter(pk=lease_id).delete()
+
+
+class ConcurrencyLimitMixin:
+    """
+    APIView mixin capping each user's in-flight requests at
+    ``THROTTLE_CONCURRENCY[concurrency_scope]``; extra requests get a 429.
+    """
+    concurrency_scope = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        limit = getattr(settings, "THROTTLE_CONCURRENCY", {}).get(self.concurrency_scope)
+        if not enabled() or not limit or request.method in ("GET", "HEAD", "OPTIONS"):
+            return
+        self._lease = acquire_lease(self.concurrency_scope, client_ident(request), limit)
+        if self._lease is None:
+            _record(self.concurrency_scope, "concurrency_limited")
+            raise Throttled(
+                wait=getattr(settings, "THROTTLE_CONCURRENCY_RETRY_AFTER", 2),
+                detail="Another request is still being processed. Please wait for it to finish.",
+            )
+
+    def _release_lease(self):
+        lease = getattr(self, "_lease", None)
+        if lease is not None:
+            release_lease(lease)
+            self._lease = None
+
+    def handle_exception(self, exc):
+        # DRF re-raises unhandled exceptions without reaching finalize_response
+        self._release_lease()
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        self._release_lease()
+        return super().finalize_response(request, response, *args, **kwargs)
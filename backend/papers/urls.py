@@ -1,20 +1,36 @@
 from django.urls import path
-from .views import *
-from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from .views import (
+    ChatbotView, ClearChatHistory, CustomTokenRefreshView, CustomTokenVerifyView, DOIInfoView, EventStreamTicketView,
+    PaperBulkDeleteView, PaperBulkUpdateView, PaperDeleteView, PaperListCreateView, PaperUpdateView,
+    ProfileReportDetailView, ProfileReportListView, ProjectBulkDeleteView, ProjectBulkUpdateView,
+    ProjectDeleteView, ProjectFundingView, ProjectListCreateView, ProjectPaperCountsView,
+    ProjectPapersView, ProjectUpdateView, ReportSnapshotDetailView, ReportSnapshotDiffView,
+    ReportSnapshotExportView, ReportSnapshotListCreateView, SuperuserBulkUpdateView,
+    SuperuserPaperListView, SuperuserPaperUpdateView, SuperuserSubmissionStatsView,
+    UserDetailAPIView, UserListCreateAPIView, event_stream, forgot_password, login_view,
+)
+from .instrumentation import metrics_view
 
 urlpatterns = [
     path("auth/login/", login_view, name="login"),
     path("auth/token/verify/", CustomTokenVerifyView.as_view(), name="token_verify"),
-    path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("auth/token/refresh/", CustomTokenRefreshView.as_view(), name="token_refresh"),
     path('forgot_password/', forgot_password, name='forgot_password'),
 
     path('papers/', PaperListCreateView.as_view(), name='paper-list-create'),
     path('papers/delete/<int:pk>/', PaperDeleteView.as_view(), name='paper-delete'),
     path('papers/update/<int:pk>/', PaperUpdateView.as_view(), name='paper-update'),  # PUT Route
+    path('papers/bulk-delete/', PaperBulkDeleteView.as_view(), name='paper-bulk-delete'),
+    path('papers/bulk-update/', PaperBulkUpdateView.as_view(), name='paper-bulk-update'),
 
     path('projects/', ProjectListCreateView.as_view(), name='project-list-create'),
     path('projects/delete/<int:pk>/', ProjectDeleteView.as_view(), name='project-delete'),
     path('projects/update/<int:pk>/', ProjectUpdateView.as_view(), name='project-update'),  # PUT Route
+    path('projects/bulk-delete/', ProjectBulkDeleteView.as_view(), name='project-bulk-delete'),
+    path('projects/bulk-update/', ProjectBulkUpdateView.as_view(), name='project-bulk-update'),
+    path('projects/funding/', ProjectFundingView.as_view(), name='project-funding'),
+    path('projects/paper-counts/', ProjectPaperCountsView.as_view(), name='project-paper-counts'),
+    path('projects/<int:pk>/papers/', ProjectPapersView.as_view(), name='project-papers'),
 
     path('doi-info/', DOIInfoView.as_view(), name='doi-info'),
 
@@ -30,5 +46,23 @@ urlpatterns = [
     path('superuser/papers/bulk-update/', SuperuserBulkUpdateView.as_view(), name='superuser-bulk-update'),
     path('superuser/papers/stats/', SuperuserSubmissionStatsView.as_view(), name='superuser-stats'),
 
+    # Frozen annual reports
+    path('reports/snapshots/', ReportSnapshotListCreateView.as_view(), name='report-snapshots'),
+    path('reports/snapshots/diff/', ReportSnapshotDiffView.as_view(), name='report-snapshot-diff'),
+    path('reports/snapshots/<int:pk>/', ReportSnapshotDetailView.as_view(), name='report-snapshot'),
+    path('reports/snapshots/<int:pk>/export/', ReportSnapshotExportView.as_view(), name='report-snapshot-export'),
+
+    # On-demand request profiles (X-Profile: 1, papers/profiling.py)
+    path('profiles/', ProfileReportListView.as_view(), name='profile-reports'),
+    path('profiles/<int:pk>/', ProfileReportDetailView.as_view(), name='profile-report'),
+
+    # Change notifications (served by the ASGI process)
+    path('events/', event_stream, name='event-stream'),
+    # Outside /api/events/, which nginx sends to the ASGI process
+    path('event-tickets/', EventStreamTicketView.as_view(), name='event-stream-ticket'),
+
+    # Prometheus scrape target (loopback / METRICS_ALLOWED_IPS only)
+    path('metrics/', metrics_view, name='metrics'),
+
 
 ]
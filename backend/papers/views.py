@@ -1,42 +1,61 @@
 import json
+import logging
+import time
 from urllib.parse import unquote
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from django.shortcuts import get_object_or_404
-from django.http import JsonResponse
-from django.db import IntegrityError
-from .models import Paper, Project, ChatMessage
-from .serializers import PaperSerializer, ProjectSerializer, CustomTokenVerifySerializer, SuperuserPaperSerializer, UserSerializer
-import requests
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from .models import Paper, Project, ChatMessage, ProfileReport, ReportSnapshot
+from .serializers import PaperSerializer, ProjectSerializer, CustomTokenRefreshSerializer, CustomTokenVerifySerializer, SuperuserPaperSerializer, UserSerializer
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, login
 from rest_framework_simplejwt.tokens import RefreshToken
-from rest_framework_simplejwt.views import TokenVerifyView
-from django.contrib.auth.models import User
-from django.contrib.auth.tokens import default_token_generator
-from django.utils.http import urlsafe_base64_encode
-from django.utils.encoding import force_bytes
-from django.core.mail import send_mail
+from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
+from django.contrib.auth.models import User, update_last_login
 from django.conf import settings
 from rest_framework.permissions import IsAdminUser
-import boto3
 import re
-from botocore.exceptions import ClientError
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from .events import TICKET_TTL, issue_ticket, publish, redeem_ticket, stream_events
+from . import caching
+from .instrumentation import track_outbound
+from . import llm
+from .chatreply import ReplyParser
+from .crossref import CrossrefBusy, lookup_doi
+from .dois import clean_doi, normalize_doi
+from .jobs import enqueue
+from . import diagnostics
+from .routers import ReplicaReadMixin
+from .throttling import ConcurrencyLimitMixin, ScopedRateThrottle
+from .fastpath import FastJSONRenderer, serialize_rows
+from .funding import GROUP_FIELDS, funding_totals
+from . import accounts
+from . import bulk
+from .idempotency import idempotent
+from . import milestones
+from . import reporting
+from rest_framework.renderers import BrowsableAPIRenderer
+
+logger = logging.getLogger(__name__)
 
 class CustomTokenVerifyView(TokenVerifyView):
     serializer_class = CustomTokenVerifySerializer
 
-# Bedrock configuration
-BEDROCK_MODEL_ID = "meta.llama3-70b-instruct-v1:0"
-BEDROCK_REGION = "us-west-2"
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
 
-class ChatbotView(APIView):
+class ChatbotView(ConcurrencyLimitMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
-
-    def __init__(self):
-        super().__init__()
-        self.bedrock_client = boto3.client("bedrock-runtime", region_name=BEDROCK_REGION)
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'chat'
+    concurrency_scope = 'chat'
 
     def post(self, request):
         """
@@ -123,55 +142,17 @@ class ChatbotView(APIView):
         }
 
         try:
-            request_body = json.dumps(native_request)
-            response = self.bedrock_client.invoke_model(
-                modelId=BEDROCK_MODEL_ID, 
-                body=request_body
+            parsed, backend = llm.generate(native_request, ReplyParser)
+        except llm.LLMUnavailable as e:
+            # Attempt outcomes are in papers_llm_attempts_total; the errors may quote the reply
+            logger.debug(f"Chatbot models unavailable: {e}")
+            return Response(
+                {"error": "The assistant is busy right now. Please try again in a moment."},
+                status=503, headers={"Retry-After": "5"},
             )
-            
-            model_response = json.loads(response["body"].read())
-            bot_reply_raw = model_response["generation"]
-            print(f"Raw Bedrock response: {bot_reply_raw}")
-            
-            # Extract JSON from the response
-            def extract_json_from_response(response_text):
-                """
-                Extract JSON from response text, handling nested objects properly
-                """
-                # Find the start of JSON
-                start_idx = response_text.find('{')
-                if start_idx == -1:
-                    return None
-                
-                # Count braces to find the matching closing brace
-                brace_count = 0
-                for i, char in enumerate(response_text[start_idx:], start_idx):
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            # Found the matching closing brace
-                            return response_text[start_idx:i+1]
-                
-                # If we get here, no matching closing brace was found
-                return None
-            json_answer = extract_json_from_response(bot_reply_raw)
-            if not json_answer:
-                return Response(
-                    {"error": "Could not parse response from AI model"},
-                    status=500
-                )
-            print(f"Extracted JSON: {json_answer}")
-            
-            try:
-                parsed = json.loads(json_answer)
-            except json.JSONDecodeError:
-                return Response(
-                    {"error": "Invalid JSON response from AI model"},
-                    status=500
-                )
+        logger.debug(f"Chatbot reply from {backend}: intent={parsed.get('intent')} action={parsed.get('action')}")
 
+        try:
             intent = parsed.get("intent", "chitchat")
             bot_reply = parsed.get("answer", "")
             action = parsed.get("action", "none")
@@ -255,9 +236,33 @@ class ChatbotView(APIView):
             print(f"Error registering project: {e}")
             return {"success": False, "error": "An unexpected error occurred"}
 
+    def _fill_from_crossref(self, data):
+        try:
+            metadata = lookup_doi(data['doi'], block=False)
+        except CrossrefBusy:
+            return  # Register with what the user gave; enrichment fills gaps later
+        if 'error' in metadata:
+            return
+        authors = metadata.get('Authors', {})
+        fills = {
+            'title': metadata.get('Title'),
+            'author_name': authors.get('Main Author'),
+            'journal': metadata.get('Journal'),
+            'date': metadata.get('PublishedOn'),
+            'additional_authors': authors.get('Additional Authors'),
+        }
+        for field, value in fills.items():
+            if not data.get(field) and value and value != 'N/A':
+                data[field] = value
+
     def _register_paper(self, user, data):
         """Register a paper with the collected data"""
         try:
+            # Fill what the user left out from Crossref (cached lookup). This ran
+            # after the required-field check before, where it could never apply.
+            if data.get('doi') and not all(data.get(field) for field in ('title', 'author_name', 'journal', 'date')):
+                self._fill_from_crossref(data)
+
             # Validate required fields
             required_fields = ['doi', 'title', 'author_name', 'journal', 'date']
             for field in required_fields:
@@ -265,24 +270,9 @@ class ChatbotView(APIView):
                     return {"success": False, "error": f"{field} is required"}
             
             # Check if paper already exists for this user
-            if Paper.objects.filter(doi=data['doi'], user=user).exists():
+            if Paper.objects.filter(doi_key=normalize_doi(data['doi']), user=user).exists():
                 return {"success": False, "error": "A paper with this DOI already exists for your account"}
             
-            # If DOI is provided, try to fetch additional metadata
-            if data.get('doi') and not all([data.get('title'), data.get('author_name'), data.get('journal')]):
-                metadata = fetch_doi_metadata(data['doi'])
-                if 'error' not in metadata:
-                    # Merge fetched metadata with user-provided data
-                    data.setdefault('journal', metadata.get('Journal', ''))
-                    data.setdefault('date', metadata.get('PublishedOn', ''))
-                    if not data.get('title'):
-                        data['title'] = metadata.get('Title', '')
-                    if not data.get('author_name'):
-                        data['author_name'] = metadata.get('Authors', {}).get('Main Author', '')
-                    if not data.get('additional_authors'):
-                        additional_authors = metadata.get('Authors', {}).get('Additional Authors', [])
-                        data['additional_authors'] = additional_authors
-            
             # Create the paper
             paper_data = {
                 'doi': data['doi'],
@@ -301,6 +291,7 @@ class ChatbotView(APIView):
             serializer = PaperSerializer(data=paper_data, context={'request': type('Request', (), {'user': user})()})
             
             if serializer.is_valid():
+                # Crossref enrichment (e.g. the missing publication type) is queued by the serializer
                 serializer.save(user=user)
                 return {"success": True, "paper": serializer.data}
             else:
@@ -312,26 +303,6 @@ class ChatbotView(APIView):
     
     
 
-    # Alternative method using json.loads with error handling
-    def extract_json_from_response_alt(response_text):
-        """
-        Alternative method: try to find JSON by attempting to parse substrings
-        """
-        start_idx = response_text.find('{')
-        if start_idx == -1:
-            return None
-        
-        # Try parsing increasingly larger substrings
-        for end_idx in range(len(response_text), start_idx, -1):
-            try:
-                potential_json = response_text[start_idx:end_idx].strip()
-                if potential_json.endswith('}'):
-                    return json.loads(potential_json)
-            except json.JSONDecodeError:
-                continue
-        
-        return None
-
     def delete(self, request):
         """Clear chat history for the current user"""
         user = request.user
@@ -361,34 +332,13 @@ def forgot_password(request):
                 "message": "If the email is valid, a reset link has been sent."
             })
 
-        # 2. Generate a password reset token
-        token = default_token_generator.make_token(user)
-
-        # 3. Encode the user’s primary key (id) in base 64
-        uid = urlsafe_base64_encode(force_bytes(user.pk))
-
-        # 4. Construct the reset URL
-        #    This should match whatever route your front-end or Django app 
-        #    handles to actually reset the password.
-        #    Example: "https://yourfrontend.com/reset/<uid>/<token>"
-        reset_link = f"https://yourfrontend.com/reset/{uid}/{token}"
-
-        # 5. Build an email message that includes the username and the reset link
-        subject = "Password Reset Request"
-        message = (
-            f"Hi {user.username},\n\n"
-            "You requested a password reset.\n\n"
-            f"Use the link below to reset your password:\n{reset_link}\n\n"
-            "If you did not request this, please ignore this email.\n"
-        )
-
-        # 6. Send the email
-        send_mail(
-            subject,
-            message,
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
+        # 2. Queue the reset email; the worker builds the token and link and
+        #    retries if the mail server is slow or down. Repeated submissions
+        #    within the same minute collapse into one email.
+        enqueue(
+            "send_password_reset_email",
+            {"user_id": user.pk},
+            idempotency_key=f"password-reset:{user.pk}:{int(time.time() // 60)}",
         )
 
         return JsonResponse({
@@ -407,6 +357,7 @@ def login_view(request):
 
             user = authenticate(request, username=username, password=password)
             if user is not None:
+                update_last_login(None, user)  # Shown as activity in the admin user list
                 refresh = RefreshToken.for_user(user)  # Generate JWT tokens
                 return JsonResponse({
                     "access_token": str(refresh.access_token),
@@ -428,46 +379,55 @@ def login_view(request):
 
 class PaperListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get(self, request):
         """
         Regular users see only their own papers (excluding master copies)
-        Superusers see their master copies for deduplication
+        Superusers see their master copies
         """
         if request.user.is_superuser:
             papers = Paper.objects.filter(user=request.user, is_master_copy=True)
         else:
             papers = Paper.objects.filter(user=request.user, is_master_copy=False)
-        
-        serializer = PaperSerializer(papers, many=True)
-        return Response(serializer.data)
 
+        if diagnostics.enabled():
+            diagnostics.trace_paper_list(request, papers)
+
+        data = caching.get_or_build(
+            [caching.papers_ns(request.user.id)],
+            ("paper-list", request.user.is_superuser),
+            lambda: serialize_rows(papers, PaperSerializer),
+        )
+        return Response(data)
+
+    @idempotent
     def post(self, request):
         """
-        Create a new paper. 
+        Create a new paper.
         - Regular users: creates normal paper + auto-copies to superuser
         - Superusers: creates master copy directly
         """
+        if diagnostics.enabled():
+            diagnostics.trace("POST request received", request)
+
         serializer = PaperSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             try:
                 paper = serializer.save(user=request.user)
+                if diagnostics.enabled():
+                    diagnostics.trace_paper_created(request, paper)
                 return Response(serializer.data, status=status.HTTP_201_CREATED)
             except IntegrityError as e:
-                # Handle duplicate DOI
-                if request.user.is_superuser:
-                    # Check if superuser already has this DOI as master copy
-                    if Paper.objects.filter(doi=request.data.get('doi'), user=request.user, is_master_copy=True).exists():
-                        return Response(
-                            {"error": "You already have this paper as a master copy", "field": "doi"},
-                            status=status.HTTP_400_BAD_REQUEST,
-                        )
-                
+                if diagnostics.enabled():
+                    diagnostics.trace(f"IntegrityError occurred: {e}", request)
                 return Response(
                     {"error": "Duplicate DOI error", "field": "doi"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        
+        elif diagnostics.enabled():
+            diagnostics.trace(f"Serializer is invalid: {serializer.errors}", request)
+
         errors = serializer.errors.copy()
         if 'non_field_errors' in errors:
             errors['error'] = 'Duplicate key error'
@@ -527,12 +487,19 @@ class SuperuserBulkUpdateView(APIView):
         
         updated_count = 0
         
-        for paper in papers:
-            # Update all papers with the same DOI
-            Paper.objects.filter(doi=paper.doi).update(
-                submission_year=submission_year
-            )
-            updated_count += Paper.objects.filter(doi=paper.doi).count()
+        with transaction.atomic():
+            papers = list(papers)
+            for paper in papers:
+                # Update all papers with the same DOI
+                Paper.objects.filter(doi_key=paper.doi_key).update(
+                    submission_year=submission_year
+                )
+                updated_count += Paper.objects.filter(doi_key=paper.doi_key).count()
+                publish("paper", "submission_year", paper.pk, paper.user_id,
+                        {"doi": paper.doi, "submission_year": submission_year})
+            # .update() bypasses post_save, so drop cached lists explicitly, once
+            # the new rows are committed (a rebuild before then would cache the old ones)
+            caching.invalidate_papers_for_dois([paper.doi for paper in papers])
         
         action = "submitted" if submission_year else "unsubmitted"
         message = f"Successfully {action} {updated_count} papers"
@@ -544,73 +511,83 @@ class SuperuserBulkUpdateView(APIView):
             "updated_papers": updated_count
         }, status=status.HTTP_200_OK)
 
-# Update your existing PaperListCreateView post method
-class PaperListCreateView(APIView):
+class EventStreamTicketView(APIView):
+    """
+    POST: a single-use ticket for opening the event stream with
+    ``/api/events/?ticket=...``, since EventSource cannot send the access token.
+    """
     permission_classes = [permissions.IsAuthenticated]
 
-    def get(self, request):
-        """
-        Regular users see only their own papers (excluding master copies)
-        Superusers see their master copies
-        """
-        print(f"DEBUG: GET request from user: {request.user.username}, is_superuser: {request.user.is_superuser}")
-        
-        if request.user.is_superuser:
-            papers = Paper.objects.filter(user=request.user, is_master_copy=True)
-            print(f"DEBUG: Superuser query - found {papers.count()} master copies")
-        else:
-            papers = Paper.objects.filter(user=request.user, is_master_copy=False)
-            print(f"DEBUG: Regular user query - found {papers.count()} non-master papers")
-        
-        # Let's also show what papers exist for this user
-        all_user_papers = Paper.objects.filter(user=request.user)
-        print(f"DEBUG: All papers for user {request.user.username}: {all_user_papers.count()}")
-        for p in all_user_papers:
-            print(f"DEBUG: Paper ID: {p.id}, DOI: {p.doi}, is_master_copy: {p.is_master_copy}")
-        
-        serializer = PaperSerializer(papers, many=True)
-        return Response(serializer.data)
-
     def post(self, request):
-        """Create a new paper and auto-copy to superuser."""
-        print(f"DEBUG: POST request received from user: {request.user.username}")
-        print(f"DEBUG: Request data: {request.data}")
-        
-        serializer = PaperSerializer(data=request.data, context={'request': request})
-        if serializer.is_valid():
-            print("DEBUG: Serializer is valid")
-            try:
-                # Remove the explicit is_master_copy parameter - let the serializer handle it
-                paper = serializer.save(user=request.user)
-                print(f"DEBUG: Paper saved successfully: {paper.id}")
-                
-                # Let's also check what papers exist after creation
-                all_papers = Paper.objects.all()
-                print(f"DEBUG: Total papers in database: {all_papers.count()}")
-                for p in all_papers:
-                    print(f"DEBUG: Paper ID: {p.id}, DOI: {p.doi}, User: {p.user.username}, is_master_copy: {p.is_master_copy}")
-                
-                return Response(serializer.data, status=status.HTTP_201_CREATED)
-            except IntegrityError as e:
-                print(f"DEBUG: IntegrityError occurred: {e}")
-                return Response(
-                    {"error": "Duplicate DOI error", "field": "doi"},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-        else:
-            print(f"DEBUG: Serializer is invalid: {serializer.errors}")
-            
-        errors = serializer.errors.copy()
-        print(errors)
-        if 'non_field_errors' in errors:
-            errors['error'] = 'Duplicate key error'
-        return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        if not request.user.is_superuser:
+            return Response(
+                {"error": "Only superusers can access this endpoint"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return Response({"ticket": issue_ticket(request.user), "expires_in": TICKET_TTL},
+                        status=status.HTTP_201_CREATED)
+
+
+def _authenticate_stream_user(request):
+    """
+    Resolve the user of an event stream request: a ``?ticket=`` from
+    EventStreamTicketView, or a JWT in the Authorization header.
+    """
+    ticket = request.GET.get("ticket")
+    if ticket:
+        user_id = redeem_ticket(ticket)
+        return User.objects.filter(pk=user_id, is_active=True).first() if user_id else None
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    raw_token = auth.get_raw_token(header) if header else None
+    if not raw_token:
+        return None
+    try:
+        validated_token = auth.get_validated_token(raw_token)
+        return auth.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
 
-class SuperuserPaperListView(APIView):
+async def event_stream(request):
+    """
+    GET: Server-Sent Events feed of paper/project changes for superusers.
+    Must be served by the ASGI application so idle connections do not hold
+    a sync worker.
+    """
+    if request.method != "GET":
+        return JsonResponse({"error": "Method not allowed."}, status=405)
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"error": "The event stream is only available on the ASGI server."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+    user = await sync_to_async(_authenticate_stream_user)(request)
+    if user is None:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if not user.is_superuser:
+        return JsonResponse({"error": "Only superusers can access this endpoint"}, status=403)
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(
+        stream_events(last_event_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Let nginx pass frames through
+    return response
+
+class SuperuserPaperListView(ReplicaReadMixin, APIView):
     """
     Superuser sees only their master copies (deduplicated view)
     """
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
     
     def get(self, request):
         if not request.user.is_superuser:
@@ -625,6 +602,17 @@ class SuperuserPaperListView(APIView):
         # Optional filters
         submission_year = request.query_params.get('submission_year')
         submitted_only = request.query_params.get('submitted_only')
+        has_conflicts = request.query_params.get('has_conflicts')
+        project = request.query_params.get('project')
+        
+        if project:
+            if not project.isdigit():
+                return Response({"error": "project must be a project id"}, status=status.HTTP_400_BAD_REQUEST)
+            papers = papers.filter(project_id=project)
+        
+        if has_conflicts == 'true':
+            # Papers whose stored metadata disagrees with Crossref (papers/enrichment.py)
+            papers = papers.exclude(metadata_conflicts={})
         
         if submission_year:
             papers = papers.filter(submission_year=submission_year)
@@ -633,10 +621,14 @@ class SuperuserPaperListView(APIView):
         elif submitted_only == 'false':
             papers = papers.filter(submission_year__isnull=True)
         
-        serializer = SuperuserPaperSerializer(papers, many=True, context={'request': request})
-        return Response(serializer.data)
+        data = caching.get_or_build(
+            [caching.papers_ns(request.user.id)],
+            ("superuser-paper-list", submission_year, submitted_only, has_conflicts, project),
+            lambda: serialize_rows(papers, SuperuserPaperSerializer),
+        )
+        return Response(data)
 
-class SuperuserSubmissionStatsView(APIView):
+class SuperuserSubmissionStatsView(ReplicaReadMixin, APIView):
     """
     Get submission statistics
     """
@@ -673,6 +665,159 @@ class SuperuserSubmissionStatsView(APIView):
         
         return Response(stats)
 
+def _superuser_only(request):
+    if not request.user.is_superuser:
+        return Response(
+            {"error": "Only superusers can access this endpoint"},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    return None
+
+
+class ReportSnapshotListCreateView(APIView):
+    """
+    GET lists snapshots (optionally ?year=), without their contents.
+    POST {"year": 2024, "label": "..."} freezes the next version of that
+    year's report.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        snapshots = ReportSnapshot.objects.all()
+        year = request.query_params.get('year')
+        if year:
+            if not year.isdigit():
+                return Response({"error": "year must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+            snapshots = snapshots.filter(year=year)
+        rows = snapshots.values(
+            'id', 'year', 'version', 'label', 'created_at', 'created_by__username', 'report__papers__total',
+        )
+        return Response([
+            {
+                "id": row['id'], "year": row['year'], "version": row['version'], "label": row['label'],
+                "created_at": row['created_at'], "created_by": row['created_by__username'],
+                "total_papers": row['report__papers__total'],
+            }
+            for row in rows
+        ])
+
+    def post(self, request):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        try:
+            year = int(request.data.get('year'))
+        except (TypeError, ValueError):
+            return Response({"error": "year is required and must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+        snapshot = reporting.create_snapshot(year, request.user, request.data.get('label') or "")
+        return Response(
+            {"id": snapshot.pk, "year": snapshot.year, "version": snapshot.version, "label": snapshot.label,
+             "created_at": snapshot.created_at, "report": snapshot.report},
+            status=status.HTTP_201_CREATED
+        )
+
+
+class ReportSnapshotDetailView(APIView):
+    """A frozen report; ?include=papers adds the paper rows."""
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, pk):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        snapshot = get_object_or_404(ReportSnapshot, pk=pk)
+        data = {
+            "id": snapshot.pk, "year": snapshot.year, "version": snapshot.version, "label": snapshot.label,
+            "created_at": snapshot.created_at.isoformat(), "report": snapshot.report,
+        }
+        if request.query_params.get('include') == 'papers':
+            data["papers"] = snapshot.papers
+        return Response(data)
+
+
+class ReportSnapshotExportView(APIView):
+    """Download a snapshot as CSV of its papers (?type=csv, default) or full JSON (?type=json)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        snapshot = get_object_or_404(ReportSnapshot, pk=pk)
+        export_type = request.query_params.get('type', 'csv')
+        filename = f"report-{snapshot.year}-v{snapshot.version}"
+        if export_type == 'csv':
+            response = HttpResponse(reporting.export_csv(snapshot), content_type="text/csv; charset=utf-8")
+            filename += ".csv"
+        elif export_type == 'json':
+            body = {"year": snapshot.year, "version": snapshot.version, "label": snapshot.label,
+                    "created_at": snapshot.created_at.isoformat(), "report": snapshot.report,
+                    "papers": snapshot.papers}
+            response = HttpResponse(json.dumps(body), content_type="application/json")
+            filename += ".json"
+        else:
+            return Response({"error": "type must be csv or json"}, status=status.HTTP_400_BAD_REQUEST)
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ReportSnapshotDiffView(APIView):
+    """Changes between two snapshots: ?from=<id>&to=<id>."""
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        ids = [request.query_params.get('from', ''), request.query_params.get('to', '')]
+        if not all(pk.isdigit() for pk in ids):
+            return Response({"error": "from and to must be snapshot ids"}, status=status.HTTP_400_BAD_REQUEST)
+        old = get_object_or_404(ReportSnapshot, pk=ids[0])
+        new = get_object_or_404(ReportSnapshot, pk=ids[1])
+        return Response(reporting.diff_snapshots(old, new))
+
+
+class ProfileReportListView(APIView):
+    """Stored request profiles, newest first (?path= filters by path prefix)."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        reports = ProfileReport.objects.order_by('-created_at')
+        path = request.query_params.get('path')
+        if path:
+            reports = reports.filter(path__startswith=path)
+        return Response(list(reports.values(
+            'id', 'created_at', 'user__username', 'method', 'path', 'query_string', 'view',
+            'status_code', 'duration_ms', 'sql_count', 'sql_ms',
+        )))
+
+
+class ProfileReportDetailView(APIView):
+    """One profile: call tree, top functions, SQL with EXPLAIN plans, outbound calls."""
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, pk):
+        denied = _superuser_only(request)
+        if denied:
+            return denied
+        report = get_object_or_404(ProfileReport, pk=pk)
+        return Response({
+            "id": report.pk, "created_at": report.created_at.isoformat(), "method": report.method,
+            "path": report.path, "query_string": report.query_string, "view": report.view,
+            "status_code": report.status_code, "duration_ms": report.duration_ms,
+            "sql_count": report.sql_count, "sql_ms": report.sql_ms, **report.report,
+        })
+
+
 class PaperDeleteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -685,6 +830,37 @@ class PaperDeleteView(APIView):
         paper.delete()
         return JsonResponse({"message": "Paper deleted successfully"}, status=200)
 
+def _bulk(request, kind, action):
+    """Run a bulk delete/update for ``request.data``; see papers/bulk.py."""
+    try:
+        ids = bulk.parse_ids(request.data)
+        if action == "delete":
+            result = bulk.bulk_delete(kind, request.user, ids)
+        else:
+            result = bulk.bulk_update(kind, request.user, ids, bulk.parse_patch(request.data), request)
+    except bulk.BulkRequestError as e:
+        detail = e.args[0]
+        return Response(detail if isinstance(detail, dict) else {"error": detail},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_200_OK)
+
+
+class PaperBulkDeleteView(APIView):
+    """Delete several papers: {"ids": [...]}, same ownership rules as PaperDeleteView."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return _bulk(request, "paper", "delete")
+
+
+class PaperBulkUpdateView(APIView):
+    """Apply one patch to several papers: {"ids": [...], "patch": {...}}."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return _bulk(request, "paper", "update")
+
+
 class PaperUpdateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -696,10 +872,10 @@ class PaperUpdateView(APIView):
 
         # If the user wants to rename the project:
         new_doi = request.data.get("doi")
-        if new_doi and new_doi != paper.doi:
+        if new_doi and normalize_doi(new_doi) != paper.doi_key:
             # Still ensure not to conflict with that same user's other projects.
             # If you want it to be globally unique, remove "user=project.user."
-            if Paper.objects.filter(doi=new_doi, user=paper.user).exists():
+            if Paper.objects.filter(doi_key=normalize_doi(new_doi), user=paper.user).exists():
                 return Response({"error": "Project already exists"}, status=status.HTTP_400_BAD_REQUEST)
             paper.doi = new_doi
 
@@ -711,8 +887,9 @@ class PaperUpdateView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProjectListCreateView(APIView):
+class ProjectListCreateView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get(self, request):
         """
@@ -721,11 +898,18 @@ class ProjectListCreateView(APIView):
         """
         if request.user.is_superuser:
             projects = Project.objects.all()
+            namespace = caching.projects_ns()
         else:
             projects = Project.objects.filter(user=request.user)
-        serializer = ProjectSerializer(projects, many=True)
-        return Response(serializer.data)
+            namespace = caching.projects_ns(request.user.id)
+        data = caching.get_or_build(
+            [namespace],
+            ("project-list",),
+            lambda: serialize_rows(projects, ProjectSerializer),
+        )
+        return Response(data)
 
+    @idempotent
     def post(self, request):
         """Create a new project and associate it with the authenticated user."""
 
@@ -743,6 +927,111 @@ class ProjectListCreateView(APIView):
 
 
 
+class ProjectFundingView(ReplicaReadMixin, APIView):
+    """
+    Funding totals computed in SQL, per currency and grouped by any of
+    funding_body, status, pi and year (?group_by=funding_body,year).
+    Superusers get all projects, other users their own. Optional filters:
+    status, funding_body, year.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        group_by = [key for key in request.query_params.get('group_by', 'funding_body').split(',') if key]
+        unknown = [key for key in group_by if key not in GROUP_FIELDS]
+        if unknown:
+            return Response(
+                {"error": f"Cannot group by {', '.join(unknown)}; use {', '.join(GROUP_FIELDS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {}
+        for param in ('status', 'funding_body', 'year'):
+            value = request.query_params.get(param)
+            if value:
+                filters[GROUP_FIELDS[param]] = value
+        if 'funding_year' in filters and not filters['funding_year'].isdigit():
+            return Response({"error": "year must be a number"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.user.is_superuser:
+            projects = Project.objects.all()
+            namespace = caching.projects_ns()
+        else:
+            projects = Project.objects.filter(user=request.user)
+            namespace = caching.projects_ns(request.user.id)
+        projects = projects.filter(**filters)
+
+        data = caching.get_or_build(
+            [namespace],
+            ("project-funding", tuple(group_by), tuple(sorted(filters.items()))),
+            lambda: {
+                "group_by": group_by,
+                "totals": funding_totals(projects, group_by),
+                "overall": funding_totals(projects, []),
+            },
+        )
+        return Response(data)
+
+
+class ProjectPapersView(ReplicaReadMixin, APIView):
+    """
+    Papers linked to one project. Superusers get the linked master copies,
+    other users their own linked papers in projects they can see.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, pk):
+        if request.user.is_superuser:
+            project = get_object_or_404(Project, pk=pk)
+            papers = Paper.objects.filter(project=project, user=request.user, is_master_copy=True)
+        else:
+            project = get_object_or_404(
+                Project.objects.filter(Q(user=request.user) | Q(papers__user=request.user)).distinct(), pk=pk
+            )
+            papers = Paper.objects.filter(project=project, user=request.user, is_master_copy=False)
+
+        data = caching.get_or_build(
+            [caching.papers_ns(request.user.id)],
+            ("project-papers", project.pk),
+            lambda: serialize_rows(papers, PaperSerializer),
+        )
+        return Response(data)
+
+
+class ProjectPaperCountsView(ReplicaReadMixin, APIView):
+    """
+    Linked paper counts per project (superusers: all projects, counting
+    master copies; others: their own projects, counting their papers), plus
+    how many papers name a milestone project that matched none.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request):
+        if request.user.is_superuser:
+            projects = Project.objects.all()
+            papers = Paper.objects.filter(user=request.user, is_master_copy=True)
+            namespaces = [caching.projects_ns(), caching.papers_ns(request.user.id)]
+        else:
+            projects = Project.objects.filter(user=request.user)
+            papers = Paper.objects.filter(user=request.user, is_master_copy=False)
+            namespaces = [caching.projects_ns(request.user.id), caching.papers_ns(request.user.id)]
+
+        data = caching.get_or_build(
+            namespaces,
+            ("project-paper-counts",),
+            lambda: {
+                "projects": milestones.paper_counts(
+                    projects, user_id=request.user.id, is_master_copy=request.user.is_superuser,
+                ),
+                "unlinked": papers.filter(project__isnull=True).exclude(milestone_project="").count(),
+            },
+        )
+        return Response(data)
+
+
 class ProjectDeleteView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -761,6 +1050,22 @@ class ProjectDeleteView(APIView):
         project.delete()
         return JsonResponse({"message": "Project deleted successfully"}, status=200)
 
+class ProjectBulkDeleteView(APIView):
+    """Delete several projects: {"ids": [...]}, same ownership rules as ProjectDeleteView."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return _bulk(request, "project", "delete")
+
+
+class ProjectBulkUpdateView(APIView):
+    """Apply one patch to several projects: {"ids": [...], "patch": {...}}."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return _bulk(request, "project", "update")
+
+
 class ProjectUpdateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -788,94 +1093,25 @@ class ProjectUpdateView(APIView):
 
 
 
-def fetch_doi_metadata(doi):
-    """Fetch metadata for a given DOI from Crossref API."""
-    base_url = "https://api.crossref.org/works/"
-    response = requests.get(base_url + doi)
-
-    if response.status_code == 200:
-        data = response.json()
-        if 'message' in data:
-            message = data['message']
-
-            title = message.get('title', ['N/A'])[0]
-            authors_data = message.get('author', [])
-
-            if authors_data:
-                main_author = f"{authors_data[0].get('given', 'N/A')} {authors_data[0].get('family', 'N/A')}"
-                additional_authors = [
-                    f"{author.get('given', 'N/A')} {author.get('family', 'N/A')}"
-                    for author in authors_data[1:]
-                ]
-            else:
-                main_author = "N/A"
-                additional_authors = []
-
-            published_date = "N/A"
-            if 'issued' in message and 'date-parts' in message['issued']:
-                date_parts = message['issued']['date-parts'][0]
-                published_date = "-".join(map(str, date_parts))
-
-            publisher = message.get('publisher', 'N/A')
-            journal = message.get('container-title', ['N/A'])[0]
-            
-            # Map Crossref type to your publication type categories
-            def get_publication_type(crossref_type):
-                """Map Crossref type to publication type categories."""
-                type_mapping = {
-                    'journal-article': 'Article in journal',
-                    'monograph': 'Monograph',
-                    'book': 'Monograph',
-                    'book-chapter': 'Monograph',
-                    'proceedings-article': 'Conference proceedings',
-                    'paper-conference': 'Conference proceedings',
-                    'book-part': 'Monograph',
-                    'reference-entry': 'Monograph',
-                    'dataset': 'other',
-                    'component': 'other',
-                    'report': 'other',
-                    'thesis': 'other',
-                    'dissertation': 'other',
-                    'posted-content': 'other',
-                    'preprint': 'other',
-                    'standard': 'other',
-                    'peer-review': 'other',
-                    'editorial': 'other',
-                    'review': 'other',
-                    'other': 'other'
-                }
-                return type_mapping.get(crossref_type, 'other')
-            
-            crossref_type = message.get('type', 'other')
-            publication_type = get_publication_type(crossref_type)
-
-            metadata = {
-                "Title": title,
-                "Authors": {
-                    "Main Author": main_author,
-                    "Additional Authors": additional_authors
-                },
-                "PublishedOn": published_date,
-                "Publisher": publisher,
-                "DOI": doi,
-                "Journal": journal,
-                "PublicationType": publication_type
-            }
-            return metadata
-        else:
-            return {"error": "Invalid response structure from Crossref API."}
-    else:
-        return {"error": f"Failed to fetch metadata for DOI {doi}. HTTP Status: {response.status_code}"}
-
-
 class DOIInfoView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = 'doi_lookup'
+
     def post(self, request):
         """Fetch DOI metadata from Crossref API."""
-        doi = request.data.get('doi')
+        doi = clean_doi(request.data.get('doi'))
         if not doi:
             return Response({"error": "DOI is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        metadata = fetch_doi_metadata(doi)
+        try:
+            metadata = lookup_doi(doi, block=False)
+        except CrossrefBusy as e:
+            return Response(
+                {"error": "DOI lookups are busy right now. Please try again in a moment."},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE if e.paused else status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": str(e.retry_after)},
+            )
         
         if "error" in metadata:
             return Response(metadata, status=status.HTTP_400_BAD_REQUEST)
@@ -887,10 +1123,8 @@ class UserListCreateAPIView(APIView):
     permission_classes = [IsAdminUser]  # Only admin/superuser can access
 
     def get(self, request):
-        """List all users except superusers."""
-        users = User.objects.filter(is_superuser=False)
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        """List all users except superusers, with paper/project/chat counts and last activity."""
+        return Response(accounts.annotated_users(User.objects.filter(is_superuser=False)))
 
     def post(self, request):
         """Create a new user."""
@@ -905,7 +1139,7 @@ class UserDetailAPIView(APIView):
     permission_classes = [IsAdminUser]
 
     def get_object(self, pk):
-        return User.objects.get(pk=pk)
+        return get_object_or_404(User, pk=pk)
 
     def get(self, request, pk):
         """Retrieve a specific user."""
@@ -923,7 +1157,17 @@ class UserDetailAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
-        """Delete a user."""
+        """
+        Delete a user and their papers, projects and chat history in chunks.
+        With ?background=true the user is deactivated at once and the
+        deletion runs on the job worker (202).
+        """
         user = self.get_object(pk)
-        user.delete()
+        if request.query_params.get('background') == 'true':
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            enqueue("delete_user", {"user_id": user.pk}, idempotency_key=f"delete-user:{user.pk}")
+            return Response({"message": "User deactivated; deletion queued"}, status=status.HTTP_202_ACCEPTED)
+
+        accounts.delete_user(user.pk)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -118,7 +118,7 @@ export default function AdminUsersPage() {
 
     try {
       const updated = await updateUser(editUser.id, payload);
-      setUsers((prev) => prev.map((user) => (user.id === editUser.id ? updated : user)));
+      setUsers((prev) => prev.map((user) => (user.id === editUser.id ? { ...user, ...updated } : user)));
       setEditUser(null);
     } catch (err) {
       console.error("Error updating user:", err);
@@ -256,6 +256,7 @@ export default function AdminUsersPage() {
                     <th style={tableHeadCellStyle}>Username</th>
                     <th style={tableHeadCellStyle}>Email</th>
                     <th style={tableHeadCellStyle}>Role</th>
+                    <th style={tableHeadCellStyle}>Activity</th>
                     <th style={tableHeadCellStyle}>Actions</th>
                   </tr>
                 </thead>
@@ -319,6 +320,15 @@ export default function AdminUsersPage() {
                             {user.is_superuser ? "Superuser" : "Standard"}
                           </span>
                         </td>
+                        <td style={tableCellStyle}>
+                          {user.paper_count ?? 0} papers · {user.project_count ?? 0} projects ·{" "}
+                          {user.chat_message_count ?? 0} messages
+                          <div style={mutedTextStyle}>
+                            {user.last_activity
+                              ? `Last active ${new Date(user.last_activity).toLocaleDateString()}`
+                              : "No activity yet"}
+                          </div>
+                        </td>
                         <td style={{ ...tableCellStyle, minWidth: "200px" }}>
                           <div style={tableActionGroupStyle}>
                             {isEditing && (
@@ -13,6 +13,16 @@ export async function POST(request: Request) {
       credentials: 'include',
     });
 
+    if (djangoRes.status === 429 || djangoRes.status === 503) {
+      // Rate limited, a previous message is still being answered, or no model is available
+      const retryAfter = djangoRes.headers.get('Retry-After');
+      const data = await djangoRes.json();
+      return NextResponse.json(
+        { error: data.detail || data.error || 'Too many messages. Please wait a moment.' },
+        { status: 429, headers: retryAfter ? { 'Retry-After': retryAfter } : undefined }
+      );
+    }
+
     if (!djangoRes.ok) {
       return NextResponse.json(
         { error: 'Error from Django' },
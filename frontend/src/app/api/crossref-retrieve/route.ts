@@ -9,15 +9,20 @@ export async function POST(req: Request) {
             return NextResponse.json({ error: 'DOI is required' }, { status: 400 });
         }
 
+        const authHeader = req.headers.get("Authorization");
         const response = await fetch(DJANGO_API_URL, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', "Authorization": `${authHeader}` },
             body: JSON.stringify({ doi }),
         });
 
         if (!response.ok) {
             const errorData = await response.json();
-            return NextResponse.json(errorData, { status: response.status });
+            const retryAfter = response.headers.get('Retry-After');
+            return NextResponse.json(errorData, {
+                status: response.status,
+                headers: retryAfter ? { 'Retry-After': retryAfter } : undefined,
+            });
         }
 
         const data = await response.json();
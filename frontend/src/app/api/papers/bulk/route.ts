@@ -0,0 +1,27 @@
+import { NextResponse } from "next/server";
+import { BASE_URL } from "@/app/types/FixedTypes";
+
+// Bulk delete/update: { action: "delete" | "update", ids: number[], patch?: object }
+export async function POST(request: Request) {
+    const authHeader = request.headers.get("Authorization");
+
+    try {
+        const { action, ...body } = await request.json();
+        if (action !== "delete" && action !== "update") {
+            return NextResponse.json({ error: "Unknown bulk action" }, { status: 400 });
+        }
+        const response = await fetch(`${BASE_URL}papers/bulk-${action}/`, {
+            method: "POST",
+            headers: {
+                "Content-Type": "application/json",
+                "Authorization": `${authHeader}`,
+            },
+            body: JSON.stringify(body),
+        });
+
+        const data = await response.json();
+        return NextResponse.json(data, { status: response.status });
+    } catch (error) {
+        return NextResponse.json({ error: "Internal server error" }, { status: 500 });
+    }
+}
@@ -19,15 +19,24 @@ export async function GET(req: Request) {
 export async function POST(request: Request) {
   const body = await request.json();
   const authHeader = request.headers.get("Authorization");
+  const idempotencyKey = request.headers.get("Idempotency-Key");
 
   const response = await fetch(`${BASE_URL}papers/`, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json', "Authorization": `${authHeader}` },
+    headers: {
+      'Content-Type': 'application/json',
+      "Authorization": `${authHeader}`,
+      ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
+    },
     body: JSON.stringify(body),
   });
   console.log(JSON.stringify(body))
   if (!response.ok) {
     const errorData = await response.json();
+      if (response.status === 409 || response.status === 422) {
+          // Idempotency-Key: the first attempt is still running, or the key was reused
+          return NextResponse.json(errorData, { status: response.status });
+      }
       if (response.status === 400 && errorData.error === "Duplicate key error") {
           console.log('Paper exists with this doi')
           return NextResponse.json({error: "DOI already exists"}, {status: 500})
@@ -17,12 +17,14 @@ export async function GET(req: Request) {
 // Handle POST requests
 export async function POST(request: Request) {
   const authHeader = request.headers.get("Authorization");
+  const idempotencyKey = request.headers.get("Idempotency-Key");
   const body = await request.json();
   const response = await fetch(`${BASE_URL}projects/`, {
     method: 'POST',
     headers: { 
     'Content-Type': 'application/json',
      "Authorization": `${authHeader}`,
+     ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
      },
     body: JSON.stringify(body),
   });
@@ -30,6 +32,10 @@ export async function POST(request: Request) {
   if (!response.ok) {
     const errorData = await response.json();
     console.log(errorData)
+      if (response.status === 409 || response.status === 422) {
+          // Idempotency-Key: the first attempt is still running, or the key was reused
+          return NextResponse.json(errorData, { status: response.status });
+      }
       if (response.status === 400 && errorData.error === "Duplicate key error") {
           console.log('Project exists with this project name')
           return NextResponse.json({error: "Project already exists"}, {status: 500})
@@ -28,6 +28,11 @@ export interface User {
   username: string;
   email: string;
   is_superuser: boolean;
+  // Activity summary returned by the user list
+  paper_count?: number;
+  project_count?: number;
+  chat_message_count?: number;
+  last_activity?: string | null;
   // add other fields if needed
 }
 
@@ -15,6 +15,23 @@ const fetchWithAuth = async (url: string, options: RequestInit = {}) => {
   return fetch(url, { ...options, headers });
 };
 
+// Creates resent within a minute (slow response, double click) reuse their
+// Idempotency-Key, so the backend replays the first result instead of
+// creating again
+const IDEMPOTENCY_WINDOW_MS = 60_000;
+const recentCreates = new Map<string, { key: string; at: number }>();
+
+const idempotencyKeyFor = (url: string, body: string) => {
+  const now = Date.now();
+  recentCreates.forEach((entry, id) => {
+    if (now - entry.at > IDEMPOTENCY_WINDOW_MS) recentCreates.delete(id);
+  });
+  const id = `${url}\n${body}`;
+  const entry = recentCreates.get(id) ?? { key: crypto.randomUUID(), at: now };
+  recentCreates.set(id, entry);
+  return entry.key;
+};
+
 function camelToSnakeCase(obj: any): any {
     if (Array.isArray(obj)) {
       return obj.map(camelToSnakeCase);
@@ -59,10 +76,11 @@ export const fetchProjects = async (): Promise<Project[]> => {
 // Create a new paper
 export const createProject = async (paper: Partial<Project>) => {
   const snakePaper = camelToSnakeCase(paper)  
+  const body = JSON.stringify(snakePaper);
   const response = await fetchWithAuth(PROJECTS_API, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(snakePaper),
+    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKeyFor(PROJECTS_API, body) },
+    body,
   });
   const data = await response.json();
 
@@ -147,10 +165,11 @@ export const fetchPaper = async (): Promise<Paper[]> => {
 // Create a new paper
 export const createPaper = async (paper: Partial<Paper>) => {
   const snakePaper = camelToSnakeCase(paper)  
+  const body = JSON.stringify(snakePaper);
   const response = await fetchWithAuth(PAPER_API, {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify(snakePaper),
+    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKeyFor(PAPER_API, body) },
+    body,
   });
 
   const data = await response.json();
@@ -202,6 +221,35 @@ export const updatePaper = async (id: number, paper: Partial<Paper>) => {
   return data;
 }
 
+export interface BulkResult<T> {
+  results: { id: number; status: "deleted" | "updated" | "invalid" | "not_found"; data?: T; errors?: Record<string, string[]> }[];
+  deleted?: number;
+  updated?: number;
+  invalid?: number;
+  not_found: number;
+}
+
+// Delete or patch many papers/projects in one request; every id gets a result
+const bulkRequest = async <T,>(api: string, action: "delete" | "update", ids: number[], patch?: object): Promise<BulkResult<T>> => {
+  const response = await fetchWithAuth(`${api}/bulk`, {
+    method: "POST",
+    body: JSON.stringify({ action, ids, ...(patch ? { patch: camelToSnakeCase(patch) } : {}) }),
+  });
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error || "Bulk request failed");
+  }
+  return {
+    ...data,
+    results: data.results.map((result: any) => ({ ...result, data: result.data && convertKeysToCamelCase(result.data) })),
+  };
+};
+
+export const bulkDeletePapers = (ids: number[]) => bulkRequest<Paper>(PAPER_API, "delete", ids);
+export const bulkUpdatePapers = (ids: number[], patch: Partial<Paper>) => bulkRequest<Paper>(PAPER_API, "update", ids, patch);
+export const bulkDeleteProjects = (ids: number[]) => bulkRequest<Project>(PROJECTS_API, "delete", ids);
+export const bulkUpdateProjects = (ids: number[], patch: Partial<Project>) => bulkRequest<Project>(PROJECTS_API, "update", ids, patch);
+
 export interface DoiMetadata {
   Title: string;
   Authors: {